@@ -0,0 +1,53 @@
+"""
+Output bytes per frame and render time of the colored output modes.
+
+Run from the repository root:
+    python -m benchmarks.bench_color_modes [image]
+"""
+
+import sys
+import timeit
+
+from imgtobraille import arr_filters
+from imgtobraille import media_io
+from imgtobraille import render
+
+MODES = [
+    ("truecolor", False, 0),
+    ("truecolor", True, 0),
+    ("truecolor", True, 8),
+    ("truecolor", True, 24),
+    ("256", False, 0),
+    ("256", True, 0),
+    ("16", True, 0),
+]
+
+
+def main(path: str = "demos/demo.jpg", columns: int = 200, repeat: int = 20) -> None:
+    color_arr = media_io.read_image_file(path, 1)
+    color_arr = arr_filters.fit_in_box(color_arr, columns * 2)
+    dot_arr = arr_filters.fl_dithering(arr_filters.rgb_to_grayscale(color_arr))
+
+    baseline = None
+    for color_mode, coalesce, tolerance in MODES:
+        kwargs = dict(
+            color_mode=color_mode, coalesce=coalesce, color_tolerance=tolerance
+        )
+        frame = render.render(dot_arr.copy(), color_arr, **kwargs)
+        size = len(frame.encode())
+        baseline = baseline or size
+        seconds = min(
+            timeit.repeat(
+                lambda: render.render(dot_arr.copy(), color_arr, **kwargs),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        print(
+            f"{color_mode:>9} coalesce={coalesce!s:5} tolerance={tolerance:<3} "
+            f"{size:9} bytes/frame ({size / baseline:6.1%}) {seconds * 1000:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
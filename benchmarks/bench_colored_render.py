@@ -0,0 +1,53 @@
+"""
+Compare colored `render.render` against formatting every character with `colorize_view`.
+
+Run from the repository root:
+    python -m benchmarks.bench_colored_render
+"""
+
+import timeit
+
+import numpy as np
+
+from imgtobraille import render
+
+
+def colorize_view_render(dot_arr: np.ndarray, color_arr: np.ndarray) -> str:
+    """Colored render that formats every braille character separately."""
+    codes = (render.split_to_tiles(dot_arr.clip(0, 1), 4, 2) * render.BRAILLE_TILE).sum(
+        axis=(2, 3)
+    )
+    colors = render.split_to_tiles(color_arr, 4, 2).mean(axis=(2, 3)).astype(int)
+    unicode_buf = (codes + render.BRAILLE_CODEPOINT_START).view("U2")
+    return render.colorize_view(unicode_buf, colors)
+
+
+def main(repeat: int = 20) -> None:
+    rng = np.random.default_rng(0)
+    for columns, rows in [(80, 24), (200, 60), (400, 120)]:
+        dot_arr = rng.integers(0, 2, (rows * 4, columns * 2), dtype=np.uint8)
+        color_arr = rng.integers(0, 256, (rows * 4, columns * 2, 3), dtype=np.uint8)
+        assert render.render(dot_arr, color_arr) == colorize_view_render(
+            dot_arr, color_arr
+        )
+
+        old = min(
+            timeit.repeat(
+                lambda: colorize_view_render(dot_arr, color_arr),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        new = min(
+            timeit.repeat(
+                lambda: render.render(dot_arr, color_arr), number=1, repeat=repeat
+            )
+        )
+        print(
+            f"{columns}x{rows} cells: colorize_view {old * 1000:8.2f} ms, "
+            f"render {new * 1000:8.2f} ms, speedup {old / new:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
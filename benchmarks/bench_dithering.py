@@ -0,0 +1,40 @@
+"""
+Compare the Floyd–Steinberg dithering modes of `arr_filters.FloydSteinbergDitherer`
+against `arr_filters.fl_dithering`, which allocates a new padded buffer every call.
+The "wavefront" and "bands" modes use all the threads numba is allowed to use, set
+NUMBA_NUM_THREADS to compare thread counts.
+
+Run from the repository root:
+    python -m benchmarks.bench_dithering
+"""
+
+import timeit
+
+import numba as nb
+import numpy as np
+
+from imgtobraille import arr_filters
+
+
+def main(repeat: int = 5) -> None:
+    print(f"{nb.get_num_threads()} thread(s), {nb.threading_layer()} threading layer")
+    rng = np.random.default_rng(0)
+    for name, (width, height) in [
+        ("720p", (1280, 720)),
+        ("1080p", (1920, 1080)),
+        ("4K", (3840, 2160)),
+    ]:
+        arr = rng.integers(0, 256, (height, width), dtype=np.uint8)
+        out = np.empty_like(arr)
+        candidates = {"fl_dithering": lambda: arr_filters.fl_dithering(arr)}
+        for mode in ("serial", "wavefront", "bands"):
+            ditherer = arr_filters.FloydSteinbergDitherer(mode=mode)
+            candidates[mode] = lambda ditherer=ditherer: ditherer(arr, out=out)
+
+        for label, function in candidates.items():
+            seconds = min(timeit.repeat(function, number=1, repeat=repeat))
+            print(f"{name:>5} {label:>12}: {seconds * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
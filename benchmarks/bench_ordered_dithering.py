@@ -0,0 +1,86 @@
+"""
+Compare the threshold map dithers of `arr_filters.ordered_dithering` against
+`arr_filters.fl_dithering`, on throughput and on temporal stability: the share of
+dots that change between consecutive frames. Dots that change while the scene
+barely does are seen as shimmering.
+
+The frames are a still scene with a little sensor noise, the same scene panning
+slowly, and the frames of tests/test_media/cube.mp4.
+
+Run from the repository root:
+    python -m benchmarks.bench_ordered_dithering
+"""
+
+import timeit
+from typing import Callable
+
+import numpy as np
+
+from imgtobraille import arr_filters
+from imgtobraille import media_io
+
+CUBE_VIDEO = "tests/test_media/cube.mp4"
+
+
+def scene(height: int, width: int) -> np.ndarray:
+    y, x = np.mgrid[0:height, 0:width]
+    return 128 + 60 * np.sin(x / 37) * np.cos(y / 23) + 60 * (x / width - 0.5)
+
+
+def noisy_still(frames: int, height: int, width: int) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    base = scene(height, width)
+    return [
+        np.clip(base + rng.normal(0, 2, base.shape), 0, 255).astype(np.uint8)
+        for _ in range(frames)
+    ]
+
+
+def slow_pan(frames: int, height: int, width: int) -> list[np.ndarray]:
+    base = scene(height, width + frames).astype(np.uint8)
+    return [base[:, offset : offset + width] for offset in range(frames)]
+
+
+def changed_dots(dither: Callable[[np.ndarray], np.ndarray], frames) -> float:
+    dots = [dither(frame) > 0 for frame in frames]
+    return float(np.mean([np.mean(a != b) for a, b in zip(dots, dots[1:])]))
+
+
+def main(repeat: int = 5) -> None:
+    methods = {
+        "floyd-steinberg": lambda arr: arr_filters.fl_dithering(arr),
+        **{
+            method: lambda arr, method=method: arr_filters.ordered_dithering(
+                arr, method
+            )
+            for method in arr_filters.THRESHOLD_MAPS
+        },
+    }
+    sequences = {
+        "noisy still": noisy_still(30, 240, 320),
+        "slow pan": slow_pan(30, 240, 320),
+        "cube.mp4": list(media_io.VideoFile(CUBE_VIDEO)),
+    }
+    resolutions = {"720p": (720, 1280), "1080p": (1080, 1920)}
+
+    print(
+        f"{'method':>15}"
+        + "".join(f" {name:>12}" for name in resolutions)
+        + "".join(f" {name:>12}" for name in sequences)
+    )
+    print(f"{'':>15}" + f" {'frames/s':>12}" * len(resolutions), end="")
+    print(f" {'changed dots':>12}" * len(sequences))
+    for label, dither in methods.items():
+        row = f"{label:>15}"
+        for height, width in resolutions.values():
+            arr = noisy_still(1, height, width)[0]
+            dither(arr)
+            seconds = min(timeit.repeat(lambda: dither(arr), number=1, repeat=repeat))
+            row += f" {1 / seconds:12.1f}"
+        for frames in sequences.values():
+            row += f" {changed_dots(dither, frames):12.2%}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare packing dots into braille bit masks with `render.pack_braille` against the
+tiled numpy expression (split to tiles, clip, multiply with the tile, sum).
+Peak memory is the largest amount of memory allocated by numpy during the call,
+as reported by tracemalloc.
+
+Run from the repository root:
+    python -m benchmarks.bench_pack_braille
+"""
+
+import timeit
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+
+from imgtobraille import render
+
+
+def tiled_pack(dot_arr: np.ndarray) -> np.ndarray:
+    tiled_array = render.split_to_tiles(dot_arr.copy(), 4, 2)
+    masked_bits = np.clip(tiled_array, 0, 1, out=tiled_array) * render.BRAILLE_TILE
+    return masked_bits.sum(axis=(2, 3)).astype(np.int64)
+
+
+def peak_memory(function: Callable[[], object]) -> int:
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main(repeat: int = 10) -> None:
+    rng = np.random.default_rng(0)
+    out_buffers = {}
+    for name, (width, height) in [
+        ("720p", (1280, 720)),
+        ("1080p", (1920, 1080)),
+        ("4K", (3840, 2160)),
+    ]:
+        dot_arr = rng.integers(0, 2, (height, width), dtype=np.uint8)
+        out_buffers[name] = out = np.empty((height // 4, width // 2), dtype=np.uint8)
+        assert np.array_equal(tiled_pack(dot_arr), render.pack_braille(dot_arr))
+
+        candidates = {
+            "tiled numpy": lambda: tiled_pack(dot_arr),
+            "pack_braille": lambda: render.pack_braille(dot_arr),
+            "pack_braille out=": lambda: render.pack_braille(dot_arr, out=out),
+        }
+        for label, function in candidates.items():
+            seconds = min(timeit.repeat(function, number=1, repeat=repeat))
+            print(
+                f"{name:>5} {label:>17}: {seconds * 1000:7.2f} ms, "
+                f"peak {peak_memory(function) / 2**20:8.2f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
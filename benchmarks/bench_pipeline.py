@@ -0,0 +1,360 @@
+"""
+Benchmark every stage of the rendering pipeline over synthetic frames from
+thumbnail size to 4K, `demos/demo.jpg`, the frames of `tests/test_media/cube.mp4`
+and a still slide with a moving pointer.
+
+For each stage and input this reports the best time of a call, frames/s, braille
+cells/s and output bytes/s, and the peak memory allocated during a call as traced by
+tracemalloc. Allocations made inside OpenCV are not traced, so the peak memory of
+the read and resize stages mostly counts the returned arrays.
+
+Results can be saved as JSON and compared against an earlier run. The comparison
+fails with exit status 1 if any stage got slower than the baseline by more than the
+tolerance. Stages missing from the baseline are listed as not checked. Baselines only
+make sense on the machine they were recorded on, so none is committed: record one
+with -o before making changes, and compare against it afterwards. The default path
+`benchmarks/baseline.json` is ignored by git.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline -o benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline -baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import BinaryIO, Callable, Optional
+
+import numpy as np
+from cv2 import cv2
+
+from imgtobraille import arr_filters
+from imgtobraille import media_io
+from imgtobraille import pipeline
+from imgtobraille import render
+
+DEMO_IMAGE = "demos/demo.jpg"
+DEMO_VIDEO = "tests/test_media/cube.mp4"
+SYNTHETIC_SIZES = {
+    "thumbnail": (160, 120),
+    "480p": (640, 480),
+    "1080p": (1920, 1080),
+    "4K": (3840, 2160),
+}
+BOX = (400, 240)  # 200x60 braille cells, the terminal the frames are fitted in
+# Slowdowns smaller than this are timer and scheduling noise, not regressions.
+NOISE_FLOOR_SECONDS = 0.0002
+
+
+def synthetic_frame(width: int, height: int) -> np.ndarray:
+    """Smooth gradients with noise, so JPEG compression and dithering do real work."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    channels = [
+        127 + 127 * np.sin(x / width * 6 + phase) * np.cos(y / height * 4 - phase)
+        for phase in (0, 2, 4)
+    ]
+    frame = np.stack(channels, axis=-1) + rng.normal(0, 12, (height, width, 3))
+    return frame.clip(0, 255).astype(np.uint8)
+
+
+def size_of(output: object) -> int:
+    """Size in bytes of a stage's output: an array, a string, bytes or a byte count."""
+    if isinstance(output, np.ndarray):
+        return output.nbytes
+    if isinstance(output, int):
+        return output
+    return len(output.encode() if isinstance(output, str) else output)
+
+
+def measure(
+    function: Callable[[], object],
+    frames: int,
+    cells: int,
+    min_seconds: float,
+) -> dict:
+    """
+    Time function and trace its peak memory.
+    :param function: benchmarked call, returns the stage's output or a list of
+    outputs, see `size_of`.
+    :param frames: amount of frames processed by one call.
+    :param cells: amount of braille cells the frames are rendered to.
+    :param min_seconds: keep repeating the call at least this long, at least 3 times.
+    :return: result of the stage as a JSON serializable dict.
+    """
+    output = function()  # warm up numba and caches
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < 3 or time.perf_counter() - started < min_seconds:
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    output_bytes = sum(map(size_of, output if isinstance(output, list) else [output]))
+    seconds = min(timings)
+    return {
+        "seconds": seconds,
+        "frames_per_second": frames / seconds,
+        "cells_per_second": cells / seconds,
+        "bytes_out_per_second": output_bytes / seconds,
+        "peak_memory_bytes": peak,
+        "repeats": len(timings),
+    }
+
+
+def frame_stages(
+    frame: np.ndarray, path: Optional[str], sink: BinaryIO
+) -> dict[str, tuple[Callable[[], object], int]]:
+    """
+    Stages of rendering a single rgb frame, and the amount of braille cells each
+    produces. The frame is rendered at its own resolution, except for resizing.
+    :param frame: rgb frame.
+    :param path: image file with the frame, None to skip the read stage.
+    :param sink: binary stream the streamed output is written to.
+    """
+    gray = arr_filters.rgb_to_grayscale(frame)
+    dots = arr_filters.fl_dithering(gray) // 255
+    codes, colors = render.render_cells(dots, frame)
+    unicode_buf = (codes.astype(np.int64) + render.BRAILLE_CODEPOINT_START).view("U2")
+    height, width = gray.shape
+    cells = (height // 4) * (width // 2)
+    box_width, box_height = arr_filters.box_fitting_size(gray, *BOX)
+    box_cells = (box_height // 4) * (box_width // 2)
+
+    stages = {}
+    if path is not None:
+        stages["read_image_file"] = (lambda: media_io.read_image_file(path, 1), cells)
+        stages["read_image_file reduced"] = (
+            lambda: media_io.read_image_file(path, 1, *BOX),
+            box_cells,
+        )
+        # Whole files as rendered by the cli, in grayscale and in color.
+        task = (path, BOX, 0.8, "floyd-steinberg", None)
+        stages["render_file"] = (lambda: pipeline.render_file(task), box_cells)
+        stages["render_colored_file"] = (
+            lambda: list(pipeline.render_colored_file(task)),
+            box_cells,
+        )
+    stages["fit_in_box"] = (lambda: arr_filters.fit_in_box(frame, *BOX), box_cells)
+    stages["fl_dithering"] = (lambda: arr_filters.fl_dithering(gray), cells)
+    stages["ordered_dithering"] = (lambda: arr_filters.ordered_dithering(gray), cells)
+    stages["render gray"] = (lambda: render.render(dots), cells)
+    stages["render_bytes gray"] = (lambda: render.render_bytes(dots), cells)
+    stages["render colored"] = (lambda: render.render(dots, frame), cells)
+    stages["render_bytes colored"] = (
+        lambda: render.render_bytes(dots, frame),
+        cells,
+    )
+    stages["render_to colored"] = (
+        lambda: render.render_to(sink, dots, frame),
+        cells,
+    )
+    stages["colorize_view"] = (
+        lambda: render.colorize_view(unicode_buf, colors),
+        cells,
+    )
+    return stages
+
+
+def run(min_seconds: float, skip: set[str]) -> dict:
+    """
+    Run all stages over all inputs.
+    :param min_seconds: minimum time spent measuring each stage.
+    :param skip: names of stages to leave out.
+    :return: results keyed by "input/stage".
+    """
+    results = {}
+
+    def record(input_name: str, stage: str, function, frames: int, cells: int):
+        if stage in skip:
+            return
+        result = measure(function, frames, cells, min_seconds)
+        results[f"{input_name}/{stage}"] = result
+        print(
+            f"{input_name:>10} {stage:>24}: {result['seconds'] * 1000:9.3f} ms "
+            f"{result['frames_per_second']:9.1f} frames/s "
+            f"{result['cells_per_second'] / 1e6:8.2f} Mcells/s "
+            f"{result['bytes_out_per_second'] / 2**20:9.1f} MiB/s "
+            f"{result['peak_memory_bytes'] / 2**20:8.2f} MiB peak",
+            flush=True,
+        )
+
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "wb") as sink:
+        inputs = []
+        for name, (width, height) in SYNTHETIC_SIZES.items():
+            path = os.path.join(directory, f"{name}.jpg")
+            cv2.imwrite(path, synthetic_frame(width, height)[..., ::-1])
+            inputs.append((name, path))
+        inputs.append(("demo.jpg", DEMO_IMAGE))
+
+        for name, path in inputs:
+            frame = media_io.read_image_file(path, 1)
+            for stage, (function, cells) in frame_stages(frame, path, sink).items():
+                record(name, stage, function, 1, cells)
+
+    video = media_io.VideoFile(DEMO_VIDEO, color=True)
+    frame_count = int(video.frame_count)
+    height, width = video.source_height, video.source_width
+    video_cells = frame_count * (height // 4) * (width // 2)
+    record(
+        "cube.mp4",
+        "decode",
+        lambda: list(video.iter_frames()),
+        frame_count,
+        video_cells,
+    )
+    frames = [frame[..., ::-1] for frame in video.iter_frames()]
+    ditherer = arr_filters.get_ditherer("floyd-steinberg", 0.8)
+
+    def render_video() -> list[str]:
+        return [
+            render.render(ditherer(arr_filters.rgb_to_grayscale(frame)) // 255, frame)
+            for frame in frames
+        ]
+
+    record("cube.mp4", "dither and render", render_video, frame_count, video_cells)
+
+    # A still slide with a moving pointer, like a screen recording, where the
+    # incremental mode dithers only the bands the pointer is in.
+    slide = arr_filters.rgb_to_grayscale(synthetic_frame(*BOX))
+    slides = []
+    for index in range(BOX[0] // 8):
+        frame = slide.copy()
+        frame[100:108, index * 8 : index * 8 + 8] = 255
+        slides.append(frame)
+    slide_cells = len(slides) * (BOX[1] // 4) * (BOX[0] // 2)
+    for mode in ("serial", "incremental"):
+        ditherer = arr_filters.FloydSteinbergDitherer(mode=mode)
+        record(
+            "slides",
+            f"fl_dithering {mode}",
+            lambda ditherer=ditherer: [ditherer(frame) for frame in slides],
+            len(slides),
+            slide_cells,
+        )
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Find the stages that got slower than in the baseline.
+    :param results: results of this run.
+    :param baseline: saved results of an earlier run.
+    :param tolerance: allowed relative slowdown, 0.25 allows 25% longer times.
+    :return: descriptions of the regressions.
+    """
+    regressions = []
+    for key, expected in baseline["results"].items():
+        if key not in results:
+            continue  # left out with -skip
+        seconds = results[key]["seconds"]
+        ratio = seconds / expected["seconds"]
+        if (
+            ratio > 1 + tolerance
+            and seconds - expected["seconds"] > NOISE_FLOOR_SECONDS
+        ):
+            regressions.append(
+                f"{key}: {seconds * 1000:.3f} ms, "
+                f"{ratio:.2f}x the baseline {expected['seconds'] * 1000:.3f} ms"
+            )
+    return regressions
+
+
+def missing_from_baseline(results: dict, baseline: dict) -> list[str]:
+    """
+    Find the stages that the baseline has no results for, and so can't be checked.
+    :param results: results of this run.
+    :param baseline: saved results of an earlier run.
+    :return: keys of the stages.
+    """
+    return [key for key in results if key not in baseline["results"]]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "-o",
+        action="store",
+        metavar="output",
+        default=None,
+        help="Save the results as JSON.",
+    )
+    parser.add_argument(
+        "-baseline",
+        action="store",
+        metavar="path",
+        default=None,
+        help="JSON results of an earlier run to compare against.",
+    )
+    parser.add_argument(
+        "-tolerance",
+        action="store",
+        metavar="fraction",
+        default=0.25,
+        type=float,
+        help="Allowed slowdown relative to the baseline, 0.25=25%%.",
+    )
+    parser.add_argument(
+        "-seconds",
+        action="store",
+        metavar="seconds",
+        default=0.5,
+        type=float,
+        help="Minimum time spent measuring each stage.",
+    )
+    parser.add_argument(
+        "-skip",
+        action="store",
+        metavar="stage",
+        nargs="+",
+        default=[],
+        help="Names of stages to leave out, like colorize_view.",
+    )
+    args = parser.parse_args()
+
+    results = run(args.seconds, set(args.skip))
+    if args.o is not None:
+        with open(args.o, "w") as file_obj:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "processor": platform.processor(),
+                    "cpu_count": os.cpu_count(),
+                    "results": results,
+                },
+                file_obj,
+                indent=2,
+            )
+        print(f"Saved results to {args.o}")
+    if args.baseline is not None:
+        with open(args.baseline) as file_obj:
+            baseline = json.load(file_obj)
+        missing = missing_from_baseline(results, baseline)
+        if missing:
+            print(
+                "Not in the baseline, record a new one to check them:",
+                *missing,
+                sep="\n  ",
+            )
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Slower than the baseline:", *regressions, sep="\n  ")
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Compare reading a 24 megapixel JPEG and fitting it to terminal size with and without
+decoding it at a reduced size, see `media_io.read_image_file`. Peak memory is the
+largest amount of memory allocated by numpy during the call, as reported by
+tracemalloc, which includes the decoded image.
+
+Run from the repository root:
+    python -m benchmarks.bench_reduced_decode
+"""
+
+import os
+import tempfile
+import timeit
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+from cv2 import cv2
+
+from imgtobraille import arr_filters
+from imgtobraille import media_io
+
+BOX = (320, 240)  # 160x60 braille cells
+
+
+def peak_memory(function: Callable[[], object]) -> int:
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main(repeat: int = 5) -> None:
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:4000, 0:6000]
+    photo = 128 + 80 * np.sin(x / 300) * np.cos(y / 200) + rng.normal(0, 10, x.shape)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "photo.jpg")
+        cv2.imwrite(path, np.clip(photo, 0, 255).astype(np.uint8))
+
+        candidates = {
+            "full decode": lambda: arr_filters.fit_in_box(
+                media_io.read_image_file(path, 0), *BOX
+            ),
+            "reduced decode": lambda: arr_filters.fit_in_box(
+                media_io.read_image_file(path, 0, *BOX), *BOX
+            ),
+        }
+        for label, function in candidates.items():
+            seconds = min(timeit.repeat(function, number=1, repeat=repeat))
+            print(
+                f"6000x4000 {label:>14}: {seconds * 1000:7.1f} ms, "
+                f"peak {peak_memory(function) / 2**20:6.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Compare rendering a stack of frames with `render.render_batch` against calling
+`render.render_cells` for every frame.
+
+Run from the repository root:
+    python -m benchmarks.bench_render_batch
+"""
+
+import timeit
+
+import numpy as np
+
+from imgtobraille import render
+
+
+def main(repeat: int = 10) -> None:
+    rng = np.random.default_rng(0)
+    for frames, columns, rows in [(256, 40, 12), (64, 200, 60), (16, 400, 120)]:
+        dot_arrs = rng.integers(0, 2, (frames, rows * 4, columns * 2), dtype=np.uint8)
+
+        per_frame = min(
+            timeit.repeat(
+                lambda: [render.render_cells(arr.copy()) for arr in dot_arrs],
+                number=1,
+                repeat=repeat,
+            )
+        )
+        batch = min(
+            timeit.repeat(
+                lambda: render.render_batch(dot_arrs, as_codes=True),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        print(
+            f"{frames:4} frames of {columns}x{rows} cells: per frame "
+            f"{frames / per_frame:9.1f} frames/s, batch {frames / batch:9.1f} frames/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Compare resizing video frames to terminal size with `arr_filters.BoxResizer`
+against calling `arr_filters.fit_in_box` for every frame, with the INTER_NEAREST
+interpolation that `fit_in_box` used before and with INTER_AREA.
+
+Run from the repository root:
+    python -m benchmarks.bench_resize
+"""
+
+import timeit
+
+import numpy as np
+from cv2 import cv2
+
+from imgtobraille import arr_filters
+
+BOX = (400, 240)  # 200x60 braille cells
+
+
+def main(repeat: int = 20) -> None:
+    rng = np.random.default_rng(0)
+    for name, (width, height) in [("1080p", (1920, 1080)), ("4K", (3840, 2160))]:
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        resizer = arr_filters.BoxResizer(*BOX, reuse_buffer=True)
+        candidates = {
+            "fit_in_box nearest": lambda: arr_filters.fit_in_box(
+                frame, *BOX, interpolation=cv2.INTER_NEAREST
+            ),
+            "fit_in_box area": lambda: arr_filters.fit_in_box(frame, *BOX),
+            "BoxResizer area": lambda: resizer(frame),
+        }
+        for label, function in candidates.items():
+            seconds = min(timeit.repeat(function, number=10, repeat=repeat)) / 10
+            print(f"{name:>5} {label:>18}: {seconds * 1000:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
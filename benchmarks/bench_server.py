@@ -0,0 +1,163 @@
+"""
+Measure the latency and throughput of the render server under load, against
+starting the cli for every image. Concurrent clients render `demos/demo.jpg`
+sent in the request body, and the client-side latency percentiles are printed
+along with the server's own.
+
+Run from the repository root:
+    python -m benchmarks.bench_server
+    python -m benchmarks.bench_server -workers 4 -clients 16 -requests 2000
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+
+import numpy as np
+
+from imgtobraille import server
+
+IMAGE = "demos/demo.jpg"
+DIMS = (100, 30)
+
+
+def run_clients(
+    address: tuple[str, int], clients: int, requests: int, content: bytes
+) -> tuple[list[float], int, float]:
+    """
+    Send requests from concurrent clients, retrying rejected requests.
+    :return: latencies of the successful requests, the amount of rejected requests
+    and the wall time of all requests.
+    """
+    latencies: list[float] = []
+    rejected = 0
+    lock = threading.Lock()
+
+    def client_thread(count: int) -> None:
+        nonlocal rejected
+        with server.RenderClient(address) as client:
+            for _ in range(count):
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        client.render(content, *DIMS)
+                        break
+                    except urllib.error.HTTPError as error:
+                        if error.code != 503:
+                            raise
+                        with lock:
+                            rejected += 1
+                        time.sleep(0.01)
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+    threads = [
+        threading.Thread(target=client_thread, args=(requests // clients,))
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, rejected, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "-workers",
+        metavar="workers",
+        default=0,
+        type=int,
+        help="Amount of server worker processes. 0=all cpu cores.",
+    )
+    parser.add_argument(
+        "-clients",
+        metavar="clients",
+        default=8,
+        type=int,
+        help="Amount of concurrent clients.",
+    )
+    parser.add_argument(
+        "-requests",
+        metavar="requests",
+        default=400,
+        type=int,
+        help="Amount of requests shared by the clients.",
+    )
+    parser.add_argument(
+        "-queue",
+        metavar="requests",
+        default=64,
+        type=int,
+        help="Maximum amount of requests waiting in the server.",
+    )
+    parser.add_argument(
+        "-batch",
+        metavar="requests",
+        default=8,
+        type=int,
+        help="Maximum amount of requests sent to a worker at a time.",
+    )
+    args = parser.parse_args()
+
+    with open(IMAGE, "rb") as file_obj:
+        content = file_obj.read()
+
+    cli_timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "imgtobraille", IMAGE, "-dims", *map(str, DIMS)],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        cli_timings.append(time.perf_counter() - start)
+    print(f"cli per image: {statistics.median(cli_timings) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    with server.RenderServer(
+        ("127.0.0.1", 0), args.workers, args.queue, args.batch
+    ) as render_server:
+        print(
+            f"server with {render_server.workers} worker(s) ready in "
+            f"{time.perf_counter() - start:.1f} s"
+        )
+        thread = threading.Thread(target=render_server.serve_forever, daemon=True)
+        thread.start()
+        run_clients(render_server.address, 1, 10, content)  # warm up
+        latencies, rejected, seconds = run_clients(
+            render_server.address, args.clients, args.requests, content
+        )
+        stats = render_server.stats()
+        render_server.shutdown()
+
+    percentiles = np.percentile(latencies, [50, 95, 99]) * 1000
+    print(
+        f"{len(latencies)} requests from {args.clients} clients in {seconds:.2f} s: "
+        f"{len(latencies) / seconds:.1f} requests/s, {rejected} rejected and retried"
+    )
+    print(
+        "client latency p50 {:.1f} ms, p95 {:.1f} ms, p99 {:.1f} ms".format(
+            *percentiles
+        )
+    )
+    for name in ("latency", "queue_latency"):
+        values = stats[name]
+        print(
+            f"server {name.replace('_', ' ')} p50 {values['p50'] * 1000:.1f} ms, "
+            f"p95 {values['p95'] * 1000:.1f} ms, p99 {values['p99'] * 1000:.1f} ms"
+        )
+    print(
+        f"{stats['batches']} batches, {stats['requests'] / stats['batches']:.1f} "
+        "requests per batch"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure the wall time of cli invocations from process start to exit: --help, a
+single image, a single image found in the render cache, a single frame container,
+and a single image with an empty numba cache before and after precompiling.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+IMAGE = "tests/test_media/frame.jpg"
+DIMS = ["-dims", "40", "20"]
+
+
+def run_cli(args: list[str], env: dict[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "imgtobraille", *args],
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def main(repeat: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ)
+        cache = os.path.join(directory, "cache")
+        container_path = os.path.join(directory, "frame.brl")
+        # Warm up numba's cache and the render cache, and write the container.
+        run_cli([IMAGE, *DIMS, "-cache", cache], env)
+        run_cli([IMAGE, *DIMS, "-o", container_path], env)
+
+        cases = {
+            "--help": ["-h"],
+            "image": [IMAGE, *DIMS],
+            "image, render cache": [IMAGE, *DIMS, "-cache", cache],
+            "container": [container_path, *DIMS],
+        }
+        for name, args in cases.items():
+            timings = [run_cli(args, env) for _ in range(repeat)]
+            print(f"{name:>32}: {statistics.median(timings) * 1000:7.0f} ms")
+
+        timings = {"image, empty numba cache": [], "image, precompiled": []}
+        for index in range(repeat):
+            cold_env = dict(env, NUMBA_CACHE_DIR=os.path.join(directory, f"nb{index}"))
+            timings["image, empty numba cache"].append(
+                run_cli([IMAGE, *DIMS], cold_env)
+            )
+
+            precompiled_env = dict(
+                cold_env, NUMBA_CACHE_DIR=cold_env["NUMBA_CACHE_DIR"] + "p"
+            )
+            subprocess.run(
+                [sys.executable, "-m", "imgtobraille.precompile"],
+                env=precompiled_env,
+                check=True,
+                stderr=subprocess.DEVNULL,
+            )
+            timings["image, precompiled"].append(
+                run_cli([IMAGE, *DIMS], precompiled_env)
+            )
+        for name, values in timings.items():
+            print(f"{name:>32}: {statistics.median(values) * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,32 @@
+from __future__ import annotations
+
 import argparse
 import errno
 import os
 import shutil
+import sys
 import time
-from typing import Optional, Sequence
+from typing import Callable, Optional, Sequence
 
 import natsort
 
-from imgtobraille import arr_filters
-from imgtobraille import media_io
-from imgtobraille import render
+from imgtobraille import dither_methods
+from imgtobraille import instrument
+from imgtobraille import media_types
+from imgtobraille.lazy import lazy_import
+
+# numba and OpenCV take most of the startup time, and aren't needed for --help or
+# for showing frames that are already rendered.
+container = lazy_import("imgtobraille.container")
+frame_store = lazy_import("imgtobraille.frame_store")
+media_io = lazy_import("imgtobraille.media_io")
+pipeline = lazy_import("imgtobraille.pipeline")
+render = lazy_import("imgtobraille.render")
+render_cache = lazy_import("imgtobraille.render_cache")
+terminal = lazy_import("imgtobraille.terminal")
+
+DEFAULT_FPS: float = 25
+COLOR_MODES: tuple[str, ...] = ("truecolor", "256", "16")
 
 
 def initialize_args(*args: Optional[Sequence[str]]) -> argparse.Namespace:
@@ -41,13 +58,49 @@ def initialize_args(*args: Optional[Sequence[str]]) -> argparse.Namespace:
         type=float,
         help="error diffusion level, range 0-1. 0=no dithering, 1=full error diffusion.",
     )
+    parser.add_argument(
+        "-dither",
+        action="store",
+        metavar="method",
+        default="floyd-steinberg",
+        choices=dither_methods.DITHER_METHODS,
+        help=f"Dithering method: {', '.join(dither_methods.DITHER_METHODS)}. "
+        "Error diffusion only applies to floyd-steinberg, the others compare the "
+        "image to a threshold map, which is faster and flickers less in animations.",
+    )
+    parser.add_argument(
+        "-color",
+        action="store",
+        metavar="mode",
+        nargs="?",
+        const="truecolor",
+        default=None,
+        choices=COLOR_MODES,
+        help="Color the characters with the colors of the image. Color mode: "
+        f"{', '.join(COLOR_MODES)}, defaults to truecolor.",
+    )
+    parser.add_argument(
+        "-incremental",
+        action="store",
+        metavar="tolerance",
+        nargs="?",
+        const=dither_methods.CHANGE_TOLERANCE,
+        default=None,
+        type=int,
+        help="Dither only the bands of video frames that changed since the previous "
+        "frame, for video files with floyd-steinberg dithering. Much faster for "
+        "screen recordings and slides. Pixels that changed "
+        "by at most tolerance levels of 255 don't count as changed, defaults to "
+        f"{dither_methods.CHANGE_TOLERANCE} to ignore video compression noise.",
+    )
     parser.add_argument(
         "-fps",
         action="store",
         metavar="fps",
-        default=25,
+        default=None,
         type=float,
-        help="Fps for animation",
+        help="Fps for animation. Defaults to the fps of a video or container file "
+        f"or {DEFAULT_FPS}.",
     )
     parser.add_argument(
         "-p",
@@ -55,6 +108,84 @@ def initialize_args(*args: Optional[Sequence[str]]) -> argparse.Namespace:
         default=False,
         help="Whether to prerender all frames before animating.",
     )
+    parser.add_argument(
+        "-workers",
+        action="store",
+        metavar="workers",
+        default=0,
+        type=int,
+        help="Amount of processes for rendering frames. 0=all cpu cores.",
+    )
+    parser.add_argument(
+        "-chunksize",
+        action="store",
+        metavar="chunksize",
+        default=1,
+        type=int,
+        help="Amount of frames given to a rendering process at a time.",
+    )
+    parser.add_argument(
+        "-prefetch",
+        action="store",
+        metavar="frames",
+        default=16,
+        type=int,
+        help="Maximum amount of frames rendered ahead of the animation.",
+    )
+    parser.add_argument(
+        "-memory",
+        action="store",
+        metavar="megabytes",
+        default=0,
+        type=float,
+        help="Memory limit for rendered frames, least recently shown frames are "
+        "rendered again when needed. 0=no limit.",
+    )
+    parser.add_argument(
+        "-cache",
+        action="store",
+        metavar="directory",
+        nargs="?",
+        const=render_cache.default_cache_directory(),
+        default=None,
+        help="Reuse frames rendered earlier with the same settings from a cache "
+        f"directory. Defaults to {render_cache.default_cache_directory()}",
+    )
+    parser.add_argument(
+        "-o",
+        action="store",
+        metavar="output",
+        default=None,
+        help="Write the frames to a container file instead of showing them.",
+    )
+    parser.add_argument(
+        "-live",
+        action="store_true",
+        default=False,
+        help="Render a camera or stream live. The path is a camera device index "
+        "or a stream url.",
+    )
+    parser.add_argument(
+        "-latency",
+        action="store",
+        metavar="milliseconds",
+        default=40,
+        type=float,
+        help="Render time budget of a live frame. Lower resolution and faster "
+        "dithering are used while frames take longer to render.",
+    )
+    parser.add_argument(
+        "-stats",
+        action="store",
+        metavar="trace",
+        nargs="?",
+        const="",
+        default=None,
+        help="Print the time taken by each stage, shown and dropped frames every "
+        "second to stderr, and totals at the end. If a file is given, every stage "
+        "is also written to it as a JSON trace that chrome://tracing or "
+        "ui.perfetto.dev can open.",
+    )
     parsed_args = parser.parse_args([*args]) if args else parser.parse_args()
 
     if not 1 <= len(parsed_args.dims) <= 2:
@@ -63,6 +194,31 @@ def initialize_args(*args: Optional[Sequence[str]]) -> argparse.Namespace:
     if any(value < 0 for value in parsed_args.dims):
         msg = f'Argument "-dims" values must not be negative.'
         parser.error(msg)
+    if parsed_args.workers < 0:
+        parser.error('Argument "-workers" must not be negative.')
+    if parsed_args.chunksize < 1:
+        parser.error('Argument "-chunksize" must be at least 1.')
+    if parsed_args.prefetch < 1:
+        parser.error('Argument "-prefetch" must be at least 1.')
+    if parsed_args.fps is not None and parsed_args.fps <= 0:
+        parser.error('Argument "-fps" must be positive.')
+    if parsed_args.memory < 0:
+        parser.error('Argument "-memory" must not be negative.')
+    if parsed_args.incremental is not None and parsed_args.incremental < 0:
+        parser.error('Argument "-incremental" must not be negative.')
+    if parsed_args.latency <= 0:
+        parser.error('Argument "-latency" must be positive.')
+    if parsed_args.live and parsed_args.color is not None:
+        parser.error('Argument "-color" is not supported with "-live".')
+    if parsed_args.incremental is not None and (
+        parsed_args.live
+        or not media_types.is_video_file(parsed_args.PATH)
+        or parsed_args.dither != "floyd-steinberg"
+    ):
+        parser.error(
+            'Argument "-incremental" is only supported for video files with '
+            '"-dither floyd-steinberg", not with "-live", images or containers.'
+        )
 
     return parsed_args
 
@@ -78,23 +234,180 @@ def get_paths(path: str) -> list:
     return natsort.natsorted(paths)
 
 
-def renderer(args):
-    file, (image_width, image_height), dithering = args
-    arr = media_io.read_image_file(file, 0)
-    arr = arr_filters.fit_in_box(arr, image_width, image_height)
-    arr = arr_filters.fl_dithering(arr, quant_err_multiplier=dithering)
-    return render.render(arr)
+def write_bytes(output: bytes) -> None:
+    """Write encoded output to stdout in one write, after any text written before."""
+    sys.stdout.flush()
+    sys.stdout.buffer.write(output)
+    sys.stdout.buffer.flush()
+
+
+def print_frame(codes, colors=None, color_mode: render.ColorMode = "truecolor") -> None:
+    """Print a single frame."""
+    if colors is None:
+        output = render.codes_to_bytes(codes)
+    else:
+        output = render.colorize_codes_to_bytes(codes, colors, color_mode=color_mode)
+    write_bytes(output + b"\n")
+
+
+def show_frame(
+    encoder: terminal.FrameDiffEncoder,
+    codes,
+    colors=None,
+    stats: instrument.Stats = instrument.DISABLED,
+) -> None:
+    """Draw a frame over the previous one, redrawing only the changed characters."""
+    with stats.stage("encode"):
+        output = encoder.encode_bytes(codes, colors)
+    with stats.stage("write") as timer:
+        write_bytes(output)
+        timer.nbytes = len(output)
+    stats.frame()
+
+
+def animate(
+    get_frame: Callable[[int], frame_store.Frame],
+    frame_count: int,
+    clock: pipeline.FrameClock,
+    encoder: terminal.FrameDiffEncoder,
+    stats: instrument.Stats = instrument.DISABLED,
+) -> None:
+    """Loop the frames forever. Frames are read only when they are not dropped."""
+    while True:
+        for index in range(frame_count):
+            if clock.tick():
+                with stats.stage("load"):
+                    frame = get_frame(index)
+                show_frame(encoder, *frame, stats=stats)
+
+
+def play_container(
+    path: str, fps: Optional[float], stats: instrument.Stats = instrument.DISABLED
+) -> None:
+    """Show the frames of a container file."""
+    with container.ContainerReader(path) as reader:
+        color_mode = reader.color_mode or "truecolor"
+        if len(reader) == 1:
+            print_frame(*reader[0], color_mode)
+            return
+
+        sys.stdout.write(terminal.HIDE_CURSOR)
+        try:
+            animate(
+                reader.__getitem__,
+                len(reader),
+                pipeline.FrameClock(fps or reader.fps, stats),
+                terminal.FrameDiffEncoder(color_mode),
+                stats,
+            )
+        finally:
+            sys.stdout.write(terminal.SHOW_CURSOR + "\n")
+            sys.stdout.flush()
+
+
+def play_live(
+    source: str,
+    image_resolution: tuple[int, int],
+    dithering: float,
+    dither_method: dither_methods.DitherMethod,
+    budget: float,
+    stats: instrument.Stats = instrument.DISABLED,
+) -> None:
+    """
+    Render a camera or stream until it ends or is interrupted, always showing the
+    newest frame. Capture-to-print latency is reported at the end.
+    """
+    stream = media_io.VideoStream(int(source) if source.isdigit() else source)
+    if not stream.cap.isOpened():
+        raise ValueError(f"Could not open camera or stream {source}")
+    quality = pipeline.AdaptiveQuality(budget)
+    latency = pipeline.LatencyStats()
+    encoder = terminal.FrameDiffEncoder()
+
+    sys.stdout.write(terminal.HIDE_CURSOR)
+    with media_io.LatestFrameCapture(stream) as capture:
+        try:
+            for codes, captured_at in pipeline.render_live(
+                capture, image_resolution, dithering, dither_method, quality, stats
+            ):
+                stats.drop(capture.dropped - stats.dropped)
+                show_frame(encoder, codes, stats=stats)
+                latency.add(time.monotonic() - captured_at)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sys.stdout.write(terminal.SHOW_CURSOR + "\n")
+            sys.stdout.flush()
+            print(
+                f"{capture.captured} frame(s) captured, {capture.dropped} dropped, "
+                f"{latency.summary()}, final quality level {quality.level}",
+                file=sys.stderr,
+            )
+
+
+def play_video(
+    path: str,
+    image_resolution: tuple[int, int],
+    dithering: float,
+    dither_method: dither_methods.DitherMethod,
+    fps: Optional[float],
+    stats: instrument.Stats = instrument.DISABLED,
+    color_mode: Optional[str] = None,
+    incremental: bool = False,
+    tolerance: int = dither_methods.CHANGE_TOLERANCE,
+) -> None:
+    """
+    Play a video file in a loop, rendering every frame just before it is due.
+    Frames are skipped without decoding them when playback falls behind.
+    Frames are colored when a color mode is given.
+    """
+    video = media_io.VideoFile(path, color=color_mode is not None)
+    clock = pipeline.FrameClock(fps or video.frame_rate or DEFAULT_FPS, stats)
+    encoder = terminal.FrameDiffEncoder(color_mode or "truecolor")
+    sys.stdout.write(terminal.HIDE_CURSOR)
+    try:
+        while True:
+            shown = 0
+            for codes, colors in pipeline.render_video(
+                video,
+                image_resolution,
+                dithering,
+                dither_method,
+                clock,
+                stats,
+                incremental,
+                tolerance,
+            ):
+                show_frame(encoder, codes, colors, stats)
+                shown += 1
+            if not shown:
+                raise ValueError(f"No frames could be read from {path}")
+    finally:
+        sys.stdout.write(terminal.SHOW_CURSOR + "\n")
+        sys.stdout.flush()
 
 
 def main():
     args = initialize_args()
+    stats = instrument.DISABLED
+    if args.stats is not None:
+        stats = instrument.Stats(args.stats or None, report_interval=1.0)
+    try:
+        run(args, stats)
+    finally:
+        if stats.enabled:
+            stats.close()
+            print(f"Total: {stats.summary()}", file=sys.stderr)
+
+
+def run(args: argparse.Namespace, stats: instrument.Stats) -> None:
+    """Show or convert the path given in the cli arguments."""
+    if container.is_container(args.PATH):
+        play_container(args.PATH, args.fps, stats)
+        return
 
-    files = get_paths(args.PATH)
-    if not files:
-        raise ValueError(f"No file(s) found at {files}")
     arg_dimensions = args.dims
     dithering = args.e
-    frametime = 1 / args.fps
 
     missing_axes = 2 - len(arg_dimensions)
     arg_dimensions.extend([0] * missing_axes)
@@ -106,24 +419,99 @@ def main():
         ]
 
     image_resolution = (arg_dimensions[0] * 2, arg_dimensions[1] * 4)
+    if args.live:
+        play_live(
+            args.PATH,
+            image_resolution,
+            dithering,
+            args.dither,
+            args.latency / 1000,
+            stats,
+        )
+        return
+    colored = args.color is not None
+    if media_types.is_video_file(args.PATH):
+        if args.o is not None:
+            video = media_io.VideoFile(args.PATH, color=colored)
+            count = container.convert_video(
+                video,
+                args.o,
+                image_resolution,
+                dithering,
+                color_mode=args.color,
+                dither_method=args.dither,
+                incremental=args.incremental is not None,
+                tolerance=args.incremental or 0,
+            )
+            print(f"Wrote {count} frame(s) to {args.o}")
+        else:
+            play_video(
+                args.PATH,
+                image_resolution,
+                dithering,
+                args.dither,
+                args.fps,
+                stats,
+                args.color,
+                args.incremental is not None,
+                args.incremental or 0,
+            )
+        return
+
+    files = get_paths(args.PATH)
+    if not files:
+        raise ValueError(f"No file(s) found at {files}")
     frame_count = len(files)
-    frame_generator = (renderer((file, image_resolution, dithering)) for file in files)
-    if frame_count == 1:
-        print(next(frame_generator))
+    frame_generator = pipeline.render_files(
+        files,
+        image_resolution,
+        dithering,
+        args.workers,
+        args.chunksize,
+        args.cache,
+        args.dither,
+        stats,
+        colored,
+    )
+    if not colored:
+        frame_generator = ((codes, None) for codes in frame_generator)
+
+    def load_frame(index: int) -> frame_store.Frame:
+        task = (files[index], image_resolution, dithering, args.dither, args.cache)
+        if colored:
+            return pipeline.render_colored_file(task, stats)
+        return pipeline.render_file(task, stats), None
+
+    if args.o is not None:
+        count = container.write_frames(
+            args.o, frame_generator, args.fps or DEFAULT_FPS, args.color
+        )
+        print(f"Wrote {count} frame(s) to {args.o}")
+    elif frame_count == 1:
+        print_frame(*next(frame_generator), args.color or "truecolor")
+        stats.frame()
     elif frame_count > 1:
-        if args.p:
-            ready_frames = list(frame_generator)
-        else:
-            ready_frames = []
-            for frame in frame_generator:
-                print(frame)
-                time.sleep(frametime)
-                ready_frames.append(frame)
+        encoder = terminal.FrameDiffEncoder(args.color or "truecolor")
+        sys.stdout.write(terminal.HIDE_CURSOR)
+        ready_frames = frame_store.FrameStore(
+            loader=load_frame, max_bytes=int(args.memory * 2**20) or None
+        )
+        try:
+            clock = pipeline.FrameClock(args.fps or DEFAULT_FPS, stats)
+            if args.p:
+                for index, frame in enumerate(frame_generator):
+                    ready_frames.put(index, *frame)
+            else:
+                prefetch = pipeline.PrefetchQueue(frame_generator, args.prefetch)
+                for index, frame in enumerate(prefetch):
+                    ready_frames.put(index, *frame)
+                    if clock.tick(can_drop=prefetch.depth > 0):
+                        show_frame(encoder, *frame, stats=stats)
 
-        while True:
-            for frame in ready_frames:
-                print(frame)
-                time.sleep(frametime)
+            animate(ready_frames.get, frame_count, clock, encoder, stats)
+        finally:
+            sys.stdout.write(terminal.SHOW_CURSOR + "\n")
+            sys.stdout.flush()
     else:
         print("No frames were rendered.")
 
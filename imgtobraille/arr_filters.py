@@ -1,12 +1,25 @@
-from typing import Optional
+import functools
+import os
+from typing import Callable, Optional
 from typing import Union, Literal
 
 import numba as nb
 import numpy as np
 from cv2 import cv2
 
+from imgtobraille.dither_methods import (
+    DITHER_METHODS,
+    THRESHOLD_MAPS,
+    DitherMethod,
+    ThresholdMapName,
+)
+
+if "NUMBA_THREADING_LAYER_PRIORITY" not in os.environ:
+    # Frames are rendered in forked processes, and a process that forks after TBB
+    # has started its threads hangs on exit. Prefer the layers that survive forking.
+    nb.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+
 
-@nb.njit(cache=True)
 def _calculate_box_fitting_scaling_factor(
     arr: np.ndarray, max_width: Optional[int] = None, max_height: Optional[int] = None
 ) -> float:
@@ -36,31 +49,152 @@ def _calculate_box_fitting_scaling_factor(
     return scaling_factor
 
 
-def fit_in_box(
+def box_fitting_size(
     arr: np.ndarray, max_width: Optional[int] = None, max_height: Optional[int] = None
+) -> tuple[int, int]:
+    """
+    Width and height of arr scaled to fit in a box defined by max_width & max_height,
+    without changing the aspect ratio.
+    """
+    scaling_factor = _calculate_box_fitting_scaling_factor(arr, max_width, max_height)
+    image_height, image_width = arr.shape[:2]
+    return (
+        max(round(image_width * scaling_factor), 1),
+        max(round(image_height * scaling_factor), 1),
+    )
+
+
+def fit_in_box(
+    arr: np.ndarray,
+    max_width: Optional[int] = None,
+    max_height: Optional[int] = None,
+    interpolation: int = cv2.INTER_AREA,
 ) -> np.ndarray:
     """
     Scale a 2D numpy array so that it fits in a box defined by max_width & max_height.
     Aspect ratio will not be changed.
+    :param interpolation: cv2 interpolation flag. The default INTER_AREA averages the
+    pixels that are shrunk together, which avoids the aliasing of INTER_NEAREST.
     """
-    scaling_factor = _calculate_box_fitting_scaling_factor(arr, max_width, max_height)
-    return cv2.resize(
-        src=arr,
-        dsize=None,
-        fx=scaling_factor,
-        fy=scaling_factor,
-        interpolation=cv2.INTER_NEAREST,
-    )
+    return BoxResizer(max_width, max_height, interpolation)(arr)
 
 
-def rgb_to_grayscale(arr: np.ndarray) -> np.ndarray:
-    return cv2.cvtColor(arr, cv2.COLOR_BGR2GRAY)
+class BoxResizer:
+    """
+    Scale the frames of a stream to fit in a box like `fit_in_box`. The resize plan
+    is made only when the size of the frames changes, and the resized frames can be
+    written into the same array every time.
+
+    With INTER_AREA, frames that are shrunk to less than half of their size are
+    first shrunk by a whole factor, which OpenCV averages many times faster than
+    arbitrary factors, and then resized to the target size. Up to factor - 1 rows
+    and columns are cropped evenly from the edges for the whole factor to fit.
+    """
+
+    def __init__(
+        self,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+        interpolation: int = cv2.INTER_AREA,
+        reuse_buffer: bool = False,
+    ):
+        """
+        :param max_width: width of the box.
+        :param max_height: height of the box.
+        :param interpolation: cv2 interpolation flag, see `fit_in_box`.
+        :param reuse_buffer: resize every frame into the same array instead of
+        allocating new ones. Each returned frame is then overwritten by the next one.
+        """
+        if max_width is None and max_height is None:
+            raise ValueError("Must provide either width or height.")
+        self.max_width = max_width
+        self.max_height = max_height
+        self.interpolation = interpolation
+        self.reuse_buffer = reuse_buffer
+        self._source_shape: Optional[tuple[int, ...]] = None
+        self._size: tuple[int, int] = (0, 0)
+        self._reduction = 1
+        self._crop = (slice(None), slice(None))
+        self._reduced: Optional[np.ndarray] = None
+        self._buffer: Optional[np.ndarray] = None
+
+    def _plan(self, arr: np.ndarray) -> None:
+        """Calculate the target size and the whole factor to shrink by first."""
+        self._source_shape = arr.shape[:2]
+        self._size = box_fitting_size(arr, self.max_width, self.max_height)
+        height, width = arr.shape[:2]
+        self._reduction = 1
+        if self.interpolation == cv2.INTER_AREA:
+            self._reduction = max(
+                min(width // self._size[0], height // self._size[1]), 1
+            )
+        top, left = height % self._reduction // 2, width % self._reduction // 2
+        self._crop = (
+            slice(top, top + height - height % self._reduction),
+            slice(left, left + width - width % self._reduction),
+        )
+        self._reduced = None
+
+    def size(self, arr: np.ndarray) -> tuple[int, int]:
+        """Width and height that arr is resized to."""
+        if arr.shape[:2] != self._source_shape:
+            self._plan(arr)
+        return self._size
+
+    @staticmethod
+    def _resize(
+        arr: np.ndarray, size: tuple[int, int], buffer: Optional[np.ndarray], flag: int
+    ) -> np.ndarray:
+        """cv2.resize into buffer when it fits the result."""
+        if (
+            buffer is not None
+            and buffer.shape[1::-1] == size
+            and buffer.shape[2:] == arr.shape[2:]
+            and buffer.dtype == arr.dtype
+        ):
+            return cv2.resize(src=arr, dsize=size, dst=buffer, interpolation=flag)
+        return cv2.resize(src=arr, dsize=size, interpolation=flag)
+
+    def __call__(self, arr: np.ndarray) -> np.ndarray:
+        size = self.size(arr)
+        if self._reduction > 1:
+            cropped = arr[self._crop]
+            reduced_size = (
+                cropped.shape[1] // self._reduction,
+                cropped.shape[0] // self._reduction,
+            )
+            self._reduced = arr = self._resize(
+                cropped, reduced_size, self._reduced, cv2.INTER_AREA
+            )
+        resized = self._resize(arr, size, self._buffer, self.interpolation)
+        if self.reuse_buffer:
+            self._buffer = resized
+        return resized
+
+
+def rgb_to_grayscale(arr: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Calculate the luminance of an rgb array in a single pass.
+    :param arr: 3d rgb array, like the colored arrays of `media_io.read_image_file`.
+    :param out: optional 2d array to write the result into.
+    :return: 2d grayscale array.
+    """
+    return cv2.cvtColor(arr, cv2.COLOR_RGB2GRAY, dst=out)
+
+
+def bgr_to_grayscale(arr: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Same as `rgb_to_grayscale` for bgr arrays, like colored video frames."""
+    return cv2.cvtColor(arr, cv2.COLOR_BGR2GRAY, dst=out)
+
+
+DitherMode = Literal["serial", "wavefront", "bands", "incremental"]
 
 
 def fl_dithering(
     arr: np.ndarray,
     threshold: Union[int, float, Literal["mean"]] = 175,
     quant_err_multiplier: float = 0.8,
+    mode: DitherMode = "serial",
 ) -> np.ndarray:
     """
     Black/White Floyd–Steinberg dithering, heavy loops with numba.
@@ -71,41 +205,509 @@ def fl_dithering(
     :param quant_err_multiplier: Multiplies the quant error. Value below 1 reduces the
     amount of error distributed to nearby cells, which might result in more contrasted look.
     Value of 0 would disable error diffusion and dithering resulting in thresholding only.
+    :param mode: how the work is split between cpu cores, see `FloydSteinbergDitherer`.
     """
-    if threshold == "mean":
-        threshold = np.mean(arr)
-
-    # Must use bigger datatype than int8 to prevent integer overflow when
-    # diffusing error to cells with big values already.
-    padded = np.pad(array=arr, pad_width=1, mode="constant").astype("int16")
-    return _fl_dithering(
-        arr=padded,
-        threshold=threshold,
-        low=0,
-        high=255,
-        quant_err_multiplier=quant_err_multiplier,
-    )
+    ditherer = FloydSteinbergDitherer(threshold, quant_err_multiplier, mode)
+    return ditherer(arr)
+
+
+class FloydSteinbergDitherer:
+    """
+    Floyd–Steinberg dithering that keeps its int16 work buffer between calls, so that
+    dithering frames of the same size doesn't allocate a padded copy for every frame.
+
+    Modes:
+    - "serial": one core, pixel by pixel like in the original implementation.
+    - "wavefront": exact same output as "serial", using all cores. The image is split
+      into strips of rows that follow each other a few column blocks apart, so every
+      pixel still gets its error from the pixels before it.
+    - "bands": bands of rows are dithered independently on all cores. Every band
+      starts dithering `overlap` rows above itself to pick up the error of the band
+      above it, which leaves only small seams. Faster than "wavefront" and meant for
+      video, where the seams aren't noticeable.
+    - "incremental": for consecutive frames of a video. Bands of `strip_height` rows
+      are dithered like in "bands", but only the bands whose rows or overlap rows
+      changed since the previous frame, see `changed_blocks`. The dots of the other
+      bands are kept from the previous frame, and `dithered_rows` tells which rows
+      were dithered again. The output is the same as dithering the whole frame with
+      the same bands.
+    """
+
+    dithered_rows: Optional[np.ndarray]
+
+    def __init__(
+        self,
+        threshold: Union[int, float, Literal["mean"]] = 175,
+        quant_err_multiplier: float = 0.8,
+        mode: DitherMode = "serial",
+        strip_height: int = 32,
+        block_width: int = 64,
+        overlap: int = 8,
+        tolerance: int = 0,
+    ):
+        """
+        :param threshold: cutoff (from range 0-255) for whether a dot is on/off, or
+        "mean" for the mean of each dithered array.
+        :param quant_err_multiplier: see `fl_dithering`.
+        :param mode: "serial", "wavefront", "bands" or "incremental".
+        :param strip_height: rows per strip in the "wavefront" mode, the minimum
+        rows per band in the "bands" mode and the rows per band in the "incremental"
+        mode.
+        :param block_width: columns a strip advances at a time in the "wavefront" mode,
+        and the width of the blocks compared in the "incremental" mode.
+        :param overlap: rows dithered above every band in the "bands" and
+        "incremental" modes.
+        :param tolerance: largest difference of a pixel from the previous frame that
+        doesn't count as a change in the "incremental" mode.
+        """
+        if mode not in ("serial", "wavefront", "bands", "incremental"):
+            raise ValueError(f"Unknown dithering mode {mode!r}")
+        if strip_height < 1 or block_width < 1 or overlap < 0:
+            raise ValueError(
+                "strip_height and block_width must be positive and overlap must not "
+                "be negative"
+            )
+        if mode == "incremental" and threshold == "mean":
+            raise ValueError(
+                'The "mean" threshold changes with every frame, it can\'t be used '
+                'in the "incremental" mode'
+            )
+        self.threshold = threshold
+        self.quant_err_multiplier = quant_err_multiplier
+        self.mode = mode
+        self.strip_height = strip_height
+        self.block_width = block_width
+        self.overlap = overlap
+        self.tolerance = tolerance
+        self.dithered_rows = None
+        self._buffer = np.empty((0, 0), dtype=np.int16)
+        # The "incremental" mode's previous frame and its dots.
+        self._previous: Optional[np.ndarray] = None
+        self._dots: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        """Forget the previous frame, so that the next frame is dithered whole."""
+        self._previous = None
+        self._dots = None
+
+    def _get_buffer(self, shape: tuple[int, ...]) -> np.ndarray:
+        """Reuse the work buffer when the shape matches, otherwise replace it."""
+        if self._buffer.shape != shape:
+            # Must use bigger datatype than int8 to prevent integer overflow when
+            # diffusing error to cells with big values already.
+            self._buffer = np.zeros(shape, dtype=np.int16)
+        return self._buffer
+
+    def __call__(self, arr: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Dither a 2D array.
+        :param arr: array to dither, values from range 0-255.
+        :param out: optional uint8 array with the shape of arr to write the dots into.
+        :return: uint8 array of 0 and 255 values.
+        """
+        if arr.ndim != 2:
+            raise ValueError(f"Array input must be 2-Dimensional.")
+        if out is None:
+            out = np.empty(arr.shape, dtype=np.uint8)
+        elif out.shape != arr.shape:
+            raise ValueError(f"out must have the shape {arr.shape}, was {out.shape}")
+        threshold = np.mean(arr) if self.threshold == "mean" else self.threshold
+        height, width = arr.shape
+        if height == 0 or width == 0:
+            return out
+
+        if self.mode == "bands":
+            bands = min(nb.get_num_threads(), max(height // self.strip_height, 1))
+            band_height = -(-height // bands)
+            buffers = self._get_buffer(
+                (bands, self.overlap + band_height + 2, width + 2)
+            )
+            _fl_dithering_bands(
+                arr,
+                buffers,
+                out,
+                np.arange(bands),
+                band_height,
+                threshold,
+                0,
+                255,
+                self.quant_err_multiplier,
+            )
+            return out
+        if self.mode == "incremental":
+            out[...] = self._dither_changed_bands(arr, threshold)
+            return out
+
+        # The border only takes the error pushed over the edges and is never read,
+        # so it doesn't need to be cleared between calls.
+        buffer = self._get_buffer((height + 2, width + 2))
+        buffer[1:-1, 1:-1] = arr
+        if self.mode == "wavefront":
+            _fl_dithering_wavefront(
+                buffer,
+                threshold,
+                0,
+                255,
+                self.quant_err_multiplier,
+                self.strip_height,
+                self.block_width,
+            )
+        else:
+            _fl_dithering(buffer, threshold, 0, 255, self.quant_err_multiplier)
+        # Every pixel is set to either low or high, no clipping needed.
+        out[...] = buffer[1:-1, 1:-1]
+        return out
+
+    def _dither_changed_bands(self, arr: np.ndarray, threshold: float) -> np.ndarray:
+        """Dither the bands that changed since the previous frame into `_dots`."""
+        height, width = arr.shape
+        band_height = self.strip_height
+        bands = -(-height // band_height)
+        if self._previous is None or self._previous.shape != arr.shape:
+            self._previous = np.empty_like(arr)
+            self._dots = np.empty(arr.shape, dtype=np.uint8)
+            dirty = np.ones(bands, dtype=bool)
+        else:
+            changed = changed_blocks(
+                self._previous, arr, band_height, self.block_width, self.tolerance
+            ).any(axis=1)
+            # A band also depends on the overlap rows at the bottom of the bands
+            # above it.
+            dirty = changed.copy()
+            for shift in range(1, min(-(-self.overlap // band_height), bands - 1) + 1):
+                dirty[shift:] |= changed[:-shift]
+
+        self.dithered_rows = np.repeat(dirty, band_height)[:height]
+        selected = np.flatnonzero(dirty)
+        if len(selected):
+            buffers = self._get_buffer(
+                (bands, self.overlap + band_height + 2, width + 2)
+            )
+            _fl_dithering_bands(
+                arr,
+                buffers,
+                self._dots,
+                selected,
+                band_height,
+                threshold,
+                0,
+                255,
+                self.quant_err_multiplier,
+            )
+            # Unchanged rows keep the frame they were dithered from, so changes
+            # within the tolerance can't add up over many frames.
+            self._previous[self.dithered_rows] = arr[self.dithered_rows]
+        return self._dots
+
+
+def changed_blocks(
+    previous: np.ndarray,
+    current: np.ndarray,
+    block_height: int,
+    block_width: int,
+    tolerance: int = 0,
+) -> np.ndarray:
+    """
+    Find the blocks of a frame that changed from the previous frame.
+    :param previous: previous frame, 2d or 3d array.
+    :param current: current frame with the same shape and dtype as previous.
+    :param block_height: rows per block.
+    :param block_width: columns per block. Blocks at the bottom and right edges may
+    be smaller.
+    :param tolerance: largest difference of a value that doesn't count as a change.
+    :return: 2d bool array with a value for each block, True if any value in the
+    block differs by more than the tolerance.
+    """
+    difference = cv2.absdiff(previous, current)
+    if difference.ndim == 3:
+        difference = difference.max(axis=2)
+    height, width = difference.shape
+    rows, columns = -(-height // block_height), -(-width // block_width)
+    if (height, width) != (rows * block_height, columns * block_width):
+        padded = np.zeros(
+            (rows * block_height, columns * block_width), difference.dtype
+        )
+        padded[:height, :width] = difference
+        difference = padded
+    blocks = difference.reshape(rows, block_height, columns, block_width)
+    return blocks.max(axis=(1, 3)) > tolerance
+
+
+@nb.njit(cache=True, fastmath=True, inline="always")
+def _diffuse_pixel(
+    arr: np.ndarray,
+    y: int,
+    x: int,
+    threshold: float,
+    low: int,
+    high: int,
+    quant_err_multiplier: float,
+) -> None:
+    """Threshold a pixel of a padded array and diffuse its error to its neighbours."""
+    old_pixel = arr[y, x]
+    new_pixel = high if old_pixel > threshold else low
+    arr[y, x] = new_pixel
+    quant_error = (old_pixel - new_pixel) * quant_err_multiplier
+    arr[y, x + 1] += round(quant_error * 0.4375)
+    arr[y + 1, x - 1] += round(quant_error * 0.1875)
+    arr[y + 1, x] += round(quant_error * 0.3125)
+    arr[y + 1, x + 1] += round(quant_error * 0.0625)
 
 
 @nb.njit(cache=True, fastmath=True)
 def _fl_dithering(
     arr: np.ndarray, threshold: float, low: int, high: int, quant_err_multiplier: float
-) -> np.ndarray:
+) -> None:
     """Actual implementation for heavy loops of `fl_dithering` with numba."""
-    if len(arr.shape) > 2:
-        raise ValueError(f"Array input must be 2-Dimensional.")
-    height, width = arr.shape[:2]
+    height, width = arr.shape
     for y in range(1, height - 1):
         for x in range(1, width - 1):
-            old_pixel = arr[y, x]
-            new_pixel = high if old_pixel > threshold else low
-            arr[y, x] = new_pixel
-            quant_error = (old_pixel - new_pixel) * quant_err_multiplier
-            arr[y, x + 1] += round(quant_error * 0.4375)
-            arr[y + 1, x - 1] += round(quant_error * 0.1875)
-            arr[y + 1, x] += round(quant_error * 0.3125)
-            arr[y + 1, x + 1] += round(quant_error * 0.0625)
-    return np.clip(arr[1:-1, 1:-1], 0, 255)
+            _diffuse_pixel(arr, y, x, threshold, low, high, quant_err_multiplier)
+
+
+@nb.njit(cache=True, fastmath=True, parallel=True)
+def _fl_dithering_wavefront(
+    arr: np.ndarray,
+    threshold: float,
+    low: int,
+    high: int,
+    quant_err_multiplier: float,
+    strip_height: int,
+    block_width: int,
+) -> None:
+    """
+    `_fl_dithering` with strips of rows processed in parallel. A strip processes one
+    block of columns per step, every row 2 columns behind the row above it, so a
+    pixel's upper right neighbour is always done first. Each strip runs `lag` blocks
+    behind the strip above it, far enough that they never touch the same pixels.
+    """
+    height = arr.shape[0] - 2
+    width = arr.shape[1] - 2
+    strips = -(-height // strip_height)
+    blocks = -(-(width + 2 * (strip_height - 1)) // block_width)
+    lag = 1 + -(-(2 * strip_height + 2) // block_width)
+    for step in range(blocks + lag * (strips - 1)):
+        for strip in nb.prange(strips):
+            block = step - lag * strip
+            if block < 0 or block >= blocks:
+                continue
+            top = strip * strip_height
+            for row in range(min(strip_height, height - top)):
+                start = max(block * block_width - 2 * row, 0)
+                stop = min((block + 1) * block_width - 2 * row, width)
+                for x in range(start, stop):
+                    _diffuse_pixel(
+                        arr,
+                        top + row + 1,
+                        x + 1,
+                        threshold,
+                        low,
+                        high,
+                        quant_err_multiplier,
+                    )
+
+
+@nb.njit(cache=True, fastmath=True, parallel=True)
+def _fl_dithering_bands(
+    arr: np.ndarray,
+    buffers: np.ndarray,
+    out: np.ndarray,
+    bands: np.ndarray,
+    band_height: int,
+    threshold: float,
+    low: int,
+    high: int,
+    quant_err_multiplier: float,
+) -> None:
+    """
+    Dither the given bands of rows independently in parallel. Each band has its own
+    padded buffer with room for the overlap rows above it. Rows of the other bands
+    aren't written to out.
+    """
+    height, width = arr.shape
+    overlap = buffers.shape[1] - band_height - 2
+    for i in nb.prange(len(bands)):
+        top = bands[i] * band_height
+        bottom = min(top + band_height, height)
+        start = max(top - overlap, 0)
+        buffer = buffers[i]
+        for y in range(start, bottom):
+            for x in range(width):
+                buffer[y - start + 1, x + 1] = arr[y, x]
+        for y in range(1, bottom - start + 1):
+            for x in range(1, width + 1):
+                _diffuse_pixel(buffer, y, x, threshold, low, high, quant_err_multiplier)
+        for y in range(top, bottom):
+            for x in range(width):
+                out[y, x] = buffer[y - start + 1, x + 1]
+
+
+@functools.lru_cache(maxsize=None)
+def bayer_matrix(size: int) -> np.ndarray:
+    """
+    Bayer index matrix for ordered dithering, with every value from 0 to size**2 - 1.
+    :param size: width and height of the matrix, a power of two.
+    """
+    if size < 1 or size & (size - 1):
+        raise ValueError(f"Bayer matrix size must be a power of two, got {size}")
+    if size == 1:
+        return np.zeros((1, 1), dtype=np.int64)
+    smaller = 4 * bayer_matrix(size // 2)
+    return np.block([[smaller, smaller + 2], [smaller + 3, smaller + 1]])
+
+
+@functools.lru_cache(maxsize=None)
+def blue_noise_matrix(size: int = 64, sigma: float = 1.5, seed: int = 0) -> np.ndarray:
+    """
+    Blue noise index matrix for ordered dithering, made with the void-and-cluster
+    method. Every value from 0 to size**2 - 1 appears once, and the pixels with
+    nearby values are spread evenly over the matrix, which also tiles seamlessly.
+    :param size: width and height of the matrix.
+    :param sigma: standard deviation of the gaussian used for finding clusters and
+    voids, in pixels.
+    :param seed: seed of the random initial pattern.
+    """
+    distances = np.minimum(np.arange(size), size - np.arange(size)) ** 2
+    gaussian = np.exp(-(distances[:, np.newaxis] + distances) / (2 * sigma**2))
+
+    pattern = np.zeros((size, size), dtype=bool)
+    energy = np.zeros((size, size))
+
+    def toggle(index: int) -> None:
+        y, x = divmod(index, size)
+        pattern[y, x] = not pattern[y, x]
+        sign = 1 if pattern[y, x] else -1
+        energy[...] += sign * np.roll(gaussian, (y, x), axis=(0, 1))
+
+    def tightest_cluster() -> int:
+        return int(np.argmax(np.where(pattern, energy, -np.inf)))
+
+    def largest_void() -> int:
+        return int(np.argmin(np.where(pattern, np.inf, energy)))
+
+    rng = np.random.default_rng(seed)
+    for index in rng.choice(size * size, size * size // 10, replace=False):
+        toggle(index)
+    # Move pixels from the tightest clusters to the largest voids until even.
+    while True:
+        cluster = tightest_cluster()
+        toggle(cluster)
+        void = largest_void()
+        toggle(void)
+        if void == cluster:
+            break
+
+    ranks = np.empty(size * size, dtype=np.int64)
+    initial_pattern, initial_energy = pattern.copy(), energy.copy()
+    for rank in range(int(pattern.sum()) - 1, -1, -1):
+        cluster = tightest_cluster()
+        toggle(cluster)
+        ranks[cluster] = rank
+    pattern[...], energy[...] = initial_pattern, initial_energy
+    for rank in range(int(pattern.sum()), size * size):
+        void = largest_void()
+        toggle(void)
+        ranks[void] = rank
+    return ranks.reshape(size, size)
+
+
+@functools.lru_cache(maxsize=None)
+def threshold_map(name: ThresholdMapName) -> np.ndarray:
+    """
+    Threshold map for `ordered_dithering`. The thresholds are spread evenly over the
+    range 0-255, so the share of dots that are on matches the brightness of an area.
+    "threshold" is a single threshold at mid gray.
+    :param name: one of `THRESHOLD_MAPS`.
+    :return: read-only uint8 array.
+    """
+    if name == "threshold":
+        indices = np.zeros((1, 1), dtype=np.int64)
+    elif name == "blue-noise":
+        indices = blue_noise_matrix()
+    elif name in ("bayer2", "bayer4", "bayer8"):
+        indices = bayer_matrix(int(name[-1]))
+    else:
+        raise ValueError(f"Unknown threshold map {name!r}")
+    thresholds = ((indices + 0.5) * 256 / indices.size).astype(np.uint8)
+    thresholds.setflags(write=False)
+    return thresholds
+
+
+@functools.lru_cache(maxsize=8)
+def _tiled_threshold_map(name: ThresholdMapName, height: int, width: int) -> np.ndarray:
+    """Threshold map repeated to cover an array of the given shape."""
+    thresholds = threshold_map(name)
+    reps = (-(-height // thresholds.shape[0]), -(-width // thresholds.shape[1]))
+    tiled = np.ascontiguousarray(np.tile(thresholds, reps)[:height, :width])
+    tiled.setflags(write=False)
+    return tiled
+
+
+def ordered_dithering(
+    arr: np.ndarray,
+    method: ThresholdMapName = "bayer4",
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Black/White ordered dithering: a single comparison of the array against a tiled
+    threshold map. Unlike error diffusion, a pixel only depends on its own value, so
+    the dots of unchanged areas stay the same between video frames.
+    :param arr: 2D array to dither, values from range 0-255.
+    :param method: threshold map, one of `THRESHOLD_MAPS`.
+    :param out: optional uint8 array with the shape of arr to write the dots into.
+    :return: uint8 array of 0 and 255 values.
+    """
+    if arr.ndim != 2:
+        raise ValueError(f"Array input must be 2-Dimensional.")
+    if out is None:
+        out = np.empty(arr.shape, dtype=np.uint8)
+    elif out.shape != arr.shape or out.dtype != np.uint8:
+        raise ValueError(
+            f"out must be an uint8 array with the shape {arr.shape}, was "
+            f"{out.dtype} {out.shape}"
+        )
+    np.greater(arr, _tiled_threshold_map(method, *arr.shape), out=out.view(np.bool_))
+    out *= 255
+    return out
+
+
+def dither(
+    arr: np.ndarray, method: DitherMethod = "floyd-steinberg", diffusion: float = 0.8
+) -> np.ndarray:
+    """
+    Dither an array with any of the `DITHER_METHODS`.
+    :param arr: 2D array to dither, values from range 0-255.
+    :param method: "floyd-steinberg" or one of the `THRESHOLD_MAPS`.
+    :param diffusion: error diffusion level of "floyd-steinberg", see `fl_dithering`.
+    :return: uint8 array of 0 and 255 values.
+    """
+    if method == "floyd-steinberg":
+        return fl_dithering(arr, quant_err_multiplier=diffusion)
+    return ordered_dithering(arr, method)
+
+
+def get_ditherer(
+    method: DitherMethod = "floyd-steinberg",
+    diffusion: float = 0.8,
+    mode: DitherMode = "serial",
+    tolerance: int = 0,
+) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Dithering function for the frames of a stream, which reuses its work buffers.
+    :param method: "floyd-steinberg" or one of the `THRESHOLD_MAPS`.
+    :param diffusion: error diffusion level of "floyd-steinberg", see `fl_dithering`.
+    :param mode: how "floyd-steinberg" is split between cpu cores, see
+    `FloydSteinbergDitherer`.
+    :param tolerance: largest change of a pixel that isn't dithered again in the
+    "incremental" mode.
+    :return: function that takes a 2D array and returns an uint8 array of 0 and 255
+    values.
+    """
+    if method == "floyd-steinberg":
+        return FloydSteinbergDitherer(
+            quant_err_multiplier=diffusion, mode=mode, tolerance=tolerance
+        )
+    return functools.partial(ordered_dithering, method=method)
 
 
 def crop_edges(arr: np.ndarray, thresh: int = 1) -> np.ndarray:
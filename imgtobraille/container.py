@@ -0,0 +1,342 @@
+"""
+Binary container for rendered braille animations.
+
+All integers are little-endian. A file consists of a header, the frames and a
+frame index:
+
+    offset  size  field
+    0       4     magic b"BRLC"
+    4       2     format version, uint16
+    6       1     color mode, uint8: 0=none, 1=truecolor, 2=256 colors, 3=16 colors
+    7       1     reserved, zero
+    8       4     rows of braille characters per frame, uint32
+    12      4     columns of braille characters per frame, uint32
+    16      4     frame count, uint32
+    20      4     frames per second, float32
+    24      8     offset of the frame index, uint64
+
+Each frame is rows * columns bytes of braille dot bit masks (the code point of
+a character minus U+2800), in row-major order. With the truecolor mode the masks
+are followed by rows * columns * 3 bytes of rgb values, and with the palette
+modes by rows * columns bytes of palette values as returned by
+`render.quantize_colors`.
+
+The frame index is frame count uint64 offsets of the start of each frame, so
+frames can be read in any order without parsing the preceding ones.
+"""
+
+from __future__ import annotations
+
+import itertools
+import mmap
+import struct
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+import numpy as np
+
+from imgtobraille import dither_methods
+from imgtobraille import render
+from imgtobraille.lazy import lazy_import
+
+# Only needed for converting, playing a container doesn't import OpenCV.
+arr_filters = lazy_import("imgtobraille.arr_filters")
+media_io = lazy_import("imgtobraille.media_io")
+pipeline = lazy_import("imgtobraille.pipeline")
+
+MAGIC: bytes = b"BRLC"
+FORMAT_VERSION: int = 1
+HEADER: struct.Struct = struct.Struct("<4sHBxIIIfQ")
+COLOR_MODES: list[Optional[str]] = [None, "truecolor", "256", "16"]
+
+Frame = tuple[np.ndarray, Optional[np.ndarray]]
+
+
+def is_container(path: str) -> bool:
+    """Check whether a file starts with the container magic bytes."""
+    try:
+        with open(path, "rb") as file_obj:
+            return file_obj.read(len(MAGIC)) == MAGIC
+    except (IsADirectoryError, FileNotFoundError):
+        return False
+
+
+class ContainerWriter:
+    """Write frames to a container file. Use as a context manager or call close."""
+
+    rows: int
+    columns: int
+    fps: float
+    color_mode: Optional[render.ColorMode]
+
+    def __init__(
+        self,
+        path: str,
+        rows: int,
+        columns: int,
+        fps: float,
+        color_mode: Optional[render.ColorMode] = None,
+    ):
+        if color_mode not in COLOR_MODES:
+            raise ValueError(f"color_mode must be one of {COLOR_MODES}")
+        self.rows = rows
+        self.columns = columns
+        self.fps = fps
+        self.color_mode = color_mode
+        self._offsets: list[int] = []
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(self._header(index_offset=0))
+
+    def _header(self, index_offset: int) -> bytes:
+        return HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            COLOR_MODES.index(self.color_mode),
+            self.rows,
+            self.columns,
+            len(self._offsets),
+            self.fps,
+            index_offset,
+        )
+
+    def write(self, codes: np.ndarray, colors: Optional[np.ndarray] = None) -> None:
+        """
+        Append a frame.
+        :param codes: 2d array of braille dot bit masks in range 0-255.
+        :param colors: 3d array of rgb colors for each character. Required when the
+        container has a color mode, and ignored otherwise.
+        """
+        if codes.shape != (self.rows, self.columns):
+            raise ValueError(
+                f"Frame shape {codes.shape} does not match the container's "
+                f"{(self.rows, self.columns)}"
+            )
+        self._offsets.append(self._file.tell())
+        self._file.write(codes.astype(np.uint8).tobytes())
+        if self.color_mode is None:
+            return
+        if colors is None:
+            raise ValueError(
+                f"Container with color mode {self.color_mode} needs colors"
+            )
+        colors = np.clip(colors, 0, 255)
+        if self.color_mode != "truecolor":
+            colors = render.quantize_colors(colors, self.color_mode)
+        self._file.write(colors.astype(np.uint8).tobytes())
+
+    @property
+    def frame_count(self) -> int:
+        return len(self._offsets)
+
+    def close(self) -> None:
+        """Write the frame index and the final header."""
+        if self._file.closed:
+            return
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._offsets, dtype="<u8").tobytes())
+        self._file.seek(0)
+        self._file.write(self._header(index_offset))
+        self._file.close()
+
+    def __enter__(self) -> "ContainerWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class ContainerReader:
+    """
+    Memory-mapped reader of a container file. Frames are views into the mapped
+    file, so reading any frame is O(1) and only touches the pages of that frame.
+    """
+
+    rows: int
+    columns: int
+    fps: float
+    color_mode: Optional[render.ColorMode]
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file_obj:
+            self._mmap = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"Not a braille container file: {path}")
+        (
+            magic,
+            version,
+            color_mode,
+            self.rows,
+            self.columns,
+            frame_count,
+            self.fps,
+            index_offset,
+        ) = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"Not a braille container file: {path}")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported container version {version}: {path}")
+        self.color_mode = COLOR_MODES[color_mode]
+        self._buffer = np.frombuffer(self._mmap, dtype=np.uint8)
+        self._offsets = np.frombuffer(
+            self._mmap, dtype="<u8", count=frame_count, offset=index_offset
+        )
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> Frame:
+        """
+        Read a frame.
+        :return: braille dot bit masks as a 2d uint8 array, and a 3d uint8 array of
+        rgb colors or None. Palette colors are converted to their rgb values.
+        """
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Frame {index} out of range, container has {len(self)}")
+        offset = int(self._offsets[index])
+        cells = self.rows * self.columns
+        codes = self._buffer[offset : offset + cells].reshape(self.rows, self.columns)
+        if self.color_mode is None:
+            return codes, None
+
+        offset += cells
+        if self.color_mode == "truecolor":
+            colors = self._buffer[offset : offset + cells * 3]
+            return codes, colors.reshape(self.rows, self.columns, 3)
+        values = self._buffer[offset : offset + cells].reshape(self.rows, self.columns)
+        return codes, render.palette_colors(values, self.color_mode)
+
+    def __iter__(self) -> Iterator[Frame]:
+        return (self[index] for index in range(len(self)))
+
+    def close(self) -> None:
+        """
+        Release the memory map. If frames read earlier are still referenced, the map
+        is released when they are garbage collected instead.
+        """
+        self._buffer = self._offsets = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self) -> "ContainerReader":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def write_frames(
+    path: str,
+    frames: Iterable[Frame],
+    fps: float,
+    color_mode: Optional[render.ColorMode] = None,
+) -> int:
+    """
+    Write frames to a new container file. The dimensions are taken from the first frame.
+    :param path: path of the container file.
+    :param frames: braille dot bit masks and optional colors of each frame.
+    :param fps: frames per second of the animation.
+    :param color_mode: color mode of the container, None for no colors.
+    :return: amount of frames written.
+    """
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("No frames to write")
+    rows, columns = first[0].shape
+    with ContainerWriter(path, rows, columns, fps, color_mode) as writer:
+        writer.write(*first)
+        for frame in frames:
+            writer.write(*frame)
+        return writer.frame_count
+
+
+def convert_files(
+    files: list[str],
+    path: str,
+    image_resolution: tuple[int, int],
+    dithering: float,
+    fps: float,
+    workers: int = 0,
+    dither_method: arr_filters.DitherMethod = "floyd-steinberg",
+) -> int:
+    """
+    Render image files into a container file.
+    :param files: paths to image files, in frame order.
+    :param path: path of the container file.
+    :param image_resolution: width and height of the images in dots.
+    :param dithering: error diffusion level, see `arr_filters.fl_dithering`.
+    :param fps: frames per second of the animation.
+    :param workers: amount of rendering processes, see `pipeline.render_files`.
+    :param dither_method: dithering method, see `arr_filters.dither`.
+    :return: amount of frames written.
+    """
+    frames = pipeline.render_files(
+        files, image_resolution, dithering, workers, dither_method=dither_method
+    )
+    return write_frames(path, ((codes, None) for codes in frames), fps)
+
+
+def convert_video(
+    video: media_io.VideoFile,
+    path: str,
+    image_resolution: tuple[int, int],
+    dithering: float,
+    color_mode: Optional[render.ColorMode] = None,
+    batch_size: int = 32,
+    dither_method: arr_filters.DitherMethod = "floyd-steinberg",
+    incremental: bool = False,
+    tolerance: int = dither_methods.CHANGE_TOLERANCE,
+) -> int:
+    """
+    Render every frame of a video into a container file, using the video's frame rate.
+    :param video: video to convert. Must be opened with color=True when color_mode
+    is given.
+    :param path: path of the container file.
+    :param image_resolution: width and height of the frames in dots.
+    :param dithering: error diffusion level, see `arr_filters.fl_dithering`.
+    :param color_mode: color mode of the container, None for no colors.
+    :param batch_size: amount of frames rendered together with
+    `render.render_cells_batch`.
+    :param dither_method: dithering method, see `arr_filters.dither`.
+    :param incremental: dither only the bands of rows that changed since the
+    previous frame, see the "incremental" mode of `arr_filters.FloydSteinbergDitherer`.
+    :param tolerance: largest change of a pixel that doesn't count as a change with
+    incremental, so that codec noise doesn't dither still areas again.
+    :return: amount of frames written.
+    """
+    if color_mode is not None and not video.colored:
+        raise ValueError("Video must be opened with color=True for a color mode")
+
+    # Seams between the dithered bands aren't noticeable in moving frames.
+    ditherer = arr_filters.get_ditherer(
+        dither_method,
+        dithering,
+        mode="incremental" if incremental else "bands",
+        tolerance=tolerance,
+    )
+
+    # The colors of a batch are kept until the batch is rendered, so they can't
+    # share a buffer.
+    resize = arr_filters.BoxResizer(*image_resolution, reuse_buffer=color_mode is None)
+
+    def frames() -> Iterator[Frame]:
+        dots, colors = [], []
+        for frame in itertools.chain(video.iter_frames(reuse_buffer=True), [None]):
+            if frame is not None:
+                frame = resize(frame)
+                gray = arr_filters.bgr_to_grayscale(frame) if video.colored else frame
+                dots.append(ditherer(gray))
+                if color_mode is not None:
+                    colors.append(frame[..., ::-1])  # VideoFile frames are BGR
+            if len(dots) == batch_size or (frame is None and dots):
+                batch_codes, batch_colors = render.render_cells_batch(
+                    np.stack(dots), np.stack(colors) if colors else None
+                )
+                if batch_colors is None:
+                    yield from ((codes, None) for codes in batch_codes)
+                else:
+                    yield from zip(batch_codes, batch_colors)
+                dots, colors = [], []
+
+    return write_frames(path, frames(), video.frame_rate, color_mode)
@@ -0,0 +1,26 @@
+"""
+Names of the dithering methods, see `arr_filters.dither`, and defaults the cli
+shows. Kept apart from `arr_filters` so the cli can list them without importing
+numba and OpenCV.
+"""
+
+from typing import Literal
+
+ThresholdMapName = Literal["bayer2", "bayer4", "bayer8", "blue-noise", "threshold"]
+THRESHOLD_MAPS: tuple[ThresholdMapName, ...] = (
+    "bayer2",
+    "bayer4",
+    "bayer8",
+    "blue-noise",
+    "threshold",
+)
+DitherMethod = Literal[
+    "floyd-steinberg", "bayer2", "bayer4", "bayer8", "blue-noise", "threshold"
+]
+DITHER_METHODS: tuple[DitherMethod, ...] = ("floyd-steinberg", *THRESHOLD_MAPS)
+
+# Largest difference of a pixel from the previous video frame that isn't dithered
+# again by the "incremental" mode of `arr_filters.FloydSteinbergDitherer`. Video
+# codecs change the pixels of still areas by a few levels from frame to frame, which
+# would otherwise count as a change almost everywhere.
+CHANGE_TOLERANCE: int = 8
@@ -0,0 +1,112 @@
+import zlib
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+Frame = tuple[np.ndarray, Optional[np.ndarray]]
+
+
+class FrameStore:
+    """
+    Compact in-memory storage for rendered frames. Braille characters are stored as
+    one byte per cell and colors as three bytes per cell, optionally compressed with
+    zlib, and expanded back to arrays only when a frame is read.
+
+    When `max_bytes` is given, the least recently used frames are evicted to stay
+    below it. Evicted frames are rendered again with `loader` when they are read.
+    """
+
+    max_bytes: Optional[int]
+    compress: bool
+    nbytes: int
+    evictions: int
+    reloads: int
+
+    def __init__(
+        self,
+        loader: Optional[Callable[[int], Frame]] = None,
+        max_bytes: Optional[int] = None,
+        compress: bool = True,
+    ):
+        """
+        :param loader: function that renders the frame with the given index again,
+        returning the braille dot bit masks and optional colors.
+        :param max_bytes: memory limit for the stored frames. None for no limit.
+        :param compress: whether to compress the frames with zlib.
+        """
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError(f"max_bytes must not be negative, got {max_bytes}")
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.nbytes = 0
+        self.evictions = 0
+        self.reloads = 0
+        self._frames: OrderedDict[int, tuple[bytes, tuple[int, int], bool]] = (
+            OrderedDict()
+        )
+
+    def _encode(self, codes: np.ndarray, colors: Optional[np.ndarray]) -> bytes:
+        data = codes.astype(np.uint8).tobytes()
+        if colors is not None:
+            data += np.clip(colors, 0, 255).astype(np.uint8).tobytes()
+        if self.compress:
+            data = zlib.compress(data, 1)
+        return data
+
+    def _decode(self, data: bytes, shape: tuple[int, int], colored: bool) -> Frame:
+        if self.compress:
+            data = zlib.decompress(data)
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        cells = shape[0] * shape[1]
+        codes = buffer[:cells].reshape(shape)
+        colors = buffer[cells:].reshape(*shape, 3) if colored else None
+        return codes, colors
+
+    def put(
+        self, index: int, codes: np.ndarray, colors: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Store a frame, evicting least recently used frames if the memory limit is
+        exceeded. The stored frame itself is never evicted by its own insertion.
+        :param index: index of the frame.
+        :param codes: 2d array of braille dot bit masks in range 0-255.
+        :param colors: optional 3d array of rgb colors for each character.
+        """
+        self.discard(index)
+        data = self._encode(codes, colors)
+        self._frames[index] = (data, codes.shape, colors is not None)
+        self.nbytes += len(data)
+
+        if self.max_bytes is not None:
+            while self.nbytes > self.max_bytes and len(self._frames) > 1:
+                evicted_index, _ = next(iter(self._frames.items()))
+                self.discard(evicted_index)
+                self.evictions += 1
+
+    def get(self, index: int) -> Frame:
+        """
+        Read a frame, rendering it again with `loader` if it has been evicted.
+        :return: braille dot bit masks as a 2d uint8 array and a 3d uint8 array of
+        colors or None.
+        """
+        if index not in self._frames:
+            if self.loader is None:
+                raise KeyError(index)
+            self.reloads += 1
+            self.put(index, *self.loader(index))
+        self._frames.move_to_end(index)
+        return self._decode(*self._frames[index])
+
+    def discard(self, index: int) -> None:
+        """Remove a frame from the store if it is stored."""
+        if index in self._frames:
+            data, _, _ = self._frames.pop(index)
+            self.nbytes -= len(data)
+
+    def __contains__(self, index: int) -> bool:
+        return index in self._frames
+
+    def __len__(self) -> int:
+        return len(self._frames)
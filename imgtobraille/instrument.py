@@ -0,0 +1,299 @@
+"""
+Per-stage timing and counters for finding the bottleneck of a playback.
+
+Code that does the work wraps each stage in `Stats.stage` and reports shown and
+dropped frames. Functions take a `stats` argument that defaults to `DISABLED`,
+whose methods do nothing, so instrumentation costs a method call per stage when
+it is not used.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional, TextIO, TypeVar
+
+T = TypeVar("T")
+
+# Called with the stage name, its wall time in seconds and its output bytes after
+# every stage, and with "drop", 0 and 0 for every dropped frame.
+Hook = Callable[[str, float, int], None]
+
+
+class StageStats:
+    """Totals of a stage."""
+
+    __slots__ = ("count", "seconds", "max_seconds", "bytes")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.bytes = 0
+
+    def add(self, seconds: float, nbytes: int) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.bytes += nbytes
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "seconds": self.seconds,
+            "max_seconds": self.max_seconds,
+            "bytes": self.bytes,
+        }
+
+
+def _format_summary(
+    stages: dict[str, StageStats], frames: int, dropped: int, elapsed: float
+) -> str:
+    parts = []
+    for name, stage in stages.items():
+        part = (
+            f"{name} {stage.seconds / stage.count * 1000:.2f} ms "
+            f"(max {stage.max_seconds * 1000:.2f})"
+        )
+        if stage.bytes:
+            part += f" {stage.bytes / elapsed / 2**20:.2f} MiB/s"
+        parts.append(part)
+    parts.append(f"{frames / max(elapsed, 1e-9):.1f} frames/s, {dropped} dropped")
+    return ", ".join(parts)
+
+
+class _StageTimer:
+    """Context manager that records the wall time of a stage when it exits."""
+
+    __slots__ = ("stats", "name", "nbytes", "start")
+
+    def __init__(self, stats: "Stats", name: str):
+        self.stats = stats
+        self.name = name
+        self.nbytes = 0
+
+    def __enter__(self) -> "_StageTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stats.record(
+            self.name, time.perf_counter() - self.start, self.nbytes, self.start
+        )
+
+
+class Stats:
+    """
+    Collect the wall time, call count and output bytes of each stage, and the
+    amount of shown and dropped frames. Optionally writes every stage as an event
+    to a JSON trace in the Chrome trace event format, which can be opened with
+    chrome://tracing or https://ui.perfetto.dev, and prints a summary of the last
+    interval to report_file every report_interval seconds. Safe to use from
+    several threads.
+    """
+
+    enabled: bool = True
+    frames: int
+    dropped: int
+    stages: dict[str, StageStats]
+
+    def __init__(
+        self,
+        trace_path: Optional[str] = None,
+        hooks: Iterable[Hook] = (),
+        report_interval: Optional[float] = None,
+        report_file: Optional[TextIO] = None,
+    ):
+        """
+        :param trace_path: file to write the JSON trace to, None for no trace.
+        :param hooks: functions called after every stage and dropped frame.
+        :param report_interval: seconds between printed summaries, None to not
+        print them.
+        :param report_file: text stream the summaries are printed to, defaults to
+        stderr.
+        """
+        self.frames = 0
+        self.dropped = 0
+        self.stages = {}
+        self.hooks = list(hooks)
+        self.report_interval = report_interval
+        self.report_file = report_file
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        # Totals since the last printed summary.
+        self._window_frames = 0
+        self._window_dropped = 0
+        self._window_stages: dict[str, StageStats] = {}
+        self._window_started = self._started
+        self._trace: Optional[TextIO] = None
+        if trace_path is not None:
+            self._trace = open(trace_path, "w")
+            self._trace.write("[")
+            self._trace_separator = ""
+
+    def stage(self, name: str) -> _StageTimer:
+        """
+        Time a stage with a with statement. Set `nbytes` of the returned timer to
+        record the size of the stage's output.
+        """
+        return _StageTimer(self, name)
+
+    def iterate(self, iterable: Iterable[T], name: str) -> Iterator[T]:
+        """Yield the items of iterable, recording the time taken to get each item."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.record(name, time.perf_counter() - start, 0, start)
+            yield item
+
+    def record(
+        self, name: str, seconds: float, nbytes: int = 0, start: Optional[float] = None
+    ) -> None:
+        """
+        Record a stage that was timed elsewhere.
+        :param name: name of the stage.
+        :param seconds: wall time of the stage.
+        :param nbytes: size of the stage's output in bytes.
+        :param start: `time.perf_counter` time the stage started at, for the trace.
+        """
+        with self._lock:
+            self._stage_stats(self.stages, name).add(seconds, nbytes)
+            if self.report_interval:
+                self._stage_stats(self._window_stages, name).add(seconds, nbytes)
+            if self._trace is not None:
+                if start is None:
+                    start = time.perf_counter() - seconds
+                self._write_event(
+                    name=name,
+                    ph="X",
+                    ts=(start - self._started) * 1e6,
+                    dur=seconds * 1e6,
+                    args={"bytes": nbytes},
+                )
+        for hook in self.hooks:
+            hook(name, seconds, nbytes)
+
+    def drop(self, count: int = 1) -> None:
+        """Record dropped frames."""
+        if count <= 0:
+            return
+        with self._lock:
+            self.dropped += count
+            self._window_dropped += count
+            if self._trace is not None:
+                timestamp = (time.perf_counter() - self._started) * 1e6
+                self._write_event(
+                    name="drop", ph="i", ts=timestamp, s="t", args={"count": count}
+                )
+        for hook in self.hooks:
+            for _ in range(count):
+                hook("drop", 0.0, 0)
+
+    def frame(self) -> None:
+        """Record a shown frame, printing a summary if the report interval passed."""
+        with self._lock:
+            self.frames += 1
+            self._window_frames += 1
+            now = time.perf_counter()
+            if not self.report_interval or (
+                now - self._window_started < self.report_interval
+            ):
+                return
+            summary = _format_summary(
+                self._window_stages,
+                self._window_frames,
+                self._window_dropped,
+                now - self._window_started,
+            )
+            self._window_frames, self._window_dropped = 0, 0
+            self._window_stages = {}
+            self._window_started = now
+        print(summary, file=self.report_file or sys.stderr, flush=True)
+
+    @staticmethod
+    def _stage_stats(stages: dict[str, StageStats], name: str) -> StageStats:
+        stage = stages.get(name)
+        if stage is None:
+            stage = stages[name] = StageStats()
+        return stage
+
+    def _write_event(self, **event) -> None:
+        event.update(pid=os.getpid(), tid=threading.get_ident())
+        self._trace.write(self._trace_separator + "\n" + json.dumps(event))
+        self._trace_separator = ","
+
+    def summary(self) -> str:
+        """
+        Mean and max wall time of each stage, output bytes per second of the
+        stages that have output, the rate of shown frames and the dropped frames
+        since the start.
+        """
+        with self._lock:
+            elapsed = time.perf_counter() - self._started
+            return _format_summary(self.stages, self.frames, self.dropped, elapsed)
+
+    def as_dict(self) -> dict:
+        """Totals since the start as a JSON serializable dict."""
+        with self._lock:
+            return {
+                "seconds": time.perf_counter() - self._started,
+                "frames": self.frames,
+                "dropped": self.dropped,
+                "stages": {name: s.as_dict() for name, s in self.stages.items()},
+            }
+
+    def close(self) -> None:
+        """Finish the JSON trace."""
+        with self._lock:
+            if self._trace is not None and not self._trace.closed:
+                self._trace.write("\n]\n")
+                self._trace.close()
+
+    def __enter__(self) -> "Stats":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class _NullTimer:
+    __slots__ = ("nbytes",)
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+
+class NullStats(Stats):
+    """Stats that records nothing, for when instrumentation is disabled."""
+
+    enabled = False
+
+    def __init__(self):
+        super().__init__()
+        self._timer = _NullTimer()
+
+    def stage(self, name: str) -> _NullTimer:
+        return self._timer
+
+    def iterate(self, iterable: Iterable[T], name: str) -> Iterator[T]:
+        return iter(iterable)
+
+    def record(self, name, seconds, nbytes=0, start=None) -> None:
+        pass
+
+    def drop(self, count: int = 1) -> None:
+        pass
+
+    def frame(self) -> None:
+        pass
+
+
+DISABLED: Stats = NullStats()
@@ -0,0 +1,33 @@
+"""
+Deferred imports for modules that are slow to import. The cli imports numba and
+OpenCV only for the paths that use them, so that --help, argument errors and
+showing already rendered frames start quickly.
+"""
+
+import importlib.util
+import sys
+import types
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Import a module when one of its attributes is first accessed. Returns the module
+    right away if it is already imported. Annotations that refer to the module must
+    not be evaluated at import time, see `from __future__ import annotations`.
+    :param name: absolute name of the module.
+    :return: the module, which is loaded on first attribute access.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
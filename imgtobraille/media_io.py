@@ -1,45 +1,341 @@
 from __future__ import annotations
 
+import concurrent.futures
+import http.client
+import io
 import os
-from typing import Optional, Union, Generator
+import struct
+import threading
+import time
+from typing import BinaryIO, Iterable, Iterator, Optional, Union, Generator
 
 import numpy as np
 from cv2 import cv2
+import urllib.error
+import urllib.parse
 import urllib.request
 
+from imgtobraille.media_types import VIDEO_EXTENSIONS, is_video_file
 
-def read_image_url(url: str, mode: int = 0) -> np.ndarray:
+_REDUCED_READ_FLAGS = {
+    (0, 2): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (0, 4): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (0, 8): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    (1, 2): cv2.IMREAD_REDUCED_COLOR_2,
+    (1, 4): cv2.IMREAD_REDUCED_COLOR_4,
+    (1, 8): cv2.IMREAD_REDUCED_COLOR_8,
+}
+# Errors of a kept-alive connection that the server closed while it was idle.
+_CLOSED_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Same as urllib.request.HTTPRedirectHandler.
+_MAX_REDIRECTS = 10
+# JPEG start of frame markers, which hold the image size.
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(file: BinaryIO) -> Optional[tuple[int, int]]:
+    """
+    Read the width and height of a JPEG image from its header, without decoding it.
+    :param file: binary file positioned at the start of the image.
+    :return: width and height, or None if the file isn't a JPEG image.
+    """
+    if file.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        header = file.read(4)
+        if len(header) < 4 or header[0] != 0xFF:
+            return None
+        marker, length = header[1], struct.unpack(">H", header[2:])[0]
+        if marker in _JPEG_SOF_MARKERS:
+            frame_header = file.read(5)
+            if len(frame_header) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame_header[1:])
+            return width, height
+        file.seek(length - 2, io.SEEK_CUR)
+
+
+def reduced_read_flag(
+    mode: int,
+    size: Optional[tuple[int, int]],
+    max_width: Optional[int] = None,
+    max_height: Optional[int] = None,
+) -> int:
+    """
+    cv2 imread flag that decodes an image at the smallest of 1/2, 1/4 and 1/8 of its
+    size that still covers the image fitted in the box defined by max_width and
+    max_height, see `arr_filters.fit_in_box`. JPEG images are decoded at the reduced
+    size directly, other formats are decoded fully and then reduced.
+    :param mode: 0 for grayscale, 1 for colored.
+    :param size: width and height of the image, None if unknown.
+    :param max_width: width of the box, None for no limit.
+    :param max_height: height of the box, None for no limit.
+    :return: IMREAD_REDUCED_* flag, or IMREAD_GRAYSCALE/IMREAD_COLOR for full size.
+    """
+    full_size_flag = [cv2.IMREAD_GRAYSCALE, cv2.IMREAD_COLOR][mode]
+    if size is None or (max_width is None and max_height is None):
+        return full_size_flag
+
+    def reduction_limit(width: int, height: int) -> float:
+        return max(
+            width / max_width if max_width else 0,
+            height / max_height if max_height else 0,
+        )
+
+    # Decoding applies EXIF orientation, which may swap the width and height.
+    limit = min(reduction_limit(*size), reduction_limit(*size[::-1]))
+    for factor in (8, 4, 2):
+        if factor <= limit:
+            return _REDUCED_READ_FLAGS[mode, factor]
+    return full_size_flag
+
+
+def read_image_url(
+    url: str,
+    mode: int = 0,
+    max_width: Optional[int] = None,
+    max_height: Optional[int] = None,
+) -> np.ndarray:
     """
     Read image file form an url to a numpy array.
     :param url: url pointing to an image file.
     :param mode: 0 for grayscale, 1 for colored.
+    :param max_width: width of the box the image will be fitted in, see
+    `read_image_file`.
+    :param max_height: height of the box the image will be fitted in.
     :return: 2d array for grayscale image, 3d array for colored image.
     """
     response = urllib.request.urlopen(url)
-    content = response.read()
+    return decode_image(response.read(), mode, max_width, max_height, f"url {url}")
 
-    original_array = np.asarray(bytearray(content), dtype=np.uint8)
-    array = cv2.imdecode(original_array, mode)
+
+def decode_image(
+    content: bytes,
+    mode: int = 0,
+    max_width: Optional[int] = None,
+    max_height: Optional[int] = None,
+    source: str = "buffer",
+) -> np.ndarray:
+    """
+    Decode an encoded image file in memory to a numpy array. The data is decoded
+    from a view of content, without copying it.
+    :param content: contents of an image file.
+    :param mode: 0 for grayscale, 1 for colored.
+    :param max_width: width of the box the image will be fitted in, see
+    `read_image_file`.
+    :param max_height: height of the box the image will be fitted in.
+    :param source: where the data came from, for the error message.
+    :return: 2d array for grayscale image, 3d array for colored image.
+    """
+    flag = reduced_read_flag(
+        mode, jpeg_size(io.BytesIO(content)), max_width, max_height
+    )
+    array = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), flag)
     if array is None:
-        raise ValueError(f"Could not decode image data from url {url}")
+        raise ValueError(f"Could not decode image data from {source}")
     return array
 
 
-def read_image_file(path: str, mode: int = 0) -> np.ndarray:
+class URLImageLoader:
+    """
+    Fetch and decode images from urls concurrently with a pool of threads. Each
+    thread keeps one connection alive per host, so a batch of images from the same
+    server skips the TCP and TLS handshakes after the first request of a thread.
+    Use as a context manager or call close.
+    """
+
+    workers: int
+    timeout: float
+
+    def __init__(self, workers: int = 8, timeout: float = 30):
+        """
+        :param workers: maximum amount of concurrent requests.
+        :param timeout: socket timeout of a request in seconds.
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers)
+        self._local = threading.local()
+        self._connections: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        connections = self._local.__dict__.setdefault("connections", {})
+        connection = connections.get((scheme, netloc))
+        if connection is None:
+            if scheme == "https":
+                connection = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            elif scheme == "http":
+                connection = http.client.HTTPConnection(netloc, timeout=self.timeout)
+            else:
+                raise ValueError(f"Unsupported url scheme {scheme!r}")
+            connections[scheme, netloc] = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _discard_connection(self, scheme: str, netloc: str) -> None:
+        connection = self._local.connections.pop((scheme, netloc))
+        connection.close()
+        with self._lock:
+            self._connections.remove(connection)
+
+    def _get(self, url: str) -> tuple[http.client.HTTPResponse, bytes]:
+        parts = urllib.parse.urlsplit(url)
+        target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        while True:
+            connection = self._connection(parts.scheme, parts.netloc)
+            reused = connection.sock is not None
+            try:
+                connection.request("GET", target)
+                response = connection.getresponse()
+                return response, response.read()
+            except BaseException as error:
+                # A connection left mid-request can't send the next request, so it
+                # is replaced after any error. A server may also close an idle
+                # kept-alive connection at any time, the request is then retried
+                # on a new connection.
+                self._discard_connection(parts.scheme, parts.netloc)
+                if not (reused and isinstance(error, _CLOSED_CONNECTION_ERRORS)):
+                    raise
+
+    def fetch(self, url: str) -> bytes:
+        """
+        Read the body of an url with a kept-alive connection of the calling thread.
+        Redirects are followed like with `urllib.request.urlopen`.
+        :raises urllib.error.HTTPError: if the final response status isn't 200.
+        """
+        for _ in range(_MAX_REDIRECTS + 1):
+            response, content = self._get(url)
+            location = response.getheader("Location")
+            if response.status not in _REDIRECT_STATUSES or location is None:
+                break
+            url = urllib.parse.urljoin(url, location)
+        if response.status != 200:
+            raise urllib.error.HTTPError(
+                url, response.status, response.reason, response.headers, None
+            )
+        return content
+
+    def read_image(
+        self,
+        url: str,
+        mode: int = 0,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+    ) -> np.ndarray:
+        """Fetch and decode an image, see `read_image_url`."""
+        content = self.fetch(url)
+        return decode_image(content, mode, max_width, max_height, f"url {url}")
+
+    def iter_images(
+        self,
+        urls: Iterable[str],
+        mode: int = 0,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+    ) -> Iterator[tuple[str, np.ndarray]]:
+        """
+        Fetch and decode images concurrently, yielding them as they complete. At
+        most twice the amount of workers images are requested ahead of the
+        consumer, and urls is consumed lazily, so any amount of urls can be given.
+        Errors are raised when the failed image would have been yielded, and the
+        images not yet requested are then skipped.
+        :param urls: urls pointing to image files.
+        :param mode: 0 for grayscale, 1 for colored.
+        :param max_width: width of the box the images will be fitted in, see
+        `read_image_file`.
+        :param max_height: height of the box the images will be fitted in.
+        :return: url and 2d array for grayscale image, 3d array for colored image.
+        """
+        urls = iter(urls)
+        pending: dict[concurrent.futures.Future, str] = {}
+        try:
+            while True:
+                for url in urls:
+                    future = self._executor.submit(
+                        self.read_image, url, mode, max_width, max_height
+                    )
+                    pending[future] = url
+                    if len(pending) >= self.workers * 2:
+                        break
+                if not pending:
+                    return
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self) -> None:
+        """Wait for running requests and close the kept-alive connections."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+    def __enter__(self) -> URLImageLoader:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def read_image_urls(
+    urls: Iterable[str],
+    mode: int = 0,
+    max_width: Optional[int] = None,
+    max_height: Optional[int] = None,
+    workers: int = 8,
+) -> Iterator[tuple[str, np.ndarray]]:
+    """
+    Read image files from urls concurrently, yielding them in completion order.
+    See `URLImageLoader.iter_images`.
+    :param workers: maximum amount of concurrent requests.
+    :return: url and 2d array for grayscale image, 3d array for colored image.
+    """
+    with URLImageLoader(workers) as loader:
+        yield from loader.iter_images(urls, mode, max_width, max_height)
+
+
+def read_image_file(
+    path: str,
+    mode: int = 0,
+    max_width: Optional[int] = None,
+    max_height: Optional[int] = None,
+) -> np.ndarray:
     """
     Read image file to a numpy array.
     :param path:  Path to an image file.
     :param mode: 0 for grayscale, 1 for colored.
+    :param max_width: width of the box the image will be fitted in. When given
+    with or without max_height, large JPEG images are decoded at a reduced size
+    that still covers the box, see `reduced_read_flag`.
+    :param max_height: height of the box the image will be fitted in.
     :return: 2d array for grayscale image, 3d array for colored image.
     """
     if not os.path.isfile(path):
         raise FileNotFoundError(path)
 
-    mode = [cv2.IMREAD_GRAYSCALE, cv2.IMREAD_COLOR][mode]
-    arr = cv2.imread(path, mode)
+    size = None
+    if max_width is not None or max_height is not None:
+        with open(path, "rb") as file:
+            size = jpeg_size(file)
+    arr = cv2.imread(path, reduced_read_flag(mode, size, max_width, max_height))
     if arr is None:
         raise ValueError(f"Image could not be read, cv2.imread returned None for: {path}")
-    if mode == cv2.IMREAD_COLOR:
+    if mode == 1:
         arr = cv2.cvtColor(arr, cv2.COLOR_BGR2RGB)
     return arr
 
@@ -52,6 +348,7 @@ class VideoStream:
         self.colored = color
         self.source = source
         self.cap = cv2.VideoCapture(source)
+        self._color_buffer: Optional[np.ndarray] = None
 
     @property
     def source_height(self) -> int:
@@ -65,11 +362,27 @@ class VideoStream:
     def current_frame(self) -> int:
         return self.cap.get(cv2.CAP_PROP_POS_FRAMES)
 
-    def read_frame(self) -> Optional[np.ndarray]:
-        flag, frame = self.cap.read()
-        if flag and not self.colored:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        return frame
+    def read_frame(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Read the next frame.
+        :param out: optional array to decode the frame into, must have the shape and
+        dtype of the frames. Grayscale frames also reuse an internal color buffer.
+        :return: the frame, or None when there are no more frames.
+        """
+        if out is None:
+            flag, frame = self.cap.read()
+            if flag and not self.colored:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            return frame
+
+        if self.colored:
+            flag, frame = self.cap.read(out)
+            return frame if flag else None
+        flag, frame = self.cap.read(self._color_buffer)
+        if not flag:
+            return None
+        self._color_buffer = frame
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=out)
 
     def __next__(self) -> np.ndarray:
         frame = self.read_frame()
@@ -96,24 +409,175 @@ class VideoStream:
         self.__del__()
 
 
+class LatestFrameCapture:
+    """
+    Read frames from a stream on a background thread, keeping only the newest frame,
+    so that a slow consumer always gets the most recent frame instead of falling
+    further behind real time. Frames that are replaced before they are taken are
+    counted as dropped.
+
+    Frames are decoded into a set of three reused buffers: the one being decoded
+    into, the newest frame and the frame taken last. A taken frame is therefore
+    overwritten after the next call to `get`.
+    """
+
+    stream: VideoStream
+    captured: int
+    dropped: int
+
+    def __init__(self, stream: VideoStream):
+        """
+        :param stream: stream to capture, e.g. a camera opened with its device index.
+        """
+        self.stream = stream
+        self.captured = 0
+        self.dropped = 0
+        self._condition = threading.Condition()
+        self._frame: Optional[np.ndarray] = None
+        self._timestamp = 0.0
+        self._fresh = False
+        self._taken: Optional[np.ndarray] = None
+        self._spare: list[np.ndarray] = []
+        self._done = False
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._capture, daemon=True)
+        self._thread.start()
+
+    def _capture(self) -> None:
+        buffer = None
+        try:
+            while not self._closed:
+                # VideoStream.read_frame also for VideoFile, which takes an index.
+                frame = VideoStream.read_frame(self.stream, buffer)
+                timestamp = time.monotonic()
+                if frame is None:
+                    return
+                with self._condition:
+                    buffer = None
+                    if self._fresh:
+                        self.dropped += 1
+                        buffer = self._frame
+                    elif self._spare:
+                        buffer = self._spare.pop()
+                    self._frame, self._timestamp = frame, timestamp
+                    self._fresh = True
+                    self.captured += 1
+                    self._condition.notify_all()
+        except BaseException as error:
+            self._error = error
+        finally:
+            with self._condition:
+                self._done = True
+                self._condition.notify_all()
+
+    def get(
+        self, timeout: Optional[float] = None
+    ) -> Optional[tuple[np.ndarray, float]]:
+        """
+        Wait for a frame that hasn't been taken yet and take it. Raises any
+        exception that the capture thread raised.
+        :param timeout: maximum seconds to wait, None to wait until a frame arrives.
+        :return: the frame and the `time.monotonic` time it was captured at, or
+        None if the stream has ended or the timeout passed.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._fresh or self._done, timeout)
+            if not self._fresh:
+                if self._error is not None:
+                    raise self._error
+                return None
+            if self._taken is not None:
+                self._spare.append(self._taken)
+            self._taken = self._frame
+            self._fresh = False
+            return self._frame, self._timestamp
+
+    def close(self) -> None:
+        """Stop capturing and wait for the capture thread to finish."""
+        self._closed = True
+        self._thread.join()
+
+    def __enter__(self) -> LatestFrameCapture:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
 class VideoFile(VideoStream):
-    def __init__(self, source: str, color: bool = False):
+    seek_threshold: int
+
+    def __init__(self, source: str, color: bool = False, seek_threshold: int = 250):
+        """
+        :param source: path to a video file.
+        :param color: whether to read colored (BGR) or grayscale frames.
+        :param seek_threshold: when iterating frames, skip forward by decoding
+        instead of seeking if the next frame is at most this many frames ahead.
+        Seeking decodes from the preceding keyframe, so it only pays off for gaps
+        longer than the keyframe interval of the video.
+        """
         super().__init__(source, color)
+        self.seek_threshold = seek_threshold
 
-    def read_frame(self, index: Optional[int] = None) -> Optional[np.ndarray]:
+    def read_frame(
+        self, index: Optional[int] = None, out: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
         if index is not None:
-            if not 1 <= index <= self.frame_count:
+            if not 0 <= index < self.frame_count:
                 raise IndexError(
-                    "read_frame index out of bounds. Trying to read"
+                    "read_frame index out of bounds. Trying to read "
                     f"frame {index} but video has {self.frame_count} frames"
                 )
             if index != self.current_frame:
                 self.goto_frame(index)
+        return super().read_frame(out)
 
-        flag, frame = self.cap.read()
-        if flag and not self.colored:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        return frame
+    def iter_frames(
+        self,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+        step: Optional[int] = None,
+        reuse_buffer: bool = False,
+    ) -> Generator[np.ndarray, None, None]:
+        """
+        Read a range of frames, with the same semantics as slicing a list of frames.
+        See `read_frames`.
+        :param reuse_buffer: decode every frame into the same array instead of
+        allocating new ones. Each yielded frame is then overwritten by the next one.
+        :return: frame generator.
+        """
+        indices = range(*slice(start, stop, step).indices(int(self.frame_count)))
+        return self.read_frames(indices, reuse_buffer)
+
+    def read_frames(
+        self, indices: Iterable[int], reuse_buffer: bool = False
+    ) -> Generator[np.ndarray, None, None]:
+        """
+        Read frames in the order of indices. Frames are decoded sequentially, skipping
+        unwanted frames with `grab` which does not convert them to images. Seeking is
+        used only for jumps backwards and gaps longer than `seek_threshold`. The
+        indices are consumed lazily, one for every frame read.
+        :param indices: frame indices, may be a generator.
+        :param reuse_buffer: decode every frame into the same array instead of
+        allocating new ones. Each yielded frame is then overwritten by the next one.
+        :return: frame generator, which stops early if a frame can't be read.
+        """
+        out = None
+        for index in indices:
+            gap = index - int(self.current_frame)
+            if gap < 0 or gap > self.seek_threshold:
+                self.goto_frame(index)
+            else:
+                for _ in range(gap):
+                    if not self.cap.grab():
+                        return
+            frame = VideoStream.read_frame(self, out)
+            if frame is None:
+                return
+            if reuse_buffer:
+                out = frame
+            yield frame
 
     @property
     def frame_rate(self) -> int:
@@ -144,6 +608,6 @@ class VideoFile(VideoStream):
         :return: Single frame.jpg or frame.jpg generator.
         """
         if isinstance(index, slice):
-            return (self[index] for index in range(*index.indices(self.frame_count)))
+            return self.iter_frames(index.start, index.stop, index.step)
         else:
             return self.read_frame(index)
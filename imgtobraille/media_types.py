@@ -0,0 +1,17 @@
+"""
+File types the cli recognizes by their extension. Kept apart from `media_io` so
+that telling them apart doesn't import OpenCV.
+"""
+
+import os
+
+VIDEO_EXTENSIONS: frozenset[str] = frozenset(
+    {".mp4", ".m4v", ".mkv", ".webm", ".avi", ".mov", ".wmv", ".flv", ".mpg", ".mpeg"}
+)
+
+
+def is_video_file(path: str) -> bool:
+    """Whether path is a file with a video file extension."""
+    return (
+        os.path.isfile(path) and os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+    )
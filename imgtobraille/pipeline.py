@@ -0,0 +1,532 @@
+from __future__ import annotations
+
+import collections
+import functools
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from imgtobraille import dither_methods
+from imgtobraille import instrument
+from imgtobraille import render
+from imgtobraille import render_cache
+from imgtobraille.lazy import lazy_import
+
+# Frames found in the render cache are returned without OpenCV.
+arr_filters = lazy_import("imgtobraille.arr_filters")
+media_io = lazy_import("imgtobraille.media_io")
+
+
+def render_file(args, stats: instrument.Stats = instrument.DISABLED) -> np.ndarray:
+    """
+    Read, resize, dither and render a single image file.
+    :param args: tuple of path, (width, height) of the image in dots, the dithering
+    error diffusion level, the dithering method (see `arr_filters.dither`) and the
+    render cache directory or None for no caching.
+    A single argument so that this can be used with `Pool.imap`.
+    :param stats: records the time of each stage.
+    :return: 2d array of braille dot bit masks, see `render.render_cells`.
+    """
+    file, (image_width, image_height), dithering, method, cache_directory = args
+    if cache_directory is not None:
+        cache = render_cache.RenderCache(cache_directory)
+        params = dict(
+            resolution=(image_width, image_height), dithering=dithering, method=method
+        )
+        with stats.stage("cache"):
+            codes = cache.load(file, **params)
+        if codes is not None:
+            return codes
+
+    with stats.stage("read"):
+        arr = media_io.read_image_file(file, 0, image_width, image_height)
+    with stats.stage("resize"):
+        arr = arr_filters.fit_in_box(arr, image_width, image_height)
+    with stats.stage("dither"):
+        arr = arr_filters.dither(arr, method, dithering)
+    with stats.stage("pack"):
+        codes, _ = render.render_cells(arr)
+
+    if cache_directory is not None:
+        cache.store(file, codes, **params)
+    return codes
+
+
+def render_colored_file(
+    args, stats: instrument.Stats = instrument.DISABLED
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Read, resize, dither and render a single image file with the colors of its
+    braille characters. The image is decoded and resized once in color. The dots
+    are dithered from its luminance and the colors are averaged over the same
+    resized array.
+    :param args: same as in `render_file`.
+    :param stats: records the time of each stage.
+    :return: 2d array of braille dot bit masks and a 3d uint8 array of rgb colors
+    for each character, see `render.render_cells`.
+    """
+    file, (image_width, image_height), dithering, method, cache_directory = args
+    if cache_directory is not None:
+        cache = render_cache.RenderCache(cache_directory)
+        params = dict(
+            resolution=(image_width, image_height),
+            dithering=dithering,
+            method=method,
+            colored=True,
+        )
+        with stats.stage("cache"):
+            cells = cache.load(file, **params)
+        if cells is not None:
+            return cells[..., 0], cells[..., 1:]
+
+    with stats.stage("read"):
+        arr = media_io.read_image_file(file, 1, image_width, image_height)
+    with stats.stage("resize"):
+        arr = arr_filters.fit_in_box(arr, image_width, image_height)
+    with stats.stage("grayscale"):
+        gray = arr_filters.rgb_to_grayscale(arr)
+    with stats.stage("dither"):
+        dots = arr_filters.dither(gray, method, dithering)
+    with stats.stage("pack"):
+        codes, colors = render.render_cells(dots, arr)
+        colors = colors.astype(np.uint8)
+
+    if cache_directory is not None:
+        # The codes and colors of a cell are cached together as 4 bytes.
+        cache.store(file, np.dstack((codes, colors)), **params)
+    return codes, colors
+
+
+def render_files(
+    files: Sequence[str],
+    image_resolution: tuple[int, int],
+    dithering: float,
+    workers: int = 0,
+    chunksize: int = 1,
+    cache_directory: Optional[str] = None,
+    dither_method: arr_filters.DitherMethod = "floyd-steinberg",
+    stats: instrument.Stats = instrument.DISABLED,
+    colored: bool = False,
+) -> Iterator:
+    """
+    Render image files in a pool of processes. Frames are yielded in the same order
+    as the files as soon as they are ready, so playback can start before all of
+    the files are rendered.
+    :param files: paths to image files.
+    :param image_resolution: width and height of the images in dots.
+    :param dithering: error diffusion level, see `arr_filters.fl_dithering`.
+    :param workers: amount of processes. 0 uses all cpu cores, 1 renders the files
+    in the current process.
+    :param chunksize: amount of files given to a process at a time.
+    :param cache_directory: directory of a `render_cache.RenderCache` for reusing
+    frames rendered earlier with the same parameters. None disables caching.
+    :param dither_method: dithering method, see `arr_filters.dither`.
+    :param stats: records the time of each stage when rendering in the current
+    process. The stages of other processes aren't seen, so the time waited for each
+    of their frames is recorded as "render" instead.
+    :param colored: whether to render the colors of the characters too, see
+    `render_colored_file`.
+    :return: generator of rendered frames, or of rendered frames and their colors
+    if colored is True.
+    """
+    if workers < 0:
+        raise ValueError(f"workers must not be negative, got {workers}")
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be at least 1, got {chunksize}")
+
+    tasks = (
+        (file, image_resolution, dithering, dither_method, cache_directory)
+        for file in files
+    )
+    renderer = render_colored_file if colored else render_file
+    if workers == 1 or len(files) == 1:
+        yield from map(functools.partial(renderer, stats=stats), tasks)
+        return
+
+    # Closing the generator early terminates the pool.
+    with multiprocessing.Pool(workers or None) as pool:
+        yield from stats.iterate(pool.imap(renderer, tasks, chunksize), "render")
+
+
+class PrefetchQueue:
+    """
+    Consume frames from an iterable in a background thread, keeping at most
+    `maxsize` frames ready in a queue. Iterating the queue yields the frames in
+    the original order, and raises any exception that the producer raised.
+    """
+
+    _DONE = object()
+
+    def __init__(self, frames: Iterable, maxsize: int = 16):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, got {maxsize}")
+        self._queue = queue.Queue(maxsize)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(
+            target=self._produce, args=(iter(frames),), daemon=True
+        )
+        self._thread.start()
+
+    def _produce(self, frames: Iterator) -> None:
+        try:
+            for frame in frames:
+                self._queue.put(frame)
+        except BaseException as error:
+            self._error = error
+        finally:
+            self._queue.put(self._DONE)
+
+    @property
+    def depth(self) -> int:
+        """Amount of frames that are ready and waiting in the queue."""
+        return self._queue.qsize()
+
+    def __iter__(self) -> Iterator:
+        while True:
+            frame = self._queue.get()
+            if frame is self._DONE:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield frame
+
+
+class FrameClock:
+    """
+    Schedule frames at a fixed rate against a monotonic clock. Frame n is due at
+    n / fps seconds after the first frame, regardless of how long it took to get
+    the frames ready, so the playback speed does not drift.
+    """
+
+    frametime: float
+    shown: int
+    dropped: int
+    waited: float
+
+    def __init__(self, fps: float, stats: instrument.Stats = instrument.DISABLED):
+        """
+        :param fps: frames per second.
+        :param stats: records the dropped frames and the time waited for frames
+        as the "wait" stage.
+        """
+        if fps <= 0:
+            raise ValueError(f"fps must be positive, got {fps}")
+        self.stats = stats
+        self.frametime = 1 / fps
+        self.shown = 0
+        self.dropped = 0
+        self.waited = 0.0
+        self._start: Optional[float] = None
+        self._index = 0
+
+    def tick(self, can_drop: bool = True, lead: float = 0.0) -> bool:
+        """
+        Wait until the next frame is due.
+        :param can_drop: whether the frame may be skipped when it is late. Should be
+        False when there is no newer frame ready to take its place.
+        :param lead: seconds it takes to get the frame ready after the tick. The
+        wait ends this much before the frame is due, and the frame is dropped if it
+        would be late once ready.
+        :return: True if the frame should be shown, False if it should be dropped
+        because playback has fallen more than a frame behind.
+        """
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now
+        due = self._start + self._index * self.frametime - lead
+        self._index += 1
+
+        if can_drop and now > due + self.frametime:
+            self.dropped += 1
+            self.stats.drop()
+            return False
+        if due > now:
+            time.sleep(due - now)
+            self.waited += due - now
+            self.stats.record("wait", due - now)
+        self.shown += 1
+        return True
+
+    @property
+    def fps(self) -> float:
+        """Achieved rate of shown frames since the first frame."""
+        if self._start is None:
+            return 0.0
+        elapsed = time.monotonic() - self._start
+        return self.shown / elapsed if elapsed > 0 else 0.0
+
+
+# Weight of the newest frame in the moving average of render times of videos.
+RENDER_TIME_SMOOTHING: float = 0.2
+
+# Quality levels of live rendering from best to fastest: the scale of the output
+# resolution and the dithering method, None for the method chosen by the user.
+LIVE_QUALITY_LEVELS: list[tuple[float, Optional[arr_filters.DitherMethod]]] = [
+    (1.0, None),
+    (1.0, "bayer4"),
+    (0.75, "bayer4"),
+    (0.5, "bayer4"),
+]
+
+
+class AdaptiveQuality:
+    """
+    Choose a quality level from the time it takes to render frames. The level is
+    lowered as soon as the smoothed render time exceeds the budget, and raised
+    again only after `patience` frames well within the budget, so the quality
+    doesn't flip back and forth.
+    """
+
+    budget: float
+    level: int
+
+    def __init__(
+        self,
+        budget: float,
+        levels: Sequence = tuple(LIVE_QUALITY_LEVELS),
+        smoothing: float = 0.2,
+        headroom: float = 0.5,
+        patience: int = 30,
+    ):
+        """
+        :param budget: target render time of a frame in seconds.
+        :param levels: quality levels from best to fastest.
+        :param smoothing: weight of the newest render time in the moving average.
+        :param headroom: share of the budget the render time must stay under for
+        the level to be raised.
+        :param patience: amount of frames within the headroom before raising.
+        """
+        if budget <= 0:
+            raise ValueError(f"budget must be positive, got {budget}")
+        self.budget = budget
+        self.levels = levels
+        self.level = 0
+        self.smoothing = smoothing
+        self.headroom = headroom
+        self.patience = patience
+        self._average: Optional[float] = None
+        self._calm_frames = 0
+
+    @property
+    def current(self):
+        """The current quality level."""
+        return self.levels[self.level]
+
+    def update(self, seconds: float) -> None:
+        """Record the render time of a frame, changing the level if needed."""
+        if self._average is None:
+            self._average = seconds
+        else:
+            self._average += self.smoothing * (seconds - self._average)
+
+        if self._average > self.budget:
+            self._calm_frames = 0
+            if self.level < len(self.levels) - 1:
+                self.level += 1
+                self._average = None
+        elif self._average < self.headroom * self.budget:
+            self._calm_frames += 1
+            if self._calm_frames >= self.patience and self.level > 0:
+                self.level -= 1
+                self._calm_frames = 0
+                self._average = None
+        else:
+            self._calm_frames = 0
+
+
+class LatencyStats:
+    """Collect latencies and summarize them with percentiles."""
+
+    def __init__(self, max_samples: Optional[int] = None):
+        """
+        :param max_samples: amount of latest latencies to keep, None to keep all.
+        """
+        self.samples: collections.deque[float] = collections.deque(maxlen=max_samples)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, percent: float) -> float:
+        """Latency in seconds that the given percent of the samples are within."""
+        if not self.samples:
+            return 0.0
+        return float(np.percentile(self.samples, percent))
+
+    def summary(self) -> str:
+        if not self.samples:
+            return "no latency samples"
+        return (
+            f"latency mean {np.mean(self.samples) * 1000:.1f} ms, "
+            f"p50 {self.percentile(50) * 1000:.1f} ms, "
+            f"p95 {self.percentile(95) * 1000:.1f} ms, "
+            f"max {max(self.samples) * 1000:.1f} ms"
+        )
+
+
+def render_live(
+    capture: media_io.LatestFrameCapture,
+    image_resolution: tuple[int, int],
+    dithering: float,
+    dither_method: arr_filters.DitherMethod,
+    quality: AdaptiveQuality,
+    stats: instrument.Stats = instrument.DISABLED,
+) -> Iterator[tuple[np.ndarray, float]]:
+    """
+    Render the newest frames of a live capture until the stream ends. Frames that
+    arrive while a frame is rendered are dropped by the capture.
+    :param capture: capture of a grayscale stream.
+    :param image_resolution: width and height of the frames in dots at the best
+    quality level.
+    :param dithering: error diffusion level, see `arr_filters.fl_dithering`.
+    :param dither_method: dithering method at the best quality level.
+    :param quality: chooses from levels like `LIVE_QUALITY_LEVELS`, updated with the
+    render time of every frame.
+    :param stats: records the time of each stage.
+    :return: generator of rendered frames and the times they were captured at.
+    """
+    ditherers = {}
+    resizers: dict[float, arr_filters.BoxResizer] = {}
+    while True:
+        latest = capture.get()
+        if latest is None:
+            return
+        frame, captured_at = latest
+        start = time.monotonic()
+
+        scale, method = quality.current
+        method = method or dither_method
+        if scale not in resizers:
+            width, height = image_resolution
+            resizers[scale] = arr_filters.BoxResizer(
+                max(int(width * scale), 1),
+                max(int(height * scale), 1),
+                reuse_buffer=True,
+            )
+        if method not in ditherers:
+            ditherers[method] = arr_filters.get_ditherer(method, dithering)
+        with stats.stage("resize"):
+            frame = resizers[scale](frame)
+        with stats.stage("dither"):
+            frame = ditherers[method](frame)
+        with stats.stage("pack"):
+            codes, _ = render.render_cells(frame)
+
+        quality.update(time.monotonic() - start)
+        yield codes, captured_at
+
+
+def _pack_changed_rows(dots: np.ndarray, rows: np.ndarray, codes: np.ndarray) -> None:
+    """
+    Pack the braille characters over the given rows of dots again, keeping the
+    other characters of the previous frame.
+    :param dots: dithered frame.
+    :param rows: bool array with a value for each row of dots, True for the rows
+    that changed since the previous frame.
+    :param codes: braille dot bit masks of the previous frame, updated in place.
+    """
+    # Like `render.pack_braille`, rows that don't fill a whole character are
+    # cropped from the top.
+    offset = dots.shape[0] - codes.shape[0] * 4
+    changed = rows[offset:].reshape(codes.shape[0], 4).any(axis=1)
+    edges = np.flatnonzero(np.diff(changed, prepend=False, append=False))
+    for start, stop in zip(edges[::2], edges[1::2]):
+        render.pack_braille(
+            dots[offset + start * 4 : offset + stop * 4], out=codes[start:stop]
+        )
+
+
+def render_video(
+    video: media_io.VideoFile,
+    image_resolution: tuple[int, int],
+    dithering: float,
+    dither_method: arr_filters.DitherMethod,
+    clock: FrameClock,
+    stats: instrument.Stats = instrument.DISABLED,
+    incremental: bool = False,
+    tolerance: int = dither_methods.CHANGE_TOLERANCE,
+) -> Iterator[tuple[np.ndarray, Optional[np.ndarray]]]:
+    """
+    Render the frames of a video as they become due on a clock, without rendering
+    ahead. Each frame is started the smoothed render time of the previous frames
+    before it is due, so it is ready about when it is due. Frames that the clock
+    drops because playback is behind are skipped with `grab` without decoding them.
+    :param video: grayscale video, or colored video to also render the colors of
+    the characters. Colored frames are resized once and dithered from their
+    luminance.
+    :param image_resolution: width and height of the frames in dots.
+    :param dithering: error diffusion level, see `arr_filters.fl_dithering`.
+    :param dither_method: dithering method, see `arr_filters.dither`.
+    :param clock: clock that is ticked before every frame, with the expected render
+    time as the lead. The rendered frame should be shown right away.
+    :param stats: records the time of each stage.
+    :param incremental: dither and pack only the bands of rows that changed since
+    the previous frame, see the "incremental" mode of
+    `arr_filters.FloydSteinbergDitherer`. Saves time when frames change little,
+    like in screen recordings and slides. Only affects floyd-steinberg dithering.
+    :param tolerance: largest change of a pixel that doesn't count as a change with
+    incremental, so that codec noise doesn't dither still areas again.
+    :return: generator of rendered frames and their rgb colors, or None for the
+    colors of grayscale videos.
+    """
+    render_time = 0.0  # moving average of the time from the tick to the frame
+
+    def due_frames() -> Iterator[int]:
+        for index in range(int(video.frame_count)):
+            if clock.tick(lead=render_time):
+                yield index
+
+    resize = arr_filters.BoxResizer(*image_resolution, reuse_buffer=True)
+    ditherer = arr_filters.get_ditherer(
+        dither_method, dithering, "incremental" if incremental else "serial", tolerance
+    )
+    frames = video.read_frames(due_frames(), reuse_buffer=True)
+    gray = codes = None
+    while True:
+        # Getting the next frame ticks the clock first, which isn't decoding.
+        start, waited = time.perf_counter(), clock.waited
+        frame = next(frames, None)
+        if frame is None:
+            return
+        start += clock.waited - waited
+        stats.record("decode", time.perf_counter() - start)
+        with stats.stage("resize"):
+            frame = resize(frame)
+        if video.colored:
+            with stats.stage("grayscale"):
+                gray = arr_filters.bgr_to_grayscale(frame, gray)
+        else:
+            gray = frame
+        with stats.stage("dither"):
+            dots = ditherer(gray)
+
+        with stats.stage("pack"):
+            height, width = dots.shape
+            rows = getattr(ditherer, "dithered_rows", None)
+            if (
+                rows is None
+                or codes is None
+                or codes.shape != (height // 4, width // 2)
+                or not codes.size
+            ):
+                codes, colors = render.render_cells(
+                    dots, frame if video.colored else None
+                )
+            else:
+                # The previous frame may still be referenced by its consumer.
+                codes = codes.copy()
+                _pack_changed_rows(dots, rows, codes)
+                if video.colored:
+                    colors = render.tile_color_means(
+                        frame[height % 4 :, width % 2 :], 4, 2
+                    )
+            if video.colored:
+                # Reversing the channels of the means is cheaper than of the frame.
+                colors = colors[..., ::-1].astype(np.uint8)
+        render_time += RENDER_TIME_SMOOTHING * (
+            time.perf_counter() - start - render_time
+        )
+        yield codes, colors if video.colored else None
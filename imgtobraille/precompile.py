@@ -0,0 +1,64 @@
+"""
+Compile the numba kernels into numba's cache ahead of the first run, so that the
+first rendering after installing or upgrading loads the kernels instead of
+compiling them. Run once after installing:
+    python -m imgtobraille.precompile
+
+The kernels are compiled by rendering small frames through the same functions the
+cli uses, so they are compiled for the argument types of real runs. Kernels are
+cached next to their modules, or in NUMBA_CACHE_DIR if it is set.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from imgtobraille import arr_filters
+from imgtobraille import render
+from imgtobraille import terminal
+
+
+def precompile() -> None:
+    """Call every kernel with the argument types used when rendering."""
+    rng = np.random.default_rng(0)
+    # Sizes that are and aren't whole braille tiles, since cropped arrays are
+    # compiled separately from contiguous ones.
+    for height, width in [(64, 32), (67, 33)]:
+        gray = rng.integers(0, 256, (height, width), dtype=np.uint8)
+        colors = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+        for mode in ("serial", "wavefront", "bands"):
+            for threshold in (175, "mean"):
+                arr_filters.fl_dithering(gray, threshold, mode=mode)
+        arr_filters.fl_dithering(gray, mode="incremental")
+        dots = arr_filters.fl_dithering(gray)
+        for dot_arr in (dots, dots > 0, arr_filters.ordered_dithering(gray)):
+            render.render(dot_arr)
+        render.render_batch(np.stack([dots, dots]))
+
+        for color_mode in ("truecolor", "256", "16"):
+            for coalesce in (False, True):
+                render.render(dots, colors, color_mode=color_mode, coalesce=coalesce)
+
+            # Redrawing only the changed characters of animations.
+            codes, cell_colors = render.render_cells(dots, colors)
+            changed_codes = codes.copy()
+            changed_codes[0, 0] ^= 1
+            for frame_colors in (None, cell_colors):
+                encoder = terminal.FrameDiffEncoder(color_mode)
+                encoder.encode(codes, frame_colors)
+                encoder.encode(changed_codes, frame_colors)
+
+
+def main() -> None:
+    start = time.perf_counter()
+    precompile()
+    print(
+        f"Compiled the kernels in {time.perf_counter() - start:.1f} s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,65 @@
-from typing import Optional
+import functools
+from typing import BinaryIO, Iterator, Literal, Optional, Union
 
-import numba as nb
 import numpy as np
 
+from imgtobraille.lazy import lazy_import
+
+render_kernels = lazy_import("imgtobraille.render_kernels")
+
 BRAILLE_CODEPOINT_START: int = 10240
 ANSI_RESET_COLORS: str = "\033[0m"
+_ANSI_RESET_COLORS_BYTES: bytes = ANSI_RESET_COLORS.encode()
 BRAILLE_TILE: np.ndarray = np.array([[1, 8], [2, 16], [4, 32], [64, 128]])
 
+# ASCII digits of the numbers 0-255, left aligned, and the amount of digits in each.
+# Used for writing the rgb values of ANSI escape sequences without string formatting.
+_DECIMAL_DIGITS: np.ndarray = np.array(
+    [list(str(n).ljust(3).encode()) for n in range(256)], dtype=np.uint8
+)
+_DECIMAL_LENGTHS: np.ndarray = np.array(
+    [len(str(n)) for n in range(256)], dtype=np.uint8
+)
+# Braille code points U+2800-U+28FF are UTF-8 encoded as the lead byte 0xE2, and two
+# continuation bytes holding the top 2 and bottom 6 bits of the dot bit mask.
+_BRAILLE_UTF8_LEAD: int = 0xE2
+_BRAILLE_UTF8_HIGH: int = 0xA0
+_BRAILLE_UTF8_LOW: int = 0x80
+
+ColorMode = Literal["truecolor", "256", "16"]
+
+# Start of the escape sequence for each color mode, colors values are appended to it.
+_COLOR_MODE_HEADERS: dict[str, np.ndarray] = {
+    "truecolor": np.frombuffer(b"\033[38;2;", dtype=np.uint8),
+    "256": np.frombuffer(b"\033[38;5;", dtype=np.uint8),
+    "16": np.frombuffer(b"\033[", dtype=np.uint8),
+}
+
+# Default xterm rgb values of the 16 basic colors.
+_XTERM_16_COLORS: np.ndarray = np.array(
+    [
+        [0, 0, 0],
+        [205, 0, 0],
+        [0, 205, 0],
+        [205, 205, 0],
+        [0, 0, 238],
+        [205, 0, 205],
+        [0, 205, 205],
+        [229, 229, 229],
+        [127, 127, 127],
+        [255, 0, 0],
+        [0, 255, 0],
+        [255, 255, 0],
+        [92, 92, 255],
+        [255, 0, 255],
+        [0, 255, 255],
+        [255, 255, 255],
+    ]
+)
+# Amount of bits per channel used to index the palette lookup tables.
+_PALETTE_LOOKUP_BITS: int = 6
+
 
-@nb.njit(cache=True)
 def get_shape_for_tile_split(
     arr_height: int, arr_width: int, nchannels: int, tile_height: int, tile_width: int
 ) -> list[int]:
@@ -52,6 +103,116 @@ def split_to_tiles(array: np.ndarray, tile_height: int, tile_width: int) -> np.n
     return array.reshape(new_shape).swapaxes(1, 2)
 
 
+def tile_color_means(
+    color_arr: np.ndarray, tile_height: int, tile_width: int
+) -> np.ndarray:
+    """
+    Calculate the mean color of each tile, truncated to integers.
+    :param color_arr: array of shape (..., height, width, 3). Height and width
+    must be divisible by the tile height and width. Leading dimensions are kept,
+    so a stack of frames can be given at once.
+    :param tile_height: height of tile.
+    :param tile_width: width of tile.
+    :return: integer array of shape (..., rows, columns, 3).
+    """
+    *leading, arr_height, arr_width, nchannels = color_arr.shape
+    rows, columns = arr_height // tile_height, arr_width // tile_width
+    if not np.issubdtype(color_arr.dtype, np.unsignedinteger):
+        tiles = color_arr.reshape(
+            *leading, rows, tile_height, columns, tile_width, nchannels
+        )
+        return tiles.mean(axis=(-4, -2)).astype(int)
+
+    # Summing unsigned integers one axis at a time avoids reducing over the
+    # non-contiguous tile view and gives the same result as truncating the mean.
+    column_sums = color_arr.reshape(
+        *leading, rows, tile_height, arr_width * nchannels
+    ).sum(axis=-2, dtype=np.uint32)
+    tile_sums = column_sums.reshape(*leading, rows, columns, tile_width, nchannels).sum(
+        axis=-2, dtype=np.int64
+    )
+    return tile_sums // (tile_height * tile_width)
+
+
+def _palette(color_mode: ColorMode) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the rgb values of a palette and the escape sequence value of each color.
+    The first 16 colors of the 256 color palette are left out because terminals
+    often use custom values for them.
+    """
+    if color_mode == "16":
+        sgr_values = np.r_[30:38, 90:98]
+        return _XTERM_16_COLORS, sgr_values
+    if color_mode == "256":
+        levels = np.array([0, 95, 135, 175, 215, 255])
+        cube = np.stack(np.meshgrid(levels, levels, levels, indexing="ij"), axis=-1)
+        grays = np.repeat(np.arange(8, 248, 10)[:, np.newaxis], 3, axis=1)
+        return np.concatenate([cube.reshape(-1, 3), grays]), np.arange(16, 256)
+    raise ValueError(f"No palette for color_mode {color_mode!r}")
+
+
+@functools.lru_cache(maxsize=None)
+def _palette_lookup_table(color_mode: ColorMode) -> np.ndarray:
+    """
+    Precompute the nearest palette color for every rgb value, with the channels
+    truncated to `_PALETTE_LOOKUP_BITS` bits. Each cell of the table gets the
+    palette color nearest to the center of the cell, except that the cells of the
+    palette colors themselves always get those colors.
+    :return: 3d array of escape sequence values, indexed with the truncated r, g and b.
+    """
+    palette, sgr_values = _palette(color_mode)
+    size = 1 << _PALETTE_LOOKUP_BITS
+    step = 256 // size
+    centers = np.arange(size, dtype=np.int32) * step + step // 2
+
+    best_distance = np.full((size, size, size), np.iinfo(np.int32).max)
+    table = np.zeros((size, size, size), dtype=np.uint8)
+    for (red, green, blue), sgr_value in zip(palette, sgr_values):
+        # The squared distance is a sum of one term per channel.
+        distance = (
+            ((centers - red) ** 2)[:, np.newaxis, np.newaxis]
+            + ((centers - green) ** 2)[np.newaxis, :, np.newaxis]
+            + ((centers - blue) ** 2)[np.newaxis, np.newaxis, :]
+        )
+        closer = distance < best_distance
+        best_distance[closer] = distance[closer]
+        table[closer] = sgr_value
+    cells = palette >> (8 - _PALETTE_LOOKUP_BITS)
+    table[cells[:, 0], cells[:, 1], cells[:, 2]] = sgr_values
+    return table
+
+
+def quantize_colors(colors: np.ndarray, color_mode: ColorMode) -> np.ndarray:
+    """
+    Map rgb colors to a near color of the xterm 256 or 16 color palette, with a
+    lookup table of `_PALETTE_LOOKUP_BITS` bits per channel. Palette colors map to
+    themselves. Other colors get the palette color nearest to the center of their
+    table cell. For 1-2% of colors that isn't the nearest palette color, but
+    one at most 7 farther in rgb space than it.
+    :param colors: array with a last dimension for rgb values in range 0-255.
+    :param color_mode: "256" or "16".
+    :return: array of escape sequence values without the rgb dimension. For "256"
+    the values are palette indices, for "16" they are foreground color codes 30-37
+    and 90-97.
+    """
+    table = _palette_lookup_table(color_mode)
+    indices = np.asarray(colors, dtype=np.uint8) >> (8 - _PALETTE_LOOKUP_BITS)
+    return table[indices[..., 0], indices[..., 1], indices[..., 2]]
+
+
+def palette_colors(values: np.ndarray, color_mode: ColorMode) -> np.ndarray:
+    """
+    Inverse of `quantize_colors`, get the rgb values of palette colors.
+    :param values: array of escape sequence values returned by `quantize_colors`.
+    :param color_mode: "256" or "16".
+    :return: array with an added last dimension for rgb values.
+    """
+    palette, sgr_values = _palette(color_mode)
+    table = np.zeros((256, 3), dtype=np.uint8)
+    table[sgr_values] = palette
+    return table[np.asarray(values, dtype=np.uint8)]
+
+
 def colorize_string(string: str, r: int, g: int, b: int, *, reset: bool = True) -> str:
     """
     Colorize the input string with ansi escape sequence.
@@ -98,6 +259,215 @@ def colorize_view(
     return "\n".join(rows_formatted) + ANSI_RESET_COLORS
 
 
+def colorize_codes(
+    codes: np.ndarray,
+    colors: np.ndarray,
+    rstrip: bool = True,
+    color_mode: ColorMode = "truecolor",
+    coalesce: bool = False,
+    color_tolerance: int = 0,
+) -> str:
+    """
+    Create a colored multiline string from braille cell codes. With the default
+    arguments this produces the same output as `colorize_view` for the same characters
+    and colors, but builds the whole output in a single buffer instead of formatting
+    every character separately.
+    :param codes: 2d array of braille dot bit masks in range 0-255.
+    :param colors: 3d array with the same height and width as codes, and a 3rd dimension
+    for rgb values.
+    :param rstrip: whether to strip invisible characters from ends of rows.
+    :param color_mode: "truecolor" for 24-bit colors, "256" or "16" to quantize the
+    colors to the xterm 256 or 16 color palette.
+    :param coalesce: emit an escape sequence only when the color changes. Blank
+    characters never change the color.
+    :param color_tolerance: with coalesce, colors whose rgb values all differ at most
+    this much from the previous escape sequence reuse it. Only used with "truecolor".
+    :return: Colored multiline string.
+    """
+    return colorize_codes_to_bytes(
+        codes, colors, rstrip, color_mode, coalesce, color_tolerance
+    ).decode()
+
+
+def colorize_codes_to_bytes(
+    codes: np.ndarray,
+    colors: np.ndarray,
+    rstrip: bool = True,
+    color_mode: ColorMode = "truecolor",
+    coalesce: bool = False,
+    color_tolerance: int = 0,
+) -> bytes:
+    """
+    UTF-8 encoded `colorize_codes`, without building a string. Arguments are the
+    same as in `colorize_codes`.
+    """
+    if color_mode not in _COLOR_MODE_HEADERS:
+        raise ValueError(
+            f"color_mode must be one of {list(_COLOR_MODE_HEADERS)}, got {color_mode!r}"
+        )
+    encoded = _encode_colored_rows(
+        codes, colors, rstrip, color_mode, coalesce, color_tolerance
+    )
+    return encoded + _ANSI_RESET_COLORS_BYTES
+
+
+def _encode_colored_rows(
+    codes: np.ndarray,
+    colors: np.ndarray,
+    rstrip: bool,
+    color_mode: ColorMode,
+    coalesce: bool,
+    color_tolerance: int,
+) -> bytes:
+    """`colorize_codes_to_bytes` without resetting the colors at the end."""
+    colors = np.asarray(colors)
+    if colors.size and (colors.min() < 0 or colors.max() > 255):
+        if color_mode == "truecolor" and not coalesce:
+            # Values outside of the digit table, fall back to string formatting.
+            unicode_buf = (codes.astype(np.int64) + BRAILLE_CODEPOINT_START).view("U2")
+            encoded = colorize_view(unicode_buf, colors, rstrip).encode()
+            return encoded[: -len(_ANSI_RESET_COLORS_BYTES)]
+        colors = colors.clip(0, 255)
+    return _encode_colored_bytes(
+        codes, colors, rstrip, color_mode, coalesce, color_tolerance
+    )
+
+
+def _encode_colored_bytes(
+    codes: np.ndarray,
+    colors: np.ndarray,
+    rstrip: bool,
+    color_mode: ColorMode,
+    coalesce: bool,
+    color_tolerance: int,
+) -> bytes:
+    """
+    UTF-8 output of `colorize_codes` without the final reset. Colors must be in
+    the range 0-255.
+    """
+    if color_mode != "truecolor":
+        colors = quantize_colors(colors, color_mode)[..., np.newaxis]
+        color_tolerance = 0
+
+    header = _COLOR_MODE_HEADERS[color_mode]
+    rows, cols = codes.shape
+    max_cell_size = len(header) + colors.shape[2] * 4 + 3
+    out = np.empty(rows * cols * max_cell_size + rows, dtype=np.uint8)
+    size = render_kernels.encode_colored(
+        np.ascontiguousarray(codes, dtype=np.int64),
+        np.ascontiguousarray(colors, dtype=np.int64),
+        header,
+        _DECIMAL_DIGITS,
+        _DECIMAL_LENGTHS,
+        rstrip,
+        coalesce,
+        color_tolerance,
+        out,
+    )
+    return out[:size].tobytes()
+
+
+def colorize_changed_cells(
+    codes: np.ndarray,
+    changed: np.ndarray,
+    colors: Optional[np.ndarray] = None,
+    color_mode: ColorMode = "truecolor",
+    max_gap: int = 4,
+) -> str:
+    """
+    Create a string that redraws only the changed braille characters of a frame that
+    is already on the terminal, starting from the top left corner of the terminal.
+    :param codes: 2d array of braille dot bit masks in range 0-255.
+    :param changed: 2d boolean array of the characters that need to be redrawn.
+    :param colors: optional 3d array of rgb colors for each character.
+    :param color_mode: "truecolor", "256" or "16". See `colorize_codes`.
+    :param max_gap: rewrite at most this many unchanged characters between changed
+    ones instead of moving the cursor over them.
+    :return: string of cursor positioning escape sequences and braille characters.
+    """
+    return colorize_changed_cells_to_bytes(
+        codes, changed, colors, color_mode, max_gap
+    ).decode()
+
+
+def colorize_changed_cells_to_bytes(
+    codes: np.ndarray,
+    changed: np.ndarray,
+    colors: Optional[np.ndarray] = None,
+    color_mode: ColorMode = "truecolor",
+    max_gap: int = 4,
+) -> bytes:
+    """
+    UTF-8 encoded `colorize_changed_cells`, without building a string. Arguments are
+    the same as in `colorize_changed_cells`.
+    """
+    rows, cols = codes.shape
+    if colors is None:
+        values = np.zeros((rows, cols, 0), dtype=np.int64)
+        header = _COLOR_MODE_HEADERS["truecolor"][:0]
+    else:
+        values = np.asarray(colors).clip(0, 255)
+        if color_mode != "truecolor":
+            values = quantize_colors(values, color_mode)[..., np.newaxis]
+        header = _COLOR_MODE_HEADERS[color_mode]
+
+    cursor_size = 2 * 10 + 3
+    max_cell_size = len(header) + values.shape[2] * 4 + 3
+    out = np.empty(rows * (cols * (cursor_size + max_cell_size)), dtype=np.uint8)
+    size = render_kernels.encode_changed_cells(
+        np.ascontiguousarray(codes, dtype=np.int64),
+        np.ascontiguousarray(values, dtype=np.int64),
+        np.ascontiguousarray(changed, dtype=np.bool_),
+        header,
+        max_gap,
+        out,
+    )
+    output = out[:size].tobytes()
+    if colors is not None and size:
+        output += _ANSI_RESET_COLORS_BYTES
+    return output
+
+
+def pack_braille(
+    dot_arr: np.ndarray,
+    tile: np.ndarray = BRAILLE_TILE,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Pack dots into braille dot bit masks in a single pass, without modifying dot_arr.
+    Rows and columns that don't fill a whole tile are cropped from the top and left,
+    like in `render_cells`.
+    :param dot_arr: array of shape (height, width), or (frames, height, width) for a
+    stack of frames.
+    :param tile: braille tile.
+    :param out: optional array to write the bit masks into, with the shape
+    (..., rows, columns). Created if not given.
+    :return: uint8 array of bit masks, or uint32 if the tile values can sum over 255.
+    """
+    tile_height, tile_width = tile.shape
+    *leading, arr_height, arr_width = dot_arr.shape
+    shape = (*leading, arr_height // tile_height, arr_width // tile_width)
+    if out is None:
+        dtype = np.uint8 if tile.sum() <= 255 else np.uint32
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape:
+        raise ValueError(f"out must have the shape {shape}, shape was {out.shape}")
+
+    if dot_arr.dtype == np.bool_:
+        dot_arr = dot_arr.view(np.uint8)
+    cropped = dot_arr[..., arr_height % tile_height :, arr_width % tile_width :]
+    kernel = (
+        render_kernels.pack_tiles_4x2
+        if tile.shape == (4, 2)
+        else render_kernels.pack_tiles
+    )
+    if cropped.ndim == 2:
+        kernel(cropped[np.newaxis], tile, out[np.newaxis])
+    else:
+        kernel(cropped, tile, out)
+    return out
+
+
 def _validate_render_arguments(
     dot_arr: np.ndarray, color_arr: Optional[np.ndarray]
 ) -> None:
@@ -128,23 +498,22 @@ def _validate_render_arguments(
             )
 
 
-def render(
+def render_cells(
     dot_arr: np.ndarray,
     color_arr: Optional[np.ndarray] = None,
-    rstrip: bool = True,
     tile: np.ndarray = BRAILLE_TILE,
-) -> str:
+    out: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, Optional[np.ndarray]]:
     """
-    Create a braille unicode representation of a numpy array. dot_arr will be
-    used to form the braille unicode characters. One pixel/value in dot_arr equals
-    one dot in braille character. If color_arr is given, the output braille characters
-    will also be colored with ANSI escape codes.
+    Calculate the braille characters and their colors without formatting them to a
+    string. Arguments are the same as in `render`. dot_arr is not modified.
     :param dot_arr: array that determines the on/off status of braille dots.
-    :param color_arr: optional array that will be used to color the
-    braille characters with ansi escape sequences.
-    :param rstrip: whether to strip invisible characters from ends of rows.
+    :param color_arr: optional array for the colors of the braille characters.
     :param tile: braille tile.
-    :return:
+    :param out: optional array to write the braille dot bit masks into, see
+    `pack_braille`.
+    :return: 2d uint8 array of braille dot bit masks, and a 3d array of rgb
+    colors for each character or None if color_arr was not given.
     """
     _validate_render_arguments(dot_arr, color_arr)
 
@@ -156,53 +525,307 @@ def render(
 
         dot_arr = np.pad(dot_arr, ((0, pad_bottom), (0, pad_right)))
         if color_arr is not None:
-            color_arr = np.pad(
-                color_arr, ((0, 0), (0, pad_bottom), (0, pad_right), (0, 0))
-            )
+            color_arr = np.pad(color_arr, ((0, pad_bottom), (0, pad_right), (0, 0)))
     arr_height, arr_width = dot_arr.shape
 
     tile_height, tile_width = tile.shape
 
-    # Braille tiles must fit over the array without leaving a remainder
-    dot_arr = dot_arr[arr_height % tile_height :, arr_width % tile_width :]
-    if color_arr is not None:
-        color_arr = color_arr[arr_height % 4 :, arr_width % 2 :]
+    # Braille tiles must fit over the array without leaving a remainder,
+    # pack_braille crops dot_arr the same way.
+    tile_sums = pack_braille(dot_arr, tile, out)
+    if color_arr is None:
+        return tile_sums, None
+    color_arr = color_arr[arr_height % 4 :, arr_width % 2 :]
 
-    # Divide array(s) into a list of tiles
-    tiled_array = split_to_tiles(dot_arr, tile_height, tile_width)
+    # If colored array is provided, each color channel is split to tiles, similarly to the gray array.
+    # For each braille character there are 3 tiles from separate red, green and blue channels.
+    # Averages of a tile from each 3 channels gives 3 values, rgb. Those will be used
+    # to create and ANSI escape sequence to give a color to the corresponding braille character.
+    return tile_sums, tile_color_means(color_arr, tile_height, tile_width)
 
-    # Clip values of tiles to 0/1 and multiply with `tile`
-    masked_bits = np.clip(tiled_array, 0, 1, out=tiled_array) * tile
 
-    # New array which contains the sums of each tiles values
-    tile_sums = masked_bits.sum(axis=(2, 3)).astype(
-        np.int64
-    )  # Todo: check if astype is needed
+def render_cells_batch(
+    dot_arrs: np.ndarray,
+    color_arrs: Optional[np.ndarray] = None,
+    tile: np.ndarray = BRAILLE_TILE,
+) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Calculate the braille characters and their colors of a stack of frames at once.
+    Same as calling `render_cells` for each frame.
+    :param dot_arrs: array of shape (frames, height, width) that determines the
+    on/off status of braille dots.
+    :param color_arrs: optional array of shape (frames, height, width, 3) for the
+    colors of the braille characters.
+    :param tile: braille tile.
+    :return: uint8 array of braille dot bit masks of shape (frames, rows, columns), and
+    an array of rgb colors of shape (frames, rows, columns, 3) or None.
+    """
+    if dot_arrs.ndim != 3:
+        raise ValueError(f"dot_arrs must be 3-dimensional. Shape was {dot_arrs.shape}")
+    if color_arrs is not None:
+        if color_arrs.ndim != 4 or color_arrs.shape[3] != 3:
+            raise ValueError(
+                "color_arrs must have the shape (frames, height, width, 3). "
+                f"Shape was {color_arrs.shape}"
+            )
+        if dot_arrs.shape != color_arrs.shape[:3]:
+            raise ValueError(
+                "dot_arrs and color_arrs must have the same amount of frames, height "
+                f"and width: {dot_arrs.shape} != {color_arrs.shape}"
+            )
 
-    # Add to get the right offset for unicode braille code point
-    tile_sums += BRAILLE_CODEPOINT_START
+    # Allow conversion for arrays smaller than braille tile
+    _, arr_height, arr_width = dot_arrs.shape
+    if arr_height < 4 or arr_width < 2:
+        pad_right = max(2 - arr_width, 0)
+        pad_bottom = max(4 - arr_height, 0)
+        dot_arrs = np.pad(dot_arrs, ((0, 0), (0, pad_bottom), (0, pad_right)))
+        if color_arrs is not None:
+            color_arrs = np.pad(
+                color_arrs, ((0, 0), (0, pad_bottom), (0, pad_right), (0, 0))
+            )
+    _, arr_height, arr_width = dot_arrs.shape
 
-    # Join characters to rows, and rows with a linebreak
-    if color_arr is None:
-        rows = (
-            row.astype("int32").view(dtype=f"U{row.size}").item() for row in tile_sums
+    tile_height, tile_width = tile.shape
+    codes = pack_braille(dot_arrs, tile)
+    if color_arrs is None:
+        return codes, None
+    color_arrs = color_arrs[:, arr_height % 4 :, arr_width % 2 :]
+    return codes, tile_color_means(color_arrs, tile_height, tile_width)
+
+
+def render_batch(
+    dot_arrs: np.ndarray,
+    color_arrs: Optional[np.ndarray] = None,
+    rstrip: bool = True,
+    tile: np.ndarray = BRAILLE_TILE,
+    as_codes: bool = False,
+    color_mode: ColorMode = "truecolor",
+    coalesce: bool = False,
+    color_tolerance: int = 0,
+) -> Union[list[str], np.ndarray]:
+    """
+    Render a stack of frames. Tiling and bit packing is done for all frames at once,
+    and the output is the same as calling `render` for each frame.
+    :param dot_arrs: array of shape (frames, height, width).
+    :param color_arrs: optional array of shape (frames, height, width, 3).
+    :param rstrip: whether to strip invisible characters from ends of rows.
+    :param tile: braille tile.
+    :param as_codes: return the braille dot bit masks as a uint8 array of shape
+    (frames, rows, columns) instead of strings. Colors are not returned.
+    :param color_mode: "truecolor", "256" or "16". See `colorize_codes`.
+    :param coalesce: emit color escape sequences only when the color changes.
+    :param color_tolerance: maximum rgb difference for colors to be coalesced.
+    :return: list of strings, one for each frame, or the array of codes.
+    """
+    codes, colors = render_cells_batch(dot_arrs, None if as_codes else color_arrs, tile)
+    if as_codes:
+        return codes
+    if colors is None:
+        return [codes_to_string(frame, rstrip) for frame in codes]
+    return [
+        colorize_codes(
+            frame_codes,
+            frame_colors,
+            rstrip,
+            color_mode=color_mode,
+            coalesce=coalesce,
+            color_tolerance=color_tolerance,
         )
-        if rstrip:
-            rows_formatted = (line.rstrip(chr(BRAILLE_CODEPOINT_START)) for line in rows)
-        else:
-            rows_formatted = rows
-        return "\n".join(rows_formatted)
+        for frame_codes, frame_colors in zip(codes, colors)
+    ]
+
+
+def codes_to_string(codes: np.ndarray, rstrip: bool = True) -> str:
+    """
+    Join braille characters to rows, and rows with a linebreak.
+    :param codes: 2d array of braille dot bit masks in range 0-255.
+    :param rstrip: whether to strip invisible characters from ends of rows.
+    :return: multiline string of braille characters.
+    """
+    # Add to get the right offset for unicode braille code point
+    code_points = codes.astype("int32") + BRAILLE_CODEPOINT_START
+    rows = (row.view(dtype=f"U{row.size}").item() for row in code_points)
+    if rstrip:
+        rows_formatted = (line.rstrip(chr(BRAILLE_CODEPOINT_START)) for line in rows)
     else:
-        # If colored array is provided, each color channel is split to tiles, similarly to the gray array.
-        # For each braille character there are 3 tiles from separate red, green and blue channels.
-        # Averages of a tile from each 3 channels gives 3 values, rgb. Those will be used
-        # to create and ANSI escape sequence to give a color to the corresponding braille character.
-        colored_tile_means = (
-            split_to_tiles(color_arr, tile_height, tile_width)
-            .mean(axis=(2, 3))
-            .astype(int)
+        rows_formatted = rows
+    return "\n".join(rows_formatted)
+
+
+def codes_to_bytes(codes: np.ndarray, rstrip: bool = True) -> bytes:
+    """
+    UTF-8 encoded `codes_to_string`, without building a string. The UTF-8 bytes of
+    every character are written straight into a preallocated buffer that already has
+    the linebreaks, and rows are stripped on the codes before encoding.
+    :param codes: 2d array of braille dot bit masks in range 0-255.
+    :param rstrip: whether to strip invisible characters from ends of rows.
+    :return: UTF-8 encoded braille characters, rows separated with a linebreak.
+    """
+    rows, cols = codes.shape
+    if not rows:
+        return b""
+    codes = codes.astype(np.uint8, copy=False)
+    out = np.empty((rows, cols * 3 + 1), dtype=np.uint8)
+    out[:, -1] = ord("\n")
+    glyphs = out[:, :-1].reshape(rows, cols, 3)
+    glyphs[..., 0] = _BRAILLE_UTF8_LEAD
+    np.bitwise_or(codes >> 6, _BRAILLE_UTF8_HIGH, out=glyphs[..., 1])
+    np.bitwise_or(codes & 0x3F, _BRAILLE_UTF8_LOW, out=glyphs[..., 2])
+    if not rstrip or not cols:
+        return out.reshape(-1)[:-1].tobytes()
+
+    # Only rows that end with a blank character are stripped, each row ends after
+    # its last non-blank character.
+    stripped = np.flatnonzero(codes[:, -1] == 0)
+    if not stripped.size:
+        return out.reshape(-1)[:-1].tobytes()
+    positions = np.arange(1, cols + 1, dtype=np.min_scalar_type(cols))
+    lengths = np.full(rows, cols)
+    lengths[stripped] = ((codes[stripped] != 0) * positions).max(axis=1)
+    return b"\n".join(
+        [
+            out[row, : length * 3].tobytes()
+            for row, length in enumerate(lengths.tolist())
+        ]
+    )
+
+
+def render(
+    dot_arr: np.ndarray,
+    color_arr: Optional[np.ndarray] = None,
+    rstrip: bool = True,
+    tile: np.ndarray = BRAILLE_TILE,
+    color_mode: ColorMode = "truecolor",
+    coalesce: bool = False,
+    color_tolerance: int = 0,
+) -> str:
+    """
+    Create a braille unicode representation of a numpy array. dot_arr will be
+    used to form the braille unicode characters. One pixel/value in dot_arr equals
+    one dot in braille character. If color_arr is given, the output braille characters
+    will also be colored with ANSI escape codes.
+    :param dot_arr: array that determines the on/off status of braille dots.
+    :param color_arr: optional array that will be used to color the
+    braille characters with ansi escape sequences.
+    :param rstrip: whether to strip invisible characters from ends of rows.
+    :param tile: braille tile.
+    :param color_mode: "truecolor", "256" or "16". See `colorize_codes`.
+    :param coalesce: emit color escape sequences only when the color changes.
+    :param color_tolerance: maximum rgb difference for colors to be coalesced.
+    :return:
+    """
+    codes, colors = render_cells(dot_arr, color_arr, tile)
+    if colors is None:
+        return codes_to_string(codes, rstrip)
+    return colorize_codes(
+        codes,
+        colors,
+        rstrip,
+        color_mode=color_mode,
+        coalesce=coalesce,
+        color_tolerance=color_tolerance,
+    )
+
+
+def render_bytes(
+    dot_arr: np.ndarray,
+    color_arr: Optional[np.ndarray] = None,
+    rstrip: bool = True,
+    tile: np.ndarray = BRAILLE_TILE,
+    color_mode: ColorMode = "truecolor",
+    coalesce: bool = False,
+    color_tolerance: int = 0,
+) -> bytes:
+    """
+    Same as `render(...).encode()`, but encodes the characters straight to UTF-8
+    without building a string. Arguments are the same as in `render`.
+    :return: UTF-8 encoded output, ready to be written to a binary stream like
+    `sys.stdout.buffer`.
+    """
+    codes, colors = render_cells(dot_arr, color_arr, tile)
+    if colors is None:
+        return codes_to_bytes(codes, rstrip)
+    return colorize_codes_to_bytes(
+        codes, colors, rstrip, color_mode, coalesce, color_tolerance
+    )
+
+
+def iter_render(
+    dot_arr: np.ndarray,
+    color_arr: Optional[np.ndarray] = None,
+    rstrip: bool = True,
+    tile: np.ndarray = BRAILLE_TILE,
+    color_mode: ColorMode = "truecolor",
+    coalesce: bool = False,
+    color_tolerance: int = 0,
+    chunk_rows: int = 64,
+) -> Iterator[bytes]:
+    """
+    Render like `render`, but yield the output as UTF-8 in chunks of rows instead of
+    building the whole string. Only one chunk of characters is held in memory at a
+    time, so the first rows of a large render can be written out before the last
+    ones are done. The chunks joined are `render(...).encode()`, except that with
+    coalesce the color escape sequence is repeated at the start of each chunk.
+    Arguments are the same as in `render`.
+    :param chunk_rows: amount of rows of braille characters in each chunk.
+    :return: generator of UTF-8 encoded chunks of the output.
+    """
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be at least 1")
+    if color_arr is not None and color_mode not in _COLOR_MODE_HEADERS:
+        raise ValueError(
+            f"color_mode must be one of {list(_COLOR_MODE_HEADERS)}, got {color_mode!r}"
+        )
+    _validate_render_arguments(dot_arr, color_arr)
+
+    # Pad and crop once like render_cells, so every band is whole tiles.
+    arr_height, arr_width = dot_arr.shape
+    if arr_height < 4 or arr_width < 2:
+        padding = ((0, max(4 - arr_height, 0)), (0, max(2 - arr_width, 0)))
+        dot_arr = np.pad(dot_arr, padding)
+        if color_arr is not None:
+            color_arr = np.pad(color_arr, (*padding, (0, 0)))
+    tile_height, tile_width = tile.shape
+    arr_height, arr_width = dot_arr.shape
+    dot_arr = dot_arr[arr_height % tile_height :, arr_width % tile_width :]
+    if color_arr is not None:
+        color_arr = color_arr[arr_height % tile_height :, arr_width % tile_width :]
+
+    band_height = chunk_rows * tile_height
+    for top in range(0, dot_arr.shape[0], band_height):
+        if top:
+            yield b"\n"
+        band = slice(top, top + band_height)
+        codes, colors = render_cells(
+            dot_arr[band], None if color_arr is None else color_arr[band], tile
         )
+        if colors is None:
+            yield codes_to_bytes(codes, rstrip)
+        else:
+            yield _encode_colored_rows(
+                codes, colors, rstrip, color_mode, coalesce, color_tolerance
+            )
+    if color_arr is not None:
+        yield _ANSI_RESET_COLORS_BYTES
 
-        # View the tile sum array as unicode. View contains the braille characters
-        unicode_buf = tile_sums.view("U2")
-        return colorize_view(unicode_buf, colored_tile_means)
+
+def render_to(
+    file: BinaryIO,
+    dot_arr: np.ndarray,
+    color_arr: Optional[np.ndarray] = None,
+    **kwargs,
+) -> int:
+    """
+    Write the output of `iter_render` to a binary stream as it is rendered.
+    :param file: binary stream, like `sys.stdout.buffer` or a file opened with "wb".
+    :param dot_arr: array that determines the on/off status of braille dots.
+    :param color_arr: optional array for the colors of the braille characters.
+    :param kwargs: other arguments of `iter_render`.
+    :return: amount of bytes written.
+    """
+    written = 0
+    for chunk in iter_render(dot_arr, color_arr, **kwargs):
+        file.write(chunk)
+        written += len(chunk)
+    return written
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Optional
+
+import numpy as np
+
+# Increment when rendering changes in a way that makes previously cached frames
+# invalid. Frames cached with another version are never read.
+CACHE_VERSION: int = 3
+
+
+def default_cache_directory() -> str:
+    """Directory for the render cache, following the XDG base directory spec."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "imgtobraille")
+
+
+class RenderCache:
+    """
+    Persistent on-disk cache of rendered frames. Frames are keyed on the source
+    file's path, size and modification time, every rendering parameter and
+    `CACHE_VERSION`. They are stored as .npy files of one byte per braille cell and
+    memory-mapped when loaded.
+    """
+
+    directory: str
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = os.path.join(
+            directory or default_cache_directory(), f"v{CACHE_VERSION}"
+        )
+
+    def key(self, path: str, **params: Any) -> str:
+        """
+        Calculate the cache key of a source file rendered with the given parameters.
+        :param path: path to the source file.
+        :param params: every parameter that affects the rendered frame. Values must
+        be serializable to json.
+        :return: hex digest identifying the rendered frame.
+        """
+        stat = os.stat(path)
+        identity = {
+            "version": CACHE_VERSION,
+            "path": os.path.realpath(path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "params": params,
+        }
+        encoded = json.dumps(identity, sort_keys=True, default=list).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npy")
+
+    def load(self, path: str, **params: Any) -> Optional[np.ndarray]:
+        """
+        Load a cached frame.
+        :return: memory-mapped read-only array of braille dot bit masks, or None if
+        the frame is not cached.
+        """
+        try:
+            return np.load(self._path(self.key(path, **params)), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def store(self, path: str, codes: np.ndarray, **params: Any) -> None:
+        """
+        Store a rendered frame. The file is written atomically, so concurrent
+        readers and writers never see partially written frames.
+        :param path: path to the source file.
+        :param codes: 2d array of braille dot bit masks in range 0-255.
+        :param params: every parameter that affects the rendered frame.
+        """
+        cache_path = self._path(self.key(path, **params))
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+        try:
+            with os.fdopen(fd, "wb") as file_obj:
+                np.save(file_obj, codes.astype(np.uint8))
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
@@ -0,0 +1,213 @@
+"""
+Numba kernels of `render`. Kept in their own module so that `render` imports numba
+only when a kernel is first used, and showing frames that are already rendered
+doesn't import it at all.
+"""
+
+import numba as nb
+import numpy as np
+
+
+@nb.njit(cache=True)
+def encode_colored(
+    codes: np.ndarray,
+    colors: np.ndarray,
+    header: np.ndarray,
+    digits: np.ndarray,
+    digit_lengths: np.ndarray,
+    rstrip: bool,
+    coalesce: bool,
+    tolerance: int,
+    out: np.ndarray,
+) -> int:
+    """
+    Write colored braille characters as UTF-8 into `out`. Each escape sequence is
+    `header` followed by the cell's values from `colors` separated by semicolons.
+    Without coalescing the output is identical to what `render.colorize_view` produces,
+    excluding the final reset.
+    :return: amount of bytes written to `out`.
+    """
+    rows, cols = codes.shape
+    nvalues = colors.shape[2]
+    last_values = np.zeros(nvalues, dtype=np.int64)
+    has_color = False
+    pos = 0
+    for y in range(rows):
+        if y:
+            out[pos] = 10
+            pos += 1
+        end = cols
+        if rstrip and coalesce:
+            while end > 0 and codes[y, end - 1] == 0:
+                end -= 1
+        for x in range(end):
+            code = codes[y, x]
+
+            emit = True
+            if coalesce:
+                # Blank characters look the same in any color.
+                if code == 0:
+                    emit = False
+                elif has_color:
+                    emit = False
+                    for i in range(nvalues):
+                        if abs(colors[y, x, i] - last_values[i]) > tolerance:
+                            emit = True
+                            break
+            if emit:
+                for byte in header:
+                    out[pos] = byte
+                    pos += 1
+                for i in range(nvalues):
+                    if i:
+                        out[pos] = 59
+                        pos += 1
+                    value = colors[y, x, i]
+                    for digit in range(digit_lengths[value]):
+                        out[pos] = digits[value, digit]
+                        pos += 1
+                    last_values[i] = value
+                out[pos] = 109
+                pos += 1
+                has_color = True
+
+            # Same as rstrip of the row string: only a blank character at the very
+            # end can be stripped, because an escape sequence always precedes it.
+            if rstrip and code == 0 and x == cols - 1:
+                continue
+            # UTF-8 encoding of the code points U+2800 - U+28FF
+            out[pos] = 0xE2
+            out[pos + 1] = 0xA0 | (code >> 6)
+            out[pos + 2] = 0x80 | (code & 0x3F)
+            pos += 3
+    return pos
+
+
+@nb.njit(cache=True)
+def write_decimal(value: int, out: np.ndarray, pos: int) -> int:
+    """Write a non-negative integer as ASCII digits into `out` at `pos`."""
+    length = 1
+    while value >= 10**length:
+        length += 1
+    for i in range(length - 1, -1, -1):
+        out[pos + i] = 48 + value % 10
+        value //= 10
+    return pos + length
+
+
+@nb.njit(cache=True)
+def encode_changed_cells(
+    codes: np.ndarray,
+    colors: np.ndarray,
+    changed: np.ndarray,
+    header: np.ndarray,
+    max_gap: int,
+    out: np.ndarray,
+) -> int:
+    """
+    Write the changed braille characters as UTF-8 into `out`, each run of changed
+    characters preceded by a cursor positioning escape sequence. Unchanged characters
+    between changed ones are rewritten when there are at most `max_gap` of them.
+    Colors are written only when they change, like with coalescing in `encode_colored`.
+    :return: amount of bytes written to `out`.
+    """
+    rows, cols = codes.shape
+    nvalues = colors.shape[2]
+    last_values = np.zeros(nvalues, dtype=np.int64)
+    has_color = False
+    pos = 0
+    for y in range(rows):
+        x = 0
+        while x < cols:
+            if not changed[y, x]:
+                x += 1
+                continue
+
+            # Move the cursor, rows and columns start from 1
+            out[pos] = 27
+            out[pos + 1] = 91
+            pos = write_decimal(y + 1, out, pos + 2)
+            out[pos] = 59
+            pos = write_decimal(x + 1, out, pos + 1)
+            out[pos] = 72
+            pos += 1
+
+            while x < cols:
+                if not changed[y, x]:
+                    ahead = x
+                    while (
+                        ahead < cols and ahead - x < max_gap and not changed[y, ahead]
+                    ):
+                        ahead += 1
+                    if ahead == cols or not changed[y, ahead]:
+                        break
+
+                code = codes[y, x]
+                if nvalues and code != 0:
+                    emit = not has_color
+                    for i in range(nvalues):
+                        if colors[y, x, i] != last_values[i]:
+                            emit = True
+                    if emit:
+                        for byte in header:
+                            out[pos] = byte
+                            pos += 1
+                        for i in range(nvalues):
+                            if i:
+                                out[pos] = 59
+                                pos += 1
+                            pos = write_decimal(colors[y, x, i], out, pos)
+                            last_values[i] = colors[y, x, i]
+                        out[pos] = 109
+                        pos += 1
+                        has_color = True
+
+                out[pos] = 0xE2
+                out[pos + 1] = 0xA0 | (code >> 6)
+                out[pos + 2] = 0x80 | (code & 0x3F)
+                pos += 3
+                x += 1
+    return pos
+
+
+@nb.njit(cache=True)
+def pack_tiles(dot_arrs: np.ndarray, tile: np.ndarray, out: np.ndarray) -> None:
+    """
+    Sum the tile values of the dots that are on for every tile of every frame,
+    reading each dot once and writing the sums straight into `out`. Dot values are
+    clipped to 0-1 like in `np.clip(...) * tile`.
+    :param dot_arrs: array of shape (frames, height, width).
+    :param tile: braille tile.
+    :param out: array of shape (frames, height // tile height, width // tile width).
+    """
+    tile_height, tile_width = tile.shape
+    frames, rows, columns = out.shape
+    for frame in range(frames):
+        for row in range(rows):
+            for column in range(columns):
+                total = 0 * dot_arrs[frame, 0, 0] * tile[0, 0]
+                for y in range(tile_height):
+                    for x in range(tile_width):
+                        value = dot_arrs[
+                            frame, row * tile_height + y, column * tile_width + x
+                        ]
+                        total += min(max(value, 0), 1) * tile[y, x]
+                out[frame, row, column] = int(total)
+
+
+@nb.njit(cache=True)
+def pack_tiles_4x2(dot_arrs: np.ndarray, tile: np.ndarray, out: np.ndarray) -> None:
+    """
+    `pack_tiles` for 4x2 tiles. The constant loop bounds let numba unroll and
+    vectorize the tile loops, which is many times faster than the generic kernel.
+    """
+    frames, rows, columns = out.shape
+    for frame in range(frames):
+        for row in range(rows):
+            for column in range(columns):
+                total = 0 * dot_arrs[frame, 0, 0] * tile[0, 0]
+                for y in range(4):
+                    for x in range(2):
+                        value = dot_arrs[frame, row * 4 + y, column * 2 + x]
+                        total += min(max(value, 0), 1) * tile[y, x]
+                out[frame, row, column] = int(total)
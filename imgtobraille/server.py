@@ -0,0 +1,562 @@
+"""
+Long-running render server, for services that would otherwise start
+`python -m imgtobraille` for every image and pay for the interpreter start-up,
+loading the numba kernels and importing OpenCV each time.
+
+The server listens on a localhost HTTP port. Images are rendered by a pool of
+worker processes that load the kernels once when they start:
+    python -m imgtobraille.server -port 8765 -workers 4
+
+    POST /render?width=80&height=40[&dither=bayer4][&diffusion=0.8][&color=256]
+        The body is the contents of an image file. Responds with the braille text.
+    POST /render?path=/path/to/image.jpg&width=80&height=40
+        Renders an image file readable by the server.
+    GET /stats
+        Request counts, queue depth and latency percentiles as JSON.
+
+Requests wait in a bounded queue. When it is full the server responds with
+503 Service Unavailable right away instead of letting the latency grow, and
+clients should retry later. Waiting requests are shared between the free workers
+in batches of at most `batch_size` requests, so under load the cost of passing
+work between processes is shared by several requests, while a burst on an idle
+server is still spread over all the workers.
+
+`RenderClient` is a small client that keeps its connection alive.
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import functools
+import http.client
+import http.server
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+from typing import Optional, Union
+
+from imgtobraille import dither_methods
+from imgtobraille import pipeline
+from imgtobraille.lazy import lazy_import
+
+# Only the worker processes render, the server process doesn't need OpenCV or
+# numba.
+arr_filters = lazy_import("imgtobraille.arr_filters")
+media_io = lazy_import("imgtobraille.media_io")
+precompile = lazy_import("imgtobraille.precompile")
+render = lazy_import("imgtobraille.render")
+
+DEFAULT_PORT: int = 8765
+# Errors of a kept-alive connection that the server closed while it was idle.
+_CLOSED_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+COLOR_MODES: tuple[str, ...] = ("truecolor", "256", "16")
+
+# Image file contents or a path to an image file, (width, height) of the output in
+# characters, the error diffusion level, the dithering method and the color mode or
+# None for no colors.
+RenderRequest = tuple[
+    Union[bytes, str],
+    tuple[int, int],
+    float,
+    dither_methods.DitherMethod,
+    Optional[str],
+]
+
+
+def render_request(request: RenderRequest) -> str:
+    """
+    Render an image the same way as the cli.
+    :param request: see `RenderRequest`.
+    :return: braille text, with ANSI escape sequences if colored.
+    """
+    image, (width, height), dithering, method, color_mode = request
+    image_width, image_height = width * 2, height * 4
+    mode = 0 if color_mode is None else 1
+    if isinstance(image, str):
+        arr = media_io.read_image_file(image, mode, image_width, image_height)
+    else:
+        arr = media_io.decode_image(image, mode, image_width, image_height)
+        if mode == 1:
+            arr = arr[..., ::-1]  # decode_image returns bgr
+    arr = arr_filters.fit_in_box(arr, image_width, image_height)
+    if color_mode is None:
+        return render.render(arr_filters.dither(arr, method, dithering))
+    dots = arr_filters.dither(arr_filters.rgb_to_grayscale(arr), method, dithering)
+    return render.render(dots, arr, color_mode=color_mode)
+
+
+def render_batch(requests: list[RenderRequest]) -> list[Union[str, Exception]]:
+    """
+    Render a batch of requests in a worker. A failing request doesn't fail the
+    others, its exception is returned in place of its text.
+    """
+    results = []
+    for request in requests:
+        try:
+            results.append(render_request(request))
+        except Exception as error:
+            results.append(error)
+    return results
+
+
+def _warm_up() -> None:
+    """Load or compile every kernel before the worker takes requests."""
+    precompile.precompile()
+
+
+def _start_worker_process() -> None:
+    # Ctrl+C reaches the whole process group, the server shuts the workers down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _warm_up()
+
+
+def _ready() -> None:
+    pass
+
+
+class _Job:
+    __slots__ = ("request", "future", "queued_at")
+
+    def __init__(self, request: RenderRequest):
+        self.request = request
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.queued_at = time.monotonic()
+
+
+class RenderServer:
+    """
+    Render requests with a pool of warm workers. Requests are submitted with
+    `submit`, or over HTTP after calling `serve_forever`. Use as a context manager
+    or call close.
+    """
+
+    workers: int
+    batch_size: int
+    requests: int
+    rejected: int
+    batches: int
+
+    def __init__(
+        self,
+        address: tuple[str, int] = ("127.0.0.1", DEFAULT_PORT),
+        workers: int = 0,
+        max_queue: int = 64,
+        batch_size: int = 8,
+        max_samples: int = 10000,
+    ):
+        """
+        :param address: host and port to listen on. Port 0 picks a free port, see
+        `address`.
+        :param workers: amount of worker processes. 0 uses all cpu cores, 1 renders
+        in a thread of the server process.
+        :param max_queue: maximum amount of requests waiting for a worker. Requests
+        beyond it are rejected.
+        :param batch_size: maximum amount of waiting requests sent to a worker at
+        a time. Smaller batches are sent when other workers are free.
+        :param max_samples: amount of latest requests the latency percentiles are
+        calculated from.
+        """
+        if workers < 0:
+            raise ValueError(f"workers must not be negative, got {workers}")
+        if max_queue < 1 or batch_size < 1:
+            raise ValueError("max_queue and batch_size must be at least 1")
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.latency = pipeline.LatencyStats(max_samples)
+        self.queue_latency = pipeline.LatencyStats(max_samples)
+        self._lock = threading.Lock()
+        self._queue: queue.Queue[Optional[_Job]] = queue.Queue(max_queue)
+        # A batch is only taken from the queue when a worker is free, so requests
+        # wait in the bounded queue and not in the executor.
+        self._free_workers = threading.Semaphore(self.workers)
+        self._idle_workers = self.workers
+        self._http = http.server.ThreadingHTTPServer(address, _RenderHandler)
+        self._http.daemon_threads = True
+        self._http.render_server = self
+
+        # Workers are spawned instead of forked, so they don't inherit the threads
+        # of the server.
+        if self.workers == 1:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                1, initializer=_warm_up
+            )
+        else:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_start_worker_process,
+            )
+        for future in [self._executor.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    @property
+    def address(self) -> tuple[str, int]:
+        """Host and port the server listens on."""
+        return self._http.server_address[:2]
+
+    def submit(self, request: RenderRequest) -> concurrent.futures.Future:
+        """
+        Queue a request.
+        :param request: see `RenderRequest`.
+        :return: future of the braille text.
+        :raises queue.Full: if the queue is full.
+        """
+        job = _Job(request)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise
+        with self._lock:
+            self.requests += 1
+        job.future.add_done_callback(functools.partial(self._finish_job, job))
+        return job.future
+
+    def _finish_job(self, job: _Job, future: concurrent.futures.Future) -> None:
+        self.latency.add(time.monotonic() - job.queued_at)
+
+    def _dispatch(self) -> None:
+        """Send batches of waiting requests to free workers."""
+        while True:
+            self._free_workers.acquire()
+            job = self._queue.get()
+            if job is None:
+                return
+            # Leave a share of the waiting requests to the other free workers.
+            with self._lock:
+                idle_workers = self._idle_workers
+                self._idle_workers -= 1
+            waiting = 1 + self._queue.qsize()
+            batch_size = min(self.batch_size, -(-waiting // idle_workers))
+            batch = [job]
+            while len(batch) < batch_size:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._queue.put(None)
+                    break
+                batch.append(job)
+
+            now = time.monotonic()
+            for job in batch:
+                self.queue_latency.add(now - job.queued_at)
+            with self._lock:
+                self.batches += 1
+            future = self._executor.submit(render_batch, [job.request for job in batch])
+            future.add_done_callback(functools.partial(self._finish_batch, batch))
+
+    def _finish_batch(self, batch: list[_Job], future: concurrent.futures.Future):
+        with self._lock:
+            self._idle_workers += 1
+        self._free_workers.release()
+        error = future.exception()
+        for index, job in enumerate(batch):
+            result = error or future.result()[index]
+            if isinstance(result, BaseException):
+                job.future.set_exception(result)
+            else:
+                job.future.set_result(result)
+
+    def stats(self) -> dict:
+        """Request counts, queue depth and latency percentiles in seconds."""
+
+        def percentiles(latency: pipeline.LatencyStats) -> dict:
+            return {
+                f"p{percent}": latency.percentile(percent) for percent in (50, 95, 99)
+            }
+
+        with self._lock:
+            counts = {
+                "requests": self.requests,
+                "rejected": self.rejected,
+                "batches": self.batches,
+            }
+        return {
+            **counts,
+            "queued": self._queue.qsize(),
+            "workers": self.workers,
+            "latency": percentiles(self.latency),
+            "queue_latency": percentiles(self.queue_latency),
+        }
+
+    def serve_forever(self) -> None:
+        """Handle HTTP requests until `shutdown` is called."""
+        self._http.serve_forever()
+
+    def shutdown(self) -> None:
+        """Stop `serve_forever`, from another thread."""
+        self._http.shutdown()
+
+    def close(self) -> None:
+        """Stop the dispatcher and the workers after the queued requests."""
+        self._http.server_close()
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._executor.shutdown()
+
+    def __enter__(self) -> RenderServer:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def parse_query(query: str, body: bytes) -> RenderRequest:
+    """
+    Make a request of the query parameters and body of a POST /render request.
+    :raises ValueError: if a parameter is missing or invalid.
+    """
+    params = dict(urllib.parse.parse_qsl(query))
+    try:
+        width, height = int(params["width"]), int(params["height"])
+        dithering = float(params.get("diffusion", 0.8))
+    except KeyError as error:
+        raise ValueError(f"Missing parameter {error}") from None
+    if width < 1 or height < 1:
+        raise ValueError("width and height must be at least 1")
+    method = params.get("dither", "floyd-steinberg")
+    if method not in dither_methods.DITHER_METHODS:
+        raise ValueError(f"dither must be one of {dither_methods.DITHER_METHODS}")
+    color_mode = params.get("color")
+    if color_mode is not None and color_mode not in COLOR_MODES:
+        raise ValueError(f"color must be one of {COLOR_MODES}")
+    image = params.get("path", body)
+    if not image:
+        raise ValueError("Either a path or the image in the body is required")
+    return image, (width, height), dithering, method, color_mode
+
+
+class _RenderHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive
+    server: http.server.ThreadingHTTPServer
+
+    def _respond(
+        self, status: int, body: bytes, content_type: str = "text/plain; charset=utf-8"
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urllib.parse.urlsplit(self.path).path != "/stats":
+            self._respond(404, b"Not found\n")
+            return
+        stats = self.server.render_server.stats()
+        self._respond(200, json.dumps(stats).encode(), "application/json")
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length < 0:
+                raise ValueError(f"negative length {length}")
+        except ValueError as error:
+            # The end of the body is unknown, so the connection can't be reused.
+            self.close_connection = True
+            self._respond(400, f"Invalid Content-Length: {error}\n".encode())
+            return
+        body = self.rfile.read(length)
+        if url.path != "/render":
+            self._respond(404, b"Not found\n")
+            return
+        try:
+            request = parse_query(url.query, body)
+            text = self.server.render_server.submit(request).result()
+        except queue.Full:
+            self._respond(503, b"Render queue is full\n")
+        except FileNotFoundError as error:
+            self._respond(404, f"File not found: {error}\n".encode())
+        except ValueError as error:
+            self._respond(400, f"{error}\n".encode())
+        except Exception as error:
+            self._respond(500, f"{type(error).__name__}: {error}\n".encode())
+        else:
+            self._respond(200, text.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class RenderClient:
+    """
+    Client of a `RenderServer` that keeps its connection alive between requests.
+    Not thread safe, use a client per thread.
+    """
+
+    def __init__(
+        self,
+        address: tuple[str, int] = ("127.0.0.1", DEFAULT_PORT),
+        timeout: float = 60,
+    ):
+        self.connection = http.client.HTTPConnection(*address, timeout=timeout)
+
+    def _request(self, method: str, target: str, body: bytes = b"") -> bytes:
+        while True:
+            reused = self.connection.sock is not None
+            try:
+                self.connection.request(method, target, body)
+                response = self.connection.getresponse()
+                content = response.read()
+                break
+            except BaseException as error:
+                # A connection left mid-request can't send the next request, so it
+                # is closed after any error and reconnects on the next request. The
+                # server may also close an idle kept-alive connection, the request
+                # is then retried on a new connection.
+                self.connection.close()
+                if not (reused and isinstance(error, _CLOSED_CONNECTION_ERRORS)):
+                    raise
+        if response.status != 200:
+            raise urllib.error.HTTPError(
+                target,
+                response.status,
+                content.decode(errors="replace").strip() or response.reason,
+                response.headers,
+                None,
+            )
+        return content
+
+    def render(
+        self,
+        image: Union[bytes, str],
+        width: int,
+        height: int,
+        dither: dither_methods.DitherMethod = "floyd-steinberg",
+        diffusion: float = 0.8,
+        color: Optional[str] = None,
+    ) -> str:
+        """
+        Render an image on the server.
+        :param image: contents of an image file, or a path to an image file
+        readable by the server.
+        :param width: width of the output in characters.
+        :param height: height of the output in characters.
+        :param dither: dithering method, see `arr_filters.dither`.
+        :param diffusion: error diffusion level, see `arr_filters.fl_dithering`.
+        :param color: color mode, None for no colors.
+        :return: braille text.
+        :raises urllib.error.HTTPError: if the server responds with an error, with
+        the status 503 if its queue is full.
+        """
+        params = dict(width=width, height=height, dither=dither, diffusion=diffusion)
+        if color is not None:
+            params["color"] = color
+        body = image
+        if isinstance(image, str):
+            params["path"] = os.path.abspath(image)
+            body = b""
+        target = f"/render?{urllib.parse.urlencode(params)}"
+        return self._request("POST", target, body).decode()
+
+    def stats(self) -> dict:
+        """Request counts and latencies of the server, see `RenderServer.stats`."""
+        return json.loads(self._request("GET", "/stats"))
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> RenderClient:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "-host",
+        action="store",
+        metavar="host",
+        default="127.0.0.1",
+        help="Address to listen on.",
+    )
+    parser.add_argument(
+        "-port",
+        action="store",
+        metavar="port",
+        default=DEFAULT_PORT,
+        type=int,
+        help=f"Port to listen on, defaults to {DEFAULT_PORT}.",
+    )
+    parser.add_argument(
+        "-workers",
+        action="store",
+        metavar="workers",
+        default=0,
+        type=int,
+        help="Amount of processes for rendering. 0=all cpu cores.",
+    )
+    parser.add_argument(
+        "-queue",
+        action="store",
+        metavar="requests",
+        default=64,
+        type=int,
+        help="Maximum amount of requests waiting for a worker, beyond which "
+        "requests are rejected with 503.",
+    )
+    parser.add_argument(
+        "-batch",
+        action="store",
+        metavar="requests",
+        default=8,
+        type=int,
+        help="Maximum amount of waiting requests sent to a worker at a time.",
+    )
+    args = parser.parse_args()
+    if args.workers < 0:
+        parser.error('Argument "-workers" must not be negative.')
+    if args.queue < 1 or args.batch < 1:
+        parser.error('Arguments "-queue" and "-batch" must be at least 1.')
+
+    start = time.perf_counter()
+    with RenderServer(
+        (args.host, args.port), args.workers, args.queue, args.batch
+    ) as server:
+        host, port = server.address
+        print(
+            f"Serving on http://{host}:{port} with {server.workers} worker(s), "
+            f"ready in {time.perf_counter() - start:.1f} s",
+            file=sys.stderr,
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stats = server.stats()
+            print(
+                f"{stats['requests']} request(s), {stats['rejected']} rejected, "
+                f"{stats['batches']} batch(es), {server.latency.summary()}",
+                file=sys.stderr,
+            )
+
+
+if __name__ == "__main__":
+    main()
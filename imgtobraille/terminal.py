@@ -0,0 +1,93 @@
+from typing import Optional
+
+import numpy as np
+
+from imgtobraille import render
+
+CLEAR_SCREEN: str = "\033[2J"
+CURSOR_HOME: str = "\033[H"
+HIDE_CURSOR: str = "\033[?25l"
+SHOW_CURSOR: str = "\033[?25h"
+
+
+class FrameDiffEncoder:
+    """
+    Encode a sequence of frames for drawing over each other on a terminal. After the
+    first frame only the characters and colors that changed from the previous frame
+    are redrawn, using cursor positioning escape sequences. A full redraw is used
+    whenever it would be smaller than the changes.
+    """
+
+    color_mode: render.ColorMode
+    max_gap: int
+
+    def __init__(self, color_mode: render.ColorMode = "truecolor", max_gap: int = 4):
+        self.color_mode = color_mode
+        self.max_gap = max_gap
+        self.previous_codes: Optional[np.ndarray] = None
+        self.previous_values: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        """Forget the previous frame, so that the next frame is fully redrawn."""
+        self.previous_codes = None
+        self.previous_values = None
+
+    def _color_values(self, colors: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Values that end up in the escape sequences, used for detecting changes."""
+        if colors is None or self.color_mode == "truecolor":
+            return colors
+        return render.quantize_colors(np.clip(colors, 0, 255), self.color_mode)
+
+    def _full_frame(self, codes: np.ndarray, colors: Optional[np.ndarray]) -> bytes:
+        if colors is None:
+            frame = render.codes_to_bytes(codes, rstrip=False)
+        else:
+            frame = render.colorize_codes_to_bytes(
+                codes, colors, rstrip=False, color_mode=self.color_mode, coalesce=True
+            )
+        return CURSOR_HOME.encode() + frame
+
+    def encode(self, codes: np.ndarray, colors: Optional[np.ndarray] = None) -> str:
+        """
+        Encode the next frame.
+        :param codes: 2d array of braille dot bit masks in range 0-255,
+        see `render.render_cells`.
+        :param colors: optional 3d array of rgb colors for each character.
+        :return: string that updates the previous frame on the terminal to this frame.
+        """
+        return self.encode_bytes(codes, colors).decode()
+
+    def encode_bytes(
+        self, codes: np.ndarray, colors: Optional[np.ndarray] = None
+    ) -> bytes:
+        """
+        UTF-8 encoded `encode`, for writing straight to a binary stream like
+        `sys.stdout.buffer`. Arguments are the same as in `encode`.
+        """
+        values = self._color_values(colors)
+        previous_codes, previous_values = self.previous_codes, self.previous_values
+        self.previous_codes, self.previous_values = codes, values
+
+        if (
+            previous_codes is None
+            or previous_codes.shape != codes.shape
+            or (previous_values is None) != (values is None)
+        ):
+            return CLEAR_SCREEN.encode() + self._full_frame(codes, colors)
+
+        changed = codes != previous_codes
+        if values is not None:
+            difference = values != previous_values
+            changed |= difference.any(axis=2) if difference.ndim == 3 else difference
+        if not changed.any():
+            return b""
+
+        diff = render.colorize_changed_cells_to_bytes(
+            codes, changed, colors, color_mode=self.color_mode, max_gap=self.max_gap
+        )
+        # A full redraw has at least 3 bytes per cell and a linebreak per row.
+        if len(diff) >= codes.size * 3 + codes.shape[0]:
+            full_frame = self._full_frame(codes, colors)
+            if len(full_frame) < len(diff):
+                return full_frame
+        return diff
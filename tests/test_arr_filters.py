@@ -0,0 +1,184 @@
+import numpy as np
+import pytest
+from cv2 import cv2
+
+from imgtobraille import arr_filters
+
+
+def reference_dithering(arr: np.ndarray, threshold=175, multiplier=0.8) -> np.ndarray:
+    """Plain python Floyd–Steinberg dithering, like the original implementation."""
+    padded = np.pad(arr, 1).astype(np.int16)
+    for y in range(1, padded.shape[0] - 1):
+        for x in range(1, padded.shape[1] - 1):
+            old_pixel = padded[y, x]
+            new_pixel = 255 if old_pixel > threshold else 0
+            padded[y, x] = new_pixel
+            quant_error = (old_pixel - new_pixel) * multiplier
+            padded[y, x + 1] += round(quant_error * 0.4375)
+            padded[y + 1, x - 1] += round(quant_error * 0.1875)
+            padded[y + 1, x] += round(quant_error * 0.3125)
+            padded[y + 1, x + 1] += round(quant_error * 0.0625)
+    return padded[1:-1, 1:-1]
+
+
+@pytest.mark.parametrize(
+    "strip_height, block_width", [(32, 64), (1, 1), (3, 5), (8, 2)]
+)
+def test_FloydSteinbergDitherer_exact_modes(strip_height, block_width):
+    arr = np.random.default_rng(4).integers(0, 256, (37, 45), dtype=np.uint8)
+    expected = reference_dithering(arr)
+    for mode in ("serial", "wavefront"):
+        ditherer = arr_filters.FloydSteinbergDitherer(
+            mode=mode, strip_height=strip_height, block_width=block_width
+        )
+        assert np.array_equal(ditherer(arr), expected)
+    assert np.array_equal(arr_filters.fl_dithering(arr), expected)
+
+
+def test_FloydSteinbergDitherer_reuses_buffer():
+    rng = np.random.default_rng(5)
+    ditherer = arr_filters.FloydSteinbergDitherer(mode="wavefront")
+    out = np.empty((20, 30), dtype=np.uint8)
+    ditherer(rng.integers(0, 256, (20, 30), dtype=np.uint8), out=out)
+    buffer = ditherer._buffer
+
+    arr = rng.integers(0, 256, (20, 30), dtype=np.uint8)
+    original = arr.copy()
+    assert ditherer(arr, out=out) is out
+    assert ditherer._buffer is buffer
+    assert np.array_equal(out, reference_dithering(arr))
+    assert np.array_equal(arr, original)
+
+    with pytest.raises(ValueError):
+        ditherer(arr, out=np.empty((20, 31), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        arr_filters.FloydSteinbergDitherer(mode="random")
+
+
+def test_FloydSteinbergDitherer_bands():
+    arr = np.random.default_rng(6).integers(0, 256, (200, 60), dtype=np.uint8)
+    ditherer = arr_filters.FloydSteinbergDitherer(mode="bands", strip_height=16)
+    dithered = ditherer(arr)
+    assert set(np.unique(dithered)) <= {0, 255}
+    # Only the rows near the seams between bands may differ.
+    assert np.mean(dithered != reference_dithering(arr)) < 0.1
+    assert np.array_equal(ditherer(arr), dithered)
+
+
+@pytest.mark.parametrize("method", arr_filters.THRESHOLD_MAPS)
+def test_ordered_dithering(method):
+    thresholds = arr_filters.threshold_map(method)
+    # Every threshold of the map is used equally often.
+    assert len(set(np.unique(thresholds, return_counts=True)[1])) == 1
+
+    arr = np.random.default_rng(7).integers(0, 256, (37, 45), dtype=np.uint8)
+    tiled = np.tile(thresholds, (37, 45))[:37, :45]
+    expected = np.where(arr > tiled, 255, 0)
+    out = np.empty_like(arr)
+    assert arr_filters.ordered_dithering(arr, method, out=out) is out
+    assert np.array_equal(out, expected)
+    assert np.array_equal(arr_filters.dither(arr, method), expected)
+
+    if method != "threshold":
+        # The share of dots that are on follows the brightness.
+        gray = np.full((64, 64), 64, dtype=np.uint8)
+        assert abs(arr_filters.ordered_dithering(gray, method).mean() - 64) < 1
+
+
+def test_blue_noise_matrix():
+    matrix = arr_filters.blue_noise_matrix(16)
+    assert np.array_equal(np.sort(matrix, axis=None), np.arange(256))
+    # The lowest quarter of the values is spread evenly over the 8x8 quadrants.
+    quadrants = (matrix < 64).reshape(2, 8, 2, 8).sum(axis=(1, 3))
+    assert (abs(quadrants - 16) <= 3).all()
+
+
+def test_fit_in_box_averages_area():
+    checkerboard = np.indices((400, 300)).sum(axis=0) % 2 * 255
+    resized = arr_filters.fit_in_box(checkerboard.astype(np.uint8), 30, 40)
+    assert resized.shape == (40, 30)
+    assert (abs(resized.astype(int) - 128) <= 1).all()
+
+
+def test_BoxResizer():
+    rng = np.random.default_rng(8)
+    frame = rng.integers(0, 256, (90, 160, 3), dtype=np.uint8)
+    resize = arr_filters.BoxResizer(40, 40, reuse_buffer=True)
+    resized = resize(frame)
+    assert np.array_equal(resized, arr_filters.fit_in_box(frame, 40, 40))
+    assert resize(frame[::-1]) is resized
+    assert np.array_equal(resized, arr_filters.fit_in_box(frame[::-1], 40, 40))
+
+    # The size is calculated again when the size of the frames changes.
+    assert resize(frame[:, :45]).shape == (40, 20, 3)
+    assert resize(frame[..., 0]).shape == (22, 40)
+
+
+def test_BoxResizer_shrinks_by_whole_factor_first():
+    gradient = np.tile(np.linspace(0, 255, 1003), (601, 1)).astype(np.uint8)
+    resize = arr_filters.BoxResizer(100, 100)
+    resized = resize(gradient)
+    assert resized.shape == (60, 100)
+    assert resize._reduction == 10
+    direct = cv2.resize(gradient, (100, 60), interpolation=cv2.INTER_AREA)
+    assert (abs(resized.astype(int) - direct) <= 1).all()
+
+    # Upscaling doesn't shrink first.
+    assert resize(gradient[:6, :10]).shape == (60, 100)
+    assert resize._reduction == 1
+
+
+def test_rgb_to_grayscale():
+    # Pure red, green and blue, weighted like in ITU-R BT.601.
+    rgb = np.array([[[255, 0, 0], [0, 255, 0], [0, 0, 255]]], dtype=np.uint8)
+    assert arr_filters.rgb_to_grayscale(rgb).tolist() == [[76, 150, 29]]
+    assert arr_filters.bgr_to_grayscale(rgb[..., ::-1].copy()).tolist() == [
+        [76, 150, 29]
+    ]
+
+    out = np.empty((1, 3), dtype=np.uint8)
+    assert arr_filters.rgb_to_grayscale(rgb, out) is out
+
+
+def test_changed_blocks():
+    previous = np.zeros((10, 7), dtype=np.uint8)
+    current = previous.copy()
+    current[9, 6] = 3
+    current[0, 0] = 1
+    assert arr_filters.changed_blocks(previous, current, 4, 4).tolist() == [
+        [True, False],
+        [False, False],
+        [False, True],
+    ]
+    assert arr_filters.changed_blocks(previous, current, 4, 4, tolerance=2).sum() == 1
+    colored = np.zeros((10, 7, 3), dtype=np.uint8)
+    assert not arr_filters.changed_blocks(colored, colored, 4, 4).any()
+
+
+def test_FloydSteinbergDitherer_incremental():
+    rng = np.random.default_rng(9)
+    frame = rng.integers(0, 256, (100, 60), dtype=np.uint8)
+    ditherer = arr_filters.FloydSteinbergDitherer(mode="incremental", strip_height=16)
+    ditherer(frame)
+    assert ditherer.dithered_rows.all()
+
+    # Only the band of the change and the band below it, whose overlap rows
+    # include the change, are dithered again.
+    changed = frame.copy()
+    changed[40:44, 10:20] = 255 - changed[40:44, 10:20]
+    dots = ditherer(changed)
+    assert np.flatnonzero(ditherer.dithered_rows).tolist() == list(range(32, 64))
+    fresh = arr_filters.FloydSteinbergDitherer(mode="incremental", strip_height=16)
+    assert np.array_equal(dots, fresh(changed))
+
+    ditherer(changed)
+    assert not ditherer.dithered_rows.any()
+    with pytest.raises(ValueError):
+        arr_filters.FloydSteinbergDitherer(threshold="mean", mode="incremental")
+
+    # Noise within the tolerance, like from video compression, isn't a change.
+    ditherer = arr_filters.get_ditherer(mode="incremental", tolerance=8)
+    ditherer(frame)
+    noise = rng.integers(-8, 9, frame.shape)
+    ditherer(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    assert not ditherer.dithered_rows.any()
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from imgtobraille import container
+from imgtobraille import media_io
+from imgtobraille import render
+from imgtobraille import terminal
+
+
+def test_container_roundtrip(tmp_path):
+    path = str(tmp_path / "frames.brc")
+    rng = np.random.default_rng(0)
+    frames = [
+        (rng.integers(0, 256, (3, 5)), rng.integers(0, 256, (3, 5, 3)))
+        for _ in range(4)
+    ]
+
+    assert container.write_frames(path, frames, 12.5, "truecolor") == 4
+    assert container.is_container(path)
+
+    with container.ContainerReader(path) as reader:
+        assert len(reader) == 4
+        assert (reader.rows, reader.columns, reader.fps) == (3, 5, 12.5)
+        assert reader.color_mode == "truecolor"
+        for index in [3, 0, -1, 2]:
+            codes, colors = reader[index]
+            assert np.array_equal(codes, frames[index][0])
+            assert np.array_equal(colors, frames[index][1])
+        assert len(list(reader)) == 4
+        with pytest.raises(IndexError):
+            reader[4]
+
+
+def test_container_palette(tmp_path):
+    path = str(tmp_path / "frames.brc")
+    codes = np.full((2, 2), 255)
+    colors = np.full((2, 2, 3), 250)
+    container.write_frames(path, [(codes, colors)], 25, "16")
+
+    with container.ContainerReader(path) as reader:
+        result_codes, result_colors = reader[0]
+        assert np.array_equal(result_codes, codes)
+        assert render.quantize_colors(result_colors, "16").tolist() == [[97, 97]] * 2
+
+
+@pytest.mark.parametrize("color_mode", ["256", "16"])
+def test_container_palette_playback(tmp_path, color_mode):
+    path = str(tmp_path / "frames.brc")
+    rng = np.random.default_rng(0)
+    codes = np.full((4, 64), 255)
+    colors = rng.integers(0, 256, (4, 64, 3))
+    # Grays 240, 244, 248 and 252 of the 256 color palette, which used to play back
+    # as other colors.
+    colors[0, :4] = np.array([88, 128, 168, 208])[:, np.newaxis]
+    container.write_frames(path, [(codes, colors)], 25, color_mode)
+
+    with container.ContainerReader(path) as reader:
+        played = terminal.FrameDiffEncoder(color_mode).encode(*reader[0])
+    assert played == terminal.FrameDiffEncoder(color_mode).encode(codes, colors)
+
+
+def test_ContainerWriter_shape_mismatch(tmp_path):
+    with container.ContainerWriter(str(tmp_path / "frames.brc"), 2, 2, 25) as writer:
+        with pytest.raises(ValueError):
+            writer.write(np.zeros((3, 2)))
+
+
+def test_is_container():
+    assert not container.is_container("test_media/frame.jpg")
+    assert not container.is_container("test_media")
+
+
+def test_convert_video(tmp_path):
+    path = str(tmp_path / "cube.brc")
+    video = media_io.VideoFile("./test_media/cube.mp4", color=True)
+    assert container.convert_video(video, path, (40, 40), 0.8, "256") == 99
+
+    with container.ContainerReader(path) as reader:
+        assert (len(reader), reader.rows, reader.columns) == (99, 10, 20)
+        assert reader.fps == 15
+        assert reader[50][1].shape == (10, 20, 3)
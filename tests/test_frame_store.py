@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from imgtobraille import frame_store
+
+
+def make_frame(value: int, colored: bool = False):
+    codes = np.full((3, 4), value, dtype=np.int64)
+    colors = np.full((3, 4, 3), value, dtype=np.int64) if colored else None
+    return codes, colors
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_FrameStore_roundtrip(compress):
+    store = frame_store.FrameStore(compress=compress)
+    store.put(0, *make_frame(7))
+    store.put(1, *make_frame(255, colored=True))
+
+    codes, colors = store.get(0)
+    assert codes.dtype == np.uint8
+    assert np.array_equal(codes, make_frame(7)[0])
+    assert colors is None
+
+    codes, colors = store.get(1)
+    assert np.array_equal(codes, make_frame(255)[0])
+    assert np.array_equal(colors, make_frame(255, colored=True)[1])
+    assert len(store) == 2
+
+
+def test_FrameStore_eviction_and_reload():
+    store = frame_store.FrameStore(
+        loader=lambda index: make_frame(index), max_bytes=24, compress=False
+    )
+    for index in range(3):
+        store.put(index, *make_frame(index))
+    assert len(store) == 2
+    assert 0 not in store
+    assert store.nbytes == 24
+    assert store.evictions == 1
+
+    # Reading 1 makes 2 the least recently used frame.
+    store.get(1)
+    codes, _ = store.get(0)
+    assert np.array_equal(codes, make_frame(0)[0])
+    assert store.reloads == 1
+    assert 2 not in store and 1 in store
+
+
+def test_FrameStore_missing_without_loader():
+    with pytest.raises(KeyError):
+        frame_store.FrameStore().get(0)
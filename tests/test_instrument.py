@@ -0,0 +1,85 @@
+import io
+import json
+import time
+
+from imgtobraille import instrument
+from imgtobraille import media_io
+from imgtobraille import pipeline
+
+
+def test_Stats_records_stages_and_hooks():
+    events = []
+    stats = instrument.Stats(hooks=[lambda *event: events.append(event)])
+
+    for _ in range(3):
+        with stats.stage("render") as timer:
+            time.sleep(0.001)
+            timer.nbytes = 10
+    stats.drop(2)
+    stats.frame()
+
+    render_stats = stats.stages["render"]
+    assert render_stats.count == 3
+    assert render_stats.bytes == 30
+    assert render_stats.seconds >= 0.003
+    assert render_stats.max_seconds <= render_stats.seconds
+    assert (stats.frames, stats.dropped) == (1, 2)
+    assert [name for name, _, _ in events] == ["render"] * 3 + ["drop"] * 2
+    assert stats.as_dict()["stages"]["render"]["count"] == 3
+    assert "render" in stats.summary() and "2 dropped" in stats.summary()
+
+
+def test_Stats_trace(tmp_path):
+    path = tmp_path / "trace.json"
+    with instrument.Stats(str(path)) as stats:
+        with stats.stage("dither"):
+            pass
+        stats.record("write", 0.5, nbytes=100)
+        stats.drop()
+
+    events = json.loads(path.read_text())
+    assert [event["name"] for event in events] == ["dither", "write", "drop"]
+    assert [event["ph"] for event in events] == ["X", "X", "i"]
+    assert events[1]["dur"] == 0.5e6
+    assert events[1]["args"] == {"bytes": 100}
+
+
+def test_Stats_rolling_report():
+    report = io.StringIO()
+    stats = instrument.Stats(report_interval=0.01, report_file=report)
+    stats.record("pack", 0.002)
+    stats.frame()
+    time.sleep(0.02)
+    stats.frame()
+
+    lines = report.getvalue().splitlines()
+    assert len(lines) == 1
+    assert lines[0].startswith("pack 2.00 ms")
+    assert "0 dropped" in lines[0]
+
+
+def test_DISABLED_records_nothing():
+    stats = instrument.DISABLED
+    with stats.stage("render") as timer:
+        timer.nbytes = 10
+    stats.record("write", 1.0)
+    stats.drop()
+    stats.frame()
+    assert list(stats.iterate([1, 2], "decode")) == [1, 2]
+    assert not stats.enabled
+    assert (stats.stages, stats.frames, stats.dropped) == ({}, 0, 0)
+
+
+def test_render_video_stats():
+    stats = instrument.Stats()
+    video = media_io.VideoFile("test_media/cube.mp4")
+    clock = pipeline.FrameClock(1000, stats)
+    frames = pipeline.render_video(
+        video, (40, 40), 0.8, "floyd-steinberg", clock, stats
+    )
+    shown = sum(1 for _ in frames)
+
+    assert set(stats.stages) >= {"decode", "resize", "dither", "pack"}
+    assert all(stats.stages[name].count == shown for name in ("decode", "pack"))
+    assert stats.dropped == clock.dropped
+    assert shown + stats.dropped == int(video.frame_count)
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+from imgtobraille.lazy import lazy_import
+
+
+def test_lazy_import():
+    # Runs in a new interpreter, so the modules aren't imported by other tests.
+    code = """
+import sys
+from imgtobraille.lazy import lazy_import
+render_cache = lazy_import("imgtobraille.render_cache")
+assert "numpy" not in sys.modules
+assert render_cache.default_cache_directory()
+assert "numpy" in sys.modules
+from imgtobraille import render_cache as imported
+assert imported is render_cache
+"""
+    subprocess.run([sys.executable, "-c", code], check=True, cwd="..")
+
+
+def test_lazy_import_already_imported():
+    from imgtobraille import render
+
+    assert lazy_import("imgtobraille.render") is render
+
+
+def test_cli_help_does_not_import_numba_or_opencv():
+    code = """
+import sys
+from imgtobraille import __main__
+try:
+    __main__.initialize_args("-h")
+except SystemExit:
+    pass
+loaded = [name for name in ("numba", "cv2") if name in sys.modules]
+assert not loaded, loaded
+"""
+    subprocess.run(
+        [sys.executable, "-c", code], check=True, cwd="..", stdout=subprocess.DEVNULL
+    )
@@ -0,0 +1,28 @@
+import pytest
+
+from imgtobraille import __main__
+
+VIDEO = "test_media/cube.mp4"
+DIMS = ("-dims", "40", "20")
+
+
+def test_incremental_arguments():
+    args = __main__.initialize_args(VIDEO, *DIMS, "-incremental")
+    assert args.incremental == 8
+    assert __main__.initialize_args(VIDEO, *DIMS, "-incremental", "0").incremental == 0
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        (VIDEO, "-incremental", "-1"),
+        ("test_media/frame.jpg", "-incremental"),
+        ("test_media", "-incremental"),
+        ("0", "-live", "-incremental"),
+        (VIDEO, "-dither", "bayer4", "-incremental"),
+    ],
+)
+def test_incremental_rejected(args, capsys):
+    with pytest.raises(SystemExit):
+        __main__.initialize_args(*args, *DIMS)
+    assert '"-incremental"' in capsys.readouterr().err
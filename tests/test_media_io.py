@@ -1,3 +1,8 @@
+import http.server
+import threading
+import time
+import urllib.error
+
 import numpy as np
 import pytest
 from cv2 import cv2
@@ -22,6 +27,84 @@ def test_read_image_url():
     assert np.array_equal(result, expected)
 
 
+class _ImageHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_GET(self):
+        if self.path.startswith("/missing"):
+            self.send_error(404)
+            return
+        if self.path.startswith("/redirect"):
+            self.send_response(302)
+            self.send_header("Location", "/frame.jpg")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/slow"):
+            time.sleep(1)
+        with open("test_media/frame.jpg", "rb") as file_obj:
+            content = file_obj.read()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def image_server():
+    _ImageHandler.connections = 0
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_read_image_urls(image_server):
+    expected = cv2.imread("test_media/frame.jpg", 0)
+    urls = [f"{image_server}/{index}.jpg" for index in range(20)]
+
+    results = dict(media_io.read_image_urls(urls, workers=4))
+
+    assert sorted(results) == sorted(urls)
+    assert all(np.array_equal(array, expected) for array in results.values())
+    # Connections are kept alive, so each thread connects at most once.
+    assert _ImageHandler.connections <= 4
+
+
+def test_URLImageLoader_reduced_and_errors(image_server):
+    with media_io.URLImageLoader(workers=2) as loader:
+        url = f"{image_server}/frame.jpg"
+        full = loader.read_image(url)
+        reduced = loader.read_image(url, max_width=full.shape[1] // 4)
+        expected = cv2.imread("test_media/frame.jpg", cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        assert np.array_equal(reduced, expected)
+
+        urls = [url, f"{image_server}/missing.jpg", url]
+        with pytest.raises(urllib.error.HTTPError):
+            list(loader.iter_images(urls))
+
+
+def test_URLImageLoader_recovers_after_timeout(image_server):
+    expected = cv2.imread("test_media/frame.jpg", 0)
+    with media_io.URLImageLoader(workers=1, timeout=0.5) as loader:
+        assert np.array_equal(loader.read_image(f"{image_server}/frame.jpg"), expected)
+        with pytest.raises(TimeoutError):
+            loader.fetch(f"{image_server}/slow.jpg")
+        # The connection left waiting for the response is replaced.
+        assert np.array_equal(loader.read_image(f"{image_server}/frame.jpg"), expected)
+        assert np.array_equal(loader.read_image(f"{image_server}/redirect"), expected)
+
+
 def test_read_image_file():
     test_media_path = "test_media/frame.jpg"
     expected1 = cv2.imread(test_media_path, 0)
@@ -93,3 +176,89 @@ def test_VideoFile_color():
         stream.read_frame(-1)
     with pytest.raises(IndexError):
         stream.read_frame(100)
+
+
+def test_VideoFile_slice():
+    test_media_path = "./test_media/cube.mp4"
+    stream = media_io.VideoFile(test_media_path, color=False)
+    expected = [stream.read_frame(index) for index in range(5, 60, 9)]
+
+    stream.goto_frame(0)
+    with mock.patch.object(stream, "goto_frame", wraps=stream.goto_frame) as goto:
+        result = list(stream[5:60:9])
+    assert goto.call_count == 0
+    assert len(result) == len(expected)
+    for expected_frame, result_frame in zip(expected, result):
+        assert np.array_equal(expected_frame, result_frame)
+
+    assert len(list(stream[::-40])) == 3
+    assert len(list(stream[90:])) == 9
+
+
+def test_VideoFile_seek_threshold():
+    stream = media_io.VideoFile("./test_media/cube.mp4", seek_threshold=10)
+    with mock.patch.object(stream, "goto_frame", wraps=stream.goto_frame) as goto:
+        frames = list(stream[0:99:30])
+    assert goto.call_count == 3
+    assert len(frames) == 4
+
+
+def test_VideoFile_reuse_buffer():
+    for color in [True, False]:
+        stream = media_io.VideoFile("./test_media/cube.mp4", color=color)
+        expected = [frame.copy() for frame in stream[0:20:3]]
+        frames = []
+        for frame in stream.iter_frames(0, 20, 3, reuse_buffer=True):
+            frames.append(frame)
+            assert np.array_equal(frame, expected[len(frames) - 1])
+        assert all(frame is frames[0] for frame in frames)
+
+
+def test_read_image_file_reduced(tmp_path):
+    path = str(tmp_path / "large.jpg")
+    gradient = np.tile(np.linspace(0, 255, 1600), (1200, 1)).astype(np.uint8)
+    cv2.imwrite(path, gradient)
+    with open(path, "rb") as file:
+        assert media_io.jpeg_size(file) == (1600, 1200)
+
+    # The largest reduction that still covers the fitted image is used.
+    assert media_io.read_image_file(path, 0, 200, 200).shape == (150, 200)
+    assert media_io.read_image_file(path, 1, 300).shape == (300, 400, 3)
+    assert media_io.read_image_file(path, 0, 1000, 1000).shape == (1200, 1600)
+    assert media_io.read_image_file(path).shape == (1200, 1600)
+
+    png_path = str(tmp_path / "large.png")
+    cv2.imwrite(png_path, gradient)
+    with open(png_path, "rb") as file:
+        assert media_io.jpeg_size(file) is None
+    assert media_io.read_image_file(png_path, 0, 200, 200).shape == (1200, 1600)
+
+
+def test_LatestFrameCapture():
+    stream = media_io.VideoStream("./test_media/cube.mp4")
+    taken = []
+    with media_io.LatestFrameCapture(stream) as capture:
+        while (latest := capture.get(timeout=5)) is not None:
+            frame, captured_at = latest
+            assert frame.shape == (stream.source_height, stream.source_width)
+            assert captured_at <= time.monotonic()
+            taken.append(frame)
+            time.sleep(0.01)
+    assert capture.captured == 99
+    assert capture.dropped == capture.captured - len(taken) > 0
+    # Frames are decoded into at most three buffers.
+    assert len({frame.ctypes.data for frame in taken}) <= 3
+
+
+def test_VideoFile_read_frames():
+    video = media_io.VideoFile("./test_media/cube.mp4")
+    expected = [frame.copy() for frame in video.iter_frames(0, 40)]
+    indices = [0, 1, 5, 30, 2]
+    for index, frame in zip(indices, video.read_frames(iter(indices))):
+        assert np.array_equal(frame, expected[index])
+
+
+def test_is_video_file():
+    assert media_io.is_video_file("./test_media/cube.mp4")
+    assert not media_io.is_video_file("./test_media/frame.jpg")
+    assert not media_io.is_video_file("./test_media/missing.mp4")
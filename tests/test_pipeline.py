@@ -0,0 +1,179 @@
+import time
+
+import numpy as np
+import pytest
+
+from imgtobraille import arr_filters
+from imgtobraille import media_io
+from imgtobraille import pipeline
+from imgtobraille import render
+
+
+def test_render_files_keeps_order():
+    files = ["test_media/frame.jpg"] * 6
+    expected = list(pipeline.render_files(files, (60, 40), 0.8, workers=1))
+    result = list(pipeline.render_files(files, (60, 40), 0.8, workers=2, chunksize=2))
+
+    assert len(result) == 6
+    for expected_frame, result_frame in zip(expected, result):
+        assert np.array_equal(expected_frame, result_frame)
+
+
+def test_render_files_colored():
+    files = ["test_media/frame.jpg"] * 3
+    frames = list(pipeline.render_files(files, (60, 40), 0.8, workers=2, colored=True))
+    expected_codes = pipeline.render_file(
+        (files[0], (60, 40), 0.8, "floyd-steinberg", None)
+    )
+
+    # A single color decode gives the same dots as decoding in grayscale.
+    arr = media_io.read_image_file(files[0], 1, 60, 40)
+    arr = arr_filters.fit_in_box(arr, 60, 40)
+    expected_colors = render.render_cells(arr_filters.rgb_to_grayscale(arr), arr)[1]
+    assert len(frames) == 3
+    for codes, colors in frames:
+        assert colors.dtype == np.uint8 and colors.shape == (*codes.shape, 3)
+        assert (codes != expected_codes).mean() < 0.05
+        assert np.array_equal(colors, expected_colors)
+
+
+def test_render_files_invalid_arguments():
+    with pytest.raises(ValueError):
+        next(pipeline.render_files(["test_media/frame.jpg"], (60, 40), 0.8, workers=-1))
+    with pytest.raises(ValueError):
+        next(
+            pipeline.render_files(["test_media/frame.jpg"], (60, 40), 0.8, chunksize=0)
+        )
+
+
+def test_PrefetchQueue():
+    prefetch = pipeline.PrefetchQueue(range(10), maxsize=3)
+    assert list(prefetch) == list(range(10))
+    assert prefetch.depth == 0
+
+
+def test_PrefetchQueue_error():
+    def frames():
+        yield 1
+        raise RuntimeError("decode failed")
+
+    prefetch = pipeline.PrefetchQueue(frames())
+    with pytest.raises(RuntimeError):
+        list(prefetch)
+
+
+def test_FrameClock_drops_late_frames():
+    clock = pipeline.FrameClock(fps=100)
+    assert clock.tick()
+    time.sleep(0.05)
+    assert not clock.tick(can_drop=True)
+    assert clock.tick(can_drop=False)
+    assert (clock.shown, clock.dropped) == (2, 1)
+    assert clock.fps > 0
+
+
+def test_FrameClock_lead():
+    clock = pipeline.FrameClock(fps=10)
+    assert clock.tick()
+    start = time.monotonic()
+    assert clock.tick(lead=0.06)
+    assert 0.02 < time.monotonic() - start < 0.06
+    # Already too late once the frame would be ready.
+    assert not clock.tick(lead=0.5)
+
+
+def test_AdaptiveQuality():
+    quality = pipeline.AdaptiveQuality(0.01, levels=["best", "good", "fast"])
+    assert quality.current == "best"
+    quality.update(0.02)
+    assert quality.current == "good"
+    quality.update(0.03)
+    quality.update(0.03)
+    assert quality.current == "fast"
+    quality.update(0.03)
+    assert quality.current == "fast"
+
+    # Raised again only after enough frames well within the budget.
+    fast_frames = 0
+    while quality.current == "fast":
+        quality.update(0.001)
+        fast_frames += 1
+    assert fast_frames >= quality.patience
+    assert quality.current == "good"
+
+    with pytest.raises(ValueError):
+        pipeline.AdaptiveQuality(0)
+
+
+def test_LatencyStats():
+    stats = pipeline.LatencyStats()
+    assert stats.percentile(50) == 0.0
+    for milliseconds in range(1, 101):
+        stats.add(milliseconds / 1000)
+    assert abs(stats.percentile(95) - 0.095) < 0.001
+    assert "max 100.0 ms" in stats.summary()
+
+
+def test_render_live():
+    stream = media_io.VideoStream("test_media/cube.mp4")
+    quality = pipeline.AdaptiveQuality(1e-9)
+    with media_io.LatestFrameCapture(stream) as capture:
+        frames = list(
+            pipeline.render_live(capture, (40, 40), 0.8, "floyd-steinberg", quality)
+        )
+    assert frames
+    assert quality.current == pipeline.LIVE_QUALITY_LEVELS[-1]
+    # Frames shrink as the quality is lowered.
+    assert frames[0][0].shape == (10, 20)
+    assert frames[-1][0].shape == (5, 10)
+    assert all(captured_at <= time.monotonic() for _, captured_at in frames)
+
+
+def test_render_video():
+    video = media_io.VideoFile("test_media/cube.mp4")
+    clock = pipeline.FrameClock(1000)
+    frames = list(pipeline.render_video(video, (40, 40), 0.8, "bayer4", clock))
+    assert clock.shown == len(frames) and clock.shown + clock.dropped == 99
+    assert frames[0][0].shape == (10, 20) and frames[0][1] is None
+
+    # Colored frames have the rgb colors of the characters.
+    video = media_io.VideoFile("test_media/cube.mp4", color=True)
+    clock = pipeline.FrameClock(1000)
+    codes, colors = next(pipeline.render_video(video, (40, 40), 0.8, "bayer4", clock))
+    frame = arr_filters.fit_in_box(video.read_frame(0)[..., ::-1], 40, 40)
+    assert codes.shape == (10, 20) and colors.dtype == np.uint8
+    assert np.array_equal(colors, render.render_cells(np.zeros((40, 40)), frame)[1])
+
+    # Incremental frames are the same as frames dithered whole with the same bands.
+    for color in (False, True):
+        video = media_io.VideoFile("test_media/cube.mp4", color=color)
+        clock = pipeline.FrameClock(1000)
+        clock.tick = lambda can_drop=True, lead=0.0: True  # compare every frame
+        frames = pipeline.render_video(
+            video,
+            (40, 40),
+            0.8,
+            "floyd-steinberg",
+            clock,
+            incremental=True,
+            tolerance=0,
+        )
+        resize = arr_filters.BoxResizer(40, 40)
+        for (codes, colors), frame in zip(frames, video.iter_frames(stop=20)):
+            frame = resize(frame[..., ::-1] if color else frame)
+            gray = arr_filters.rgb_to_grayscale(frame) if color else frame
+            ditherer = arr_filters.FloydSteinbergDitherer(mode="incremental")
+            expected = render.render_cells(ditherer(gray), frame if color else None)
+            assert np.array_equal(codes, expected[0])
+            if color:
+                assert np.array_equal(colors, expected[1])
+            else:
+                assert colors is None
+
+    # Late frames are skipped.
+    clock = pipeline.FrameClock(100)
+    frames = pipeline.render_video(video, (40, 40), 0.8, "bayer4", clock)
+    next(frames)
+    time.sleep(0.2)
+    assert len(list(frames)) < 98
+    assert clock.dropped >= 10
@@ -0,0 +1,227 @@
+import io
+
+import numpy as np
+import pytest
+
+from imgtobraille import render
+
+
+def legacy_colored_render(dot_arr: np.ndarray, color_arr: np.ndarray) -> str:
+    """Colored output the way `render` produced it with per-character formatting."""
+    dot_arr = dot_arr[dot_arr.shape[0] % 4 :, dot_arr.shape[1] % 2 :]
+    color_arr = color_arr[color_arr.shape[0] % 4 :, color_arr.shape[1] % 2 :]
+    codes = (render.split_to_tiles(dot_arr.clip(0, 1), 4, 2) * render.BRAILLE_TILE).sum(
+        axis=(2, 3)
+    )
+    colors = render.split_to_tiles(color_arr, 4, 2).mean(axis=(2, 3)).astype(int)
+    unicode_buf = (codes + render.BRAILLE_CODEPOINT_START).view("U2")
+    return render.colorize_view(unicode_buf, colors)
+
+
+@pytest.mark.parametrize("shape", [(4, 2), (16, 10), (61, 43), (120, 200)])
+def test_render_colored_matches_colorize_view(shape):
+    rng = np.random.default_rng(0)
+    dot_arr = rng.integers(0, 2, shape, dtype=np.uint8)
+    dot_arr[:, -6:] = 0
+    color_arr = rng.integers(0, 256, (*shape, 3), dtype=np.uint8)
+
+    expected = legacy_colored_render(dot_arr.copy(), color_arr)
+    result = render.render(dot_arr.copy(), color_arr)
+
+    assert result.encode() == expected.encode()
+
+
+def test_render_colored_small_array():
+    result = render.render(np.ones((3, 1)), np.full((3, 1, 3), 200, dtype=np.uint8))
+    assert result == "\033[38;2;75;75;75m⠇" + render.ANSI_RESET_COLORS
+
+
+def test_colorize_codes_out_of_range_colors():
+    codes = np.array([[255, 0]])
+    colors = np.array([[[300, -1, 0], [1, 2, 3]]])
+    expected = render.colorize_view(
+        (codes + render.BRAILLE_CODEPOINT_START).view("U2"), colors
+    )
+    assert render.colorize_codes(codes, colors) == expected
+
+
+def test_render_gray():
+    dot_arr = np.zeros((8, 4), dtype=np.uint8)
+    dot_arr[:4, :2] = 1
+    assert render.render(dot_arr) == "⣿\n"
+    assert render.render(dot_arr, rstrip=False) == "⣿⠀\n⠀⠀"
+
+
+def test_colorize_codes_coalesce():
+    codes = np.array([[1, 2, 0, 3, 0, 0], [4, 0, 0, 0, 0, 0]])
+    colors = np.zeros((2, 6, 3), dtype=np.uint8)
+    colors[0, 3] = [9, 0, 0]
+    colors[1, 0] = [10, 0, 0]
+
+    assert render.colorize_codes(codes, colors, coalesce=True) == (
+        "\033[38;2;0;0;0m⠁⠂⠀\033[38;2;9;0;0m⠃\n\033[38;2;10;0;0m⠄"
+        + render.ANSI_RESET_COLORS
+    )
+    assert render.colorize_codes(codes, colors, coalesce=True, color_tolerance=9) == (
+        "\033[38;2;0;0;0m⠁⠂⠀⠃\n\033[38;2;10;0;0m⠄" + render.ANSI_RESET_COLORS
+    )
+
+
+def test_quantize_colors():
+    colors = np.array([[0, 0, 0], [255, 255, 255], [250, 10, 5], [128, 128, 128]])
+    assert render.quantize_colors(colors, "256").tolist() == [16, 231, 196, 244]
+    assert render.quantize_colors(colors, "16").tolist() == [30, 97, 91, 90]
+
+
+@pytest.mark.parametrize(
+    "color_mode, values",
+    # The first 16 colors of the 256 color palette are never used.
+    [("256", np.arange(16, 256)), ("16", np.r_[30:38, 90:98])],
+)
+def test_quantize_colors_palette_colors_round_trip(color_mode, values):
+    colors = render.palette_colors(values, color_mode)
+    assert np.array_equal(render.quantize_colors(colors, color_mode), values)
+
+
+def test_render_palette_modes():
+    dot_arr = np.ones((4, 4), dtype=np.uint8)
+    color_arr = np.full((4, 4, 3), 255, dtype=np.uint8)
+    assert render.render(dot_arr, color_arr, color_mode="256") == (
+        "\033[38;5;231m⣿\033[38;5;231m⣿" + render.ANSI_RESET_COLORS
+    )
+    assert render.render(dot_arr, color_arr, color_mode="16", coalesce=True) == (
+        "\033[97m⣿⣿" + render.ANSI_RESET_COLORS
+    )
+    with pytest.raises(ValueError):
+        render.render(dot_arr, color_arr, color_mode="8")
+
+
+@pytest.mark.parametrize("shape", [(5, 3, 1), (3, 17, 11), (2, 64, 80)])
+def test_render_batch_matches_render(shape):
+    rng = np.random.default_rng(1)
+    dot_arrs = rng.integers(0, 3, shape)
+    color_arrs = rng.integers(0, 256, (*shape, 3), dtype=np.uint8)
+
+    gray = render.render_batch(dot_arrs)
+    colored = render.render_batch(dot_arrs, color_arrs, coalesce=True)
+    codes = render.render_batch(dot_arrs, as_codes=True)
+
+    assert codes.dtype == np.uint8
+    for index in range(shape[0]):
+        assert gray[index] == render.render(dot_arrs[index].copy())
+        assert colored[index] == render.render(
+            dot_arrs[index].copy(), color_arrs[index], coalesce=True
+        )
+        expected_codes, _ = render.render_cells(dot_arrs[index].copy())
+        assert np.array_equal(codes[index], expected_codes)
+
+
+def test_render_batch_does_not_modify_input():
+    dot_arrs = np.full((2, 8, 4), 200)
+    render.render_batch(dot_arrs)
+    assert (dot_arrs == 200).all()
+    with pytest.raises(ValueError):
+        render.render_batch(dot_arrs[0])
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int16, np.float64, np.bool_])
+def test_pack_braille(dtype):
+    rng = np.random.default_rng(2)
+    dot_arr = rng.integers(-1, 3, (34, 21)).astype(dtype)
+    original = dot_arr.copy()
+    cropped = dot_arr[2:, 1:].clip(0, 1)
+    expected = (render.split_to_tiles(cropped, 4, 2) * render.BRAILLE_TILE).sum(
+        axis=(2, 3)
+    )
+
+    out = np.zeros((8, 10), dtype=np.uint8)
+    result = render.pack_braille(dot_arr, out=out)
+    assert result is out
+    assert np.array_equal(result, expected)
+    assert np.array_equal(dot_arr, original)
+
+    with pytest.raises(ValueError):
+        render.pack_braille(dot_arr, out=np.zeros((8, 11), dtype=np.uint8))
+
+
+def test_pack_braille_other_tile():
+    tile = np.arange(1, 10).reshape(3, 3)
+    dot_arr = np.random.default_rng(3).integers(0, 2, (2, 9, 7))
+    expected = [
+        (render.split_to_tiles(frame[:, 1:], 3, 3) * tile).sum(axis=(2, 3))
+        for frame in dot_arr
+    ]
+    assert np.array_equal(render.pack_braille(dot_arr, tile), expected)
+
+
+@pytest.mark.parametrize("rstrip", [False, True])
+def test_codes_to_bytes_matches_codes_to_string(rstrip):
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, 256, (30, 40), dtype=np.uint8)
+    codes[rng.random(codes.shape) < 0.5] = 0
+    codes[::3, -5:] = 0
+    codes[4] = 0
+    codes[7, :] = 255
+
+    expected = render.codes_to_string(codes, rstrip).encode()
+    assert render.codes_to_bytes(codes, rstrip) == expected
+    assert render.codes_to_bytes(codes[:, :-5], rstrip) == (
+        render.codes_to_string(codes[:, :-5], rstrip).encode()
+    )
+    assert render.codes_to_bytes(codes[:0], rstrip) == b""
+
+
+@pytest.mark.parametrize("colored", [False, True])
+@pytest.mark.parametrize("color_mode", ["truecolor", "16"])
+def test_render_bytes_matches_render(colored, color_mode):
+    rng = np.random.default_rng(0)
+    dot_arr = rng.integers(0, 2, (61, 43), dtype=np.uint8)
+    dot_arr[:, -6:] = 0
+    color_arr = rng.integers(0, 256, (61, 43, 3), dtype=np.uint8) if colored else None
+
+    expected = render.render(dot_arr, color_arr, color_mode=color_mode)
+    assert render.render_bytes(dot_arr, color_arr, color_mode=color_mode) == (
+        expected.encode()
+    )
+
+
+@pytest.mark.parametrize("shape", [(3, 1), (37, 21), (61, 43), (256, 30)])
+@pytest.mark.parametrize("colored", [False, True])
+@pytest.mark.parametrize("color_mode", ["truecolor", "256"])
+def test_iter_render_matches_render(shape, colored, color_mode):
+    rng = np.random.default_rng(0)
+    dot_arr = rng.integers(0, 2, shape, dtype=np.uint8)
+    dot_arr[:, -4:] = 0
+    color_arr = rng.integers(0, 256, (*shape, 3), dtype=np.uint8) if colored else None
+
+    expected = render.render(dot_arr, color_arr, color_mode=color_mode)
+    chunks = list(
+        render.iter_render(dot_arr, color_arr, color_mode=color_mode, chunk_rows=4)
+    )
+
+    assert b"".join(chunks).decode() == expected
+    assert len(chunks) > 1 or shape[0] <= 16
+
+
+@pytest.mark.parametrize("color_mode", ["truecolor", "256"])
+def test_iter_render_out_of_range_colors(color_mode):
+    dot_arr = np.ones((8, 4), dtype=np.uint8)
+    color_arr = np.full((8, 4, 3), 300, dtype=np.int64)
+    color_arr[4:] = -20
+
+    expected = render.render(dot_arr, color_arr, color_mode=color_mode)
+    chunks = render.iter_render(dot_arr, color_arr, color_mode=color_mode, chunk_rows=1)
+
+    assert b"".join(chunks).decode() == expected
+
+
+def test_render_to():
+    rng = np.random.default_rng(1)
+    dot_arr = rng.integers(0, 2, (100, 60), dtype=np.uint8)
+    color_arr = rng.integers(0, 256, (100, 60, 3), dtype=np.uint8)
+    file = io.BytesIO()
+
+    written = render.render_to(file, dot_arr, color_arr, rstrip=False, chunk_rows=3)
+
+    assert file.getvalue().decode() == render.render(dot_arr, color_arr, rstrip=False)
+    assert written == len(file.getvalue())
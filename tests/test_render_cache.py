@@ -0,0 +1,53 @@
+import os
+import shutil
+
+import numpy as np
+
+from imgtobraille import pipeline
+from imgtobraille import render_cache
+
+
+def test_RenderCache(tmp_path):
+    source = tmp_path / "frame.jpg"
+    shutil.copy("test_media/frame.jpg", source)
+    cache = render_cache.RenderCache(str(tmp_path / "cache"))
+    codes = np.arange(12).reshape(3, 4)
+
+    assert cache.load(str(source), resolution=(10, 10)) is None
+    cache.store(str(source), codes, resolution=(10, 10))
+
+    cached = cache.load(str(source), resolution=(10, 10))
+    assert isinstance(cached, np.memmap)
+    assert cached.dtype == np.uint8
+    assert np.array_equal(cached, codes)
+    assert cache.load(str(source), resolution=(10, 20)) is None
+
+    # Modifying the source invalidates the frame.
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache.load(str(source), resolution=(10, 10)) is None
+
+
+def test_render_file_with_cache(tmp_path):
+    cache_directory = str(tmp_path / "cache")
+    task = ("test_media/frame.jpg", (60, 40), 0.8, "floyd-steinberg", cache_directory)
+
+    expected = pipeline.render_file(task[:4] + (None,))
+    assert np.array_equal(pipeline.render_file(task), expected)
+    cached = pipeline.render_file(task)
+    assert isinstance(cached, np.memmap)
+    assert np.array_equal(cached, expected)
+
+
+def test_render_colored_file_with_cache(tmp_path):
+    cache_directory = str(tmp_path / "cache")
+    task = ("test_media/frame.jpg", (60, 40), 0.8, "floyd-steinberg", cache_directory)
+
+    codes, colors = pipeline.render_colored_file(task[:4] + (None,))
+    pipeline.render_colored_file(task)
+    cached_codes, cached_colors = pipeline.render_colored_file(task)
+    assert isinstance(cached_codes, np.memmap)
+    assert np.array_equal(cached_codes, codes)
+    assert np.array_equal(cached_colors, colors)
+    # Colored and grayscale frames are cached separately.
+    assert pipeline.render_file(task).shape == codes.shape
@@ -0,0 +1,95 @@
+import http.client
+import queue
+import threading
+import urllib.error
+
+import pytest
+
+from imgtobraille import server
+
+IMAGE = "test_media/frame.jpg"
+
+
+@pytest.fixture(scope="module")
+def render_server():
+    with server.RenderServer(("127.0.0.1", 0), workers=1) as render_server:
+        thread = threading.Thread(target=render_server.serve_forever, daemon=True)
+        thread.start()
+        yield render_server
+        render_server.shutdown()
+
+
+def test_RenderClient(render_server):
+    with open(IMAGE, "rb") as file_obj:
+        content = file_obj.read()
+    expected = server.render_request((IMAGE, (40, 20), 0.8, "floyd-steinberg", None))
+
+    with server.RenderClient(render_server.address) as client:
+        assert client.render(content, 40, 20) == expected
+        assert client.render(IMAGE, 40, 20) == expected
+        colored = client.render(content, 40, 20, dither="bayer4", color="256")
+        assert colored == server.render_request((IMAGE, (40, 20), 0.8, "bayer4", "256"))
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            client.render(content, 0, 20)
+        assert error.value.code == 400
+        with pytest.raises(urllib.error.HTTPError) as error:
+            client.render(b"not an image", 40, 20)
+        assert error.value.code == 400
+        with pytest.raises(urllib.error.HTTPError) as error:
+            client.render("test_media/missing.jpg", 40, 20)
+        assert error.value.code == 404
+
+        stats = client.stats()
+        assert stats["requests"] >= 5 and stats["workers"] == 1
+        assert 0 < stats["latency"]["p50"] <= stats["latency"]["p99"]
+
+
+def test_RenderClient_recovers_after_timeout(render_server):
+    with server.RenderClient(render_server.address, timeout=0.001) as client:
+        with pytest.raises(TimeoutError):
+            client.render(IMAGE, 400, 200)
+        client.connection.timeout = 60
+        expected = server.render_request(
+            (IMAGE, (40, 20), 0.8, "floyd-steinberg", None)
+        )
+        assert client.render(IMAGE, 40, 20) == expected
+
+
+def test_invalid_content_length(render_server):
+    connection = http.client.HTTPConnection(*render_server.address, timeout=10)
+    for length in ("abc", "-1"):
+        connection.putrequest("POST", "/render?width=40&height=20")
+        connection.putheader("Content-Length", length)
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == 400
+        assert b"Content-Length" in response.read()
+        connection.close()
+
+
+def test_RenderServer_backpressure():
+    request = (IMAGE, (200, 100), 0.8, "floyd-steinberg", None)
+    with server.RenderServer(("127.0.0.1", 0), workers=1, max_queue=2) as render:
+        futures, rejected = [], 0
+        for _ in range(20):
+            try:
+                futures.append(render.submit(request))
+            except queue.Full:
+                rejected += 1
+
+        assert rejected and render.rejected == rejected
+        expected = server.render_request(request)
+        assert all(future.result() == expected for future in futures)
+        assert render.stats()["requests"] == len(futures)
+
+
+def test_RenderServer_spreads_burst_over_workers():
+    request = (IMAGE, (40, 20), 0.8, "floyd-steinberg", None)
+    with server.RenderServer(("127.0.0.1", 0), workers=2, batch_size=8) as render:
+        futures = [render.submit(request) for _ in range(4)]
+
+        expected = server.render_request(request)
+        assert all(future.result() == expected for future in futures)
+        # Both workers got a share of the burst instead of one batch of 4.
+        assert render.batches >= 2
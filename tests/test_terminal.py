@@ -0,0 +1,49 @@
+import numpy as np
+
+from imgtobraille import render
+from imgtobraille import terminal
+
+
+def test_FrameDiffEncoder_gray():
+    encoder = terminal.FrameDiffEncoder(max_gap=1)
+    codes = np.zeros((2, 6), dtype=np.int64)
+
+    first = encoder.encode(codes)
+    assert (
+        first == terminal.CLEAR_SCREEN + terminal.CURSOR_HOME + "⠀" * 6 + "\n" + "⠀" * 6
+    )
+    assert encoder.encode(codes.copy()) == ""
+
+    changed = codes.copy()
+    changed[1, 1] = 1
+    changed[1, 3] = 2
+    changed[0, 5] = 255
+    assert encoder.encode(changed) == "\033[1;6H⣿\033[2;2H⠁⠀⠂"
+
+    # Everything changed, full redraw is smaller than the diff.
+    assert encoder.encode(np.full((2, 6), 255)) == (
+        terminal.CURSOR_HOME + "⣿" * 6 + "\n" + "⣿" * 6
+    )
+
+
+def test_FrameDiffEncoder_colored():
+    encoder = terminal.FrameDiffEncoder(color_mode="256")
+    codes = np.full((1, 3), 255)
+    colors = np.zeros((1, 3, 3), dtype=np.int64)
+    encoder.encode(codes, colors)
+
+    colors[0, 2] = 1
+    assert encoder.encode(codes, colors) == ""
+
+    colors[0, 2] = 255
+    assert encoder.encode(codes, colors) == (
+        "\033[1;3H\033[38;5;231m⣿" + render.ANSI_RESET_COLORS
+    )
+
+
+def test_FrameDiffEncoder_shape_change():
+    encoder = terminal.FrameDiffEncoder()
+    encoder.encode(np.zeros((1, 1), dtype=np.int64))
+    assert encoder.encode(np.zeros((1, 2), dtype=np.int64)).startswith(
+        terminal.CLEAR_SCREEN
+    )